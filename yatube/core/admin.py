@@ -0,0 +1,54 @@
+from django.contrib import admin
+from .models import Job, QueuedEmail
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'subject',
+                    'recipients',
+                    'status',
+                    'attempts',
+                    'next_attempt',
+                    )
+    list_filter = ('status',)
+    exclude = ('message',)
+    readonly_fields = ('subject',
+                       'recipients',
+                       'status',
+                       'attempts',
+                       'last_error',
+                       'next_attempt',
+                       'sent',
+                       )
+    ordering = ['-pk']
+
+
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'name',
+                    'status',
+                    'attempts',
+                    'run_at',
+                    'finished',
+                    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('name',
+                       'payload',
+                       'status',
+                       'attempts',
+                       'max_attempts',
+                       'unique_key',
+                       'last_error',
+                       'worker',
+                       'run_at',
+                       'started',
+                       'heartbeat',
+                       'finished',
+                       )
+    ordering = ['-pk']
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода вместо списка всех значений.
+
+    Штатный фильтр по внешнему ключу выводит в боковую панель каждую
+    связанную запись, то есть всех пользователей сайта.
+    """
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return (('', ''),)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'query_parts': [
+                (key, value)
+                for key, value in changelist.get_filters_params().items()
+                if key != self.parameter_name
+            ],
+        }
+
+
+def input_filter(lookup, title):
+    return type(f'{lookup}_filter', (InputFilter,), {
+        'lookup': lookup,
+        'title': title,
+        'parameter_name': lookup,
+    })
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """
+    Автокомплит, который берёт подпись выбранного значения из уже
+    загруженного объекта, а не отдельным запросом на каждую строку
+    списка с list_editable.
+    """
+    selected_object = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.selected_object
+        if obj is None or str(obj.pk) not in {str(v) for v in value}:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name,
+            obj.pk,
+            self.choices.field.label_from_instance(obj),
+            True,
+            len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class PreloadedAutocompleteMixin:
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        form_class = super().get_changelist_form(request, **kwargs)
+
+        class PreloadedForm(form_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                for name, field in self.fields.items():
+                    widget = getattr(field.widget, 'widget', field.widget)
+                    if isinstance(widget, PreloadedAutocompleteSelect):
+                        widget.selected_object = getattr(
+                            self.instance, name, None
+                        )
+
+        return PreloadedForm
+
+
+class PrefixSearchMixin:
+    """
+    Автокомплиты, которые ссылаются на модель, ищут по префиксному
+    индексу в памяти (см. posts.autocomplete) вместо icontains по
+    search_fields. Обычный поиск в списке объектов не меняется.
+    """
+    prefix_index = None
+
+    def autocomplete_view(self, request):
+        request.prefix_search = True
+        return super().autocomplete_view(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not getattr(request, 'prefix_search', False) or not search_term:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        pks = self.prefix_index.search_pks(
+            search_term, settings.AUTOCOMPLETE_ADMIN_LIMIT
+        )
+        return queryset.filter(pk__in=pks), False
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .caching import cache_is_shared
+
+USER_CACHE_KEY = 'core.auth.user.{}'
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который держит строку auth_user в кеше.
+
+    AuthenticationMiddleware вызывает get_user() на каждом запросе
+    авторизованного пользователя; с кешем это больше не запрос в базу.
+    Запись сбрасывается сигналами при любом сохранении пользователя,
+    в том числе при смене пароля и входе (обновление last_login).
+
+    Сигнал сбрасывает запись только в кеше своего процесса, поэтому с
+    кешем, который у каждого процесса свой, пользователь читается из
+    базы: иначе другие воркеры до AUTH_USER_CACHE_TIMEOUT помнили бы
+    старый хеш пароля.
+    """
+
+    def get_user(self, user_id):
+        if not cache_is_shared():
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,21 @@
+"""
+Общий ли кеш у процессов сайта.
+
+LocMemCache у каждого процесса свой: запись, сброшенная в одном
+воркере, остаётся в остальных. Всё, что держит в кеше состояние,
+которое обязано быть одинаковым во всех процессах (пользователь с
+хешем пароля, сессии с отложенной записью), проверяет cache_is_shared()
+и без общего кеша (Redis, Memcached, база, файлы) работает напрямую с
+базой.
+"""
+from django.conf import settings
+
+PER_PROCESS_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared(alias='default'):
+    """Видят ли все процессы одни и те же записи кеша ``alias``."""
+    return settings.CACHES[alias]['BACKEND'] not in PER_PROCESS_BACKENDS
@@ -0,0 +1,286 @@
+"""
+Фоновые задачи в таблице Job, без отдельного брокера.
+
+enqueue() записывает вызов функции в ту же транзакцию, что и данные,
+поэтому задача не потеряется при падении процесса и не увидит
+несохранённых данных. Воркер ``manage.py run_workers`` забирает задачи
+условным UPDATE по статусу (или SELECT ... FOR UPDATE SKIP LOCKED, если
+база это умеет) и выполняет их в пуле потоков или процессов. Новые
+задачи забираются, как только в пуле освобождается место, и медленная
+задача не задерживает остальные.
+
+Упавшая задача повторяется с задержкой JOB_RETRY_DELAY, которая
+удваивается с каждой попыткой. Пока задача выполняется, воркер раз в
+JOB_HEARTBEAT_INTERVAL отмечает её в поле heartbeat; задача без отметки
+дольше JOB_LOCK_TIMEOUT (воркер умер) снова берётся в работу, а долгая
+задача живого воркера — нет. Периодические задачи из JOB_PERIODIC
+ставятся заново после каждого выполнения.
+"""
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PERIODIC_KEY = 'periodic:{}'
+
+
+def job_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, args=(), kwargs=None, run_at=None, delay=None,
+            max_attempts=None, unique_key=None):
+    """
+    Ставит вызов ``func(*args, **kwargs)`` в очередь.
+
+    ``func`` — функция уровня модуля или путь к ней, аргументы должны
+    сериализоваться в JSON. ``run_at`` или ``delay`` (секунды) откладывают
+    запуск. Пока задача с ``unique_key`` не выполнена, повторная
+    постановка возвращает её же. С BACKGROUND_TASKS_EAGER задача
+    выполняется сразу после коммита и ничего не возвращается.
+    """
+    name = job_name(func)
+    kwargs = kwargs or {}
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(
+            lambda: import_string(name)(*args, **kwargs)
+        )
+        return None
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    job = Job(
+        name=name,
+        payload=json.dumps(
+            {'args': list(args), 'kwargs': kwargs}, cls=DjangoJSONEncoder
+        ),
+        run_at=run_at,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        unique_key=unique_key,
+    )
+    if unique_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        job = Job.objects.get(unique_key=unique_key)
+    return job
+
+
+def schedule_periodic():
+    """Ставит периодические задачи, которых ещё нет в очереди."""
+    for name in settings.JOB_PERIODIC:
+        enqueue(name, unique_key=PERIODIC_KEY.format(name))
+
+
+def _candidates(now):
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return (
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        | Job.objects.filter(status=Job.RUNNING, heartbeat__lte=stale)
+    ).order_by('run_at')
+
+
+def _claim(worker, batch_size):
+    """Забирает пачку задач, не отданную другому воркеру."""
+    now = timezone.now()
+    taken = {
+        'status': Job.RUNNING,
+        'worker': worker,
+        'started': now,
+        'heartbeat': now,
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pks = list(_candidates(now).select_for_update(
+                skip_locked=True
+            ).values_list('pk', flat=True)[:batch_size])
+            Job.objects.filter(pk__in=pks).update(**taken)
+        return pks
+    claimed = []
+    for job in _candidates(now)[:batch_size]:
+        if Job.objects.filter(
+            pk=job.pk, status=job.status, heartbeat=job.heartbeat
+        ).update(**taken):
+            claimed.append(job.pk)
+    return claimed
+
+
+def heartbeat(worker, job_ids):
+    """Отмечает, что задачи job_ids ещё выполняются воркером worker."""
+    if job_ids:
+        Job.objects.filter(
+            pk__in=job_ids, worker=worker, status=Job.RUNNING
+        ).update(heartbeat=timezone.now())
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _finish(job, status, error=''):
+    job.status = status
+    job.last_error = error
+    job.finished = timezone.now()
+    periodic = job.unique_key == PERIODIC_KEY.format(job.name)
+    job.unique_key = None
+    with transaction.atomic():
+        job.save(update_fields=(
+            'status', 'last_error', 'finished', 'unique_key'
+        ))
+        interval = settings.JOB_PERIODIC.get(job.name)
+        if periodic and interval is not None:
+            enqueue(job.name, delay=interval,
+                    unique_key=PERIODIC_KEY.format(job.name))
+
+
+def execute(job_id):
+    """Выполняет забранную задачу. Возвращает True, если она удалась."""
+    job = Job.objects.get(pk=job_id)
+    try:
+        payload = json.loads(job.payload)
+        import_string(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception as error:
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.last_error = repr(error)
+            job.run_at = timezone.now() + _retry_delay(job.attempts)
+            job.save(update_fields=('status', 'last_error', 'run_at'))
+        else:
+            _finish(job, Job.FAILED, repr(error))
+        return False
+    _finish(job, Job.DONE)
+    return True
+
+
+def _execute_in_worker(job_id):
+    try:
+        return execute(job_id)
+    finally:
+        connections.close_all()
+
+
+def process_pool(max_workers):
+    """
+    Пул процессов с настроенным Django. Процессы запускаются через spawn,
+    а не fork: дочерний процесс не должен унаследовать открытое
+    подключение к базе родителя.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def run_pending(worker, batch_size=None, executor=None):
+    """
+    Забирает и выполняет одну пачку задач. Возвращает пару
+    (выполнено, упало).
+    """
+    pks = _claim(worker, batch_size or settings.JOB_BATCH_SIZE)
+    if executor is None:
+        results = [execute(pk) for pk in pks]
+    else:
+        futures = [executor.submit(_execute_in_worker, pk) for pk in pks]
+        results = [future.result() for future in futures]
+    done = sum(results)
+    return done, len(results) - done
+
+
+def run_worker(worker, executor, max_workers, once=False, interval=1,
+               report=None):
+    """
+    Выполняет задачи в executor, пока его не остановят, а с once — пока
+    есть готовые задачи.
+
+    Как только в пуле освобождается место, забирается столько задач,
+    сколько мест свободно (но не больше JOB_BATCH_SIZE), не дожидаясь
+    остальных задач: лишние задачи остаются в очереди другим воркерам.
+    Пока задачи выполняются, они отмечаются раз в JOB_HEARTBEAT_INTERVAL.
+    Периодические задачи ставятся один раз при запуске, дальше их
+    ставит заново _finish(). report(выполнено, упало) получает итоги
+    задач, завершившихся с прошлого вызова.
+    """
+    if not once:
+        schedule_periodic()
+    running = {}
+    beaten = time.monotonic()
+    while True:
+        free = max_workers - len(running)
+        if free > 0:
+            for pk in _claim(worker, min(free, settings.JOB_BATCH_SIZE)):
+                running[executor.submit(_execute_in_worker, pk)] = pk
+        if not running:
+            if once:
+                return
+            time.sleep(interval)
+            continue
+        finished, _ = wait(
+            running, timeout=settings.JOB_HEARTBEAT_INTERVAL,
+            return_when=FIRST_COMPLETED,
+        )
+        results = [future.result() for future in finished]
+        for future in finished:
+            del running[future]
+        if time.monotonic() - beaten >= settings.JOB_HEARTBEAT_INTERVAL:
+            heartbeat(worker, list(running.values()))
+            beaten = time.monotonic()
+        if results and report is not None:
+            done = sum(results)
+            report(done, len(results) - done)
+
+
+def purge_finished_jobs():
+    """Удаляет выполненные задачи старше JOB_KEEP_FINISHED секунд."""
+    border = timezone.now() - timedelta(seconds=settings.JOB_KEEP_FINISHED)
+    Job.objects.filter(status=Job.DONE, finished__lt=border).delete()
+
+
+def job_stats():
+    """
+    Глубина очереди по статусам, задержка самой старой готовой к запуску
+    задачи и разбивка по функциям.
+    """
+    now = timezone.now()
+    stats = {status: 0 for status, _ in Job.STATUS_CHOICES}
+    for row in Job.objects.order_by().values('status').annotate(
+        count=Count('pk')
+    ):
+        stats[row['status']] = row['count']
+    oldest = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min('run_at'))['oldest']
+    stats['lag'] = (now - oldest).total_seconds() if oldest else 0
+    hour_ago = now - timedelta(hours=1)
+    stats['done_last_hour'] = Job.objects.filter(
+        status=Job.DONE, finished__gte=hour_ago
+    ).count()
+    stats['failed_last_hour'] = Job.objects.filter(
+        status=Job.FAILED, finished__gte=hour_ago
+    ).count()
+    stats['by_name'] = list(
+        Job.objects.order_by().values('name', 'status').annotate(
+            count=Count('pk')
+        ).order_by('name', 'status')
+    )
+    return stats
@@ -0,0 +1,151 @@
+"""
+Очередь исходящей почты.
+
+QueuedEmailBackend не ходит в сеть: письма сохраняются в таблицу
+QueuedEmail, и запрос сразу возвращается. Доставку выполняет воркер
+``manage.py send_queued_mail`` или периодическая фоновая задача
+drain_queued_mail пачками через настоящий бэкенд
+из ``QUEUED_EMAIL_BACKEND``, повторяя неудачные попытки с нарастающей
+задержкой.
+"""
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+
+def _queued(message, now):
+    message.connection = None
+    return QueuedEmail(
+        message=pickle.dumps(message, pickle.HIGHEST_PROTOCOL),
+        subject=str(message.subject)[:255],
+        recipients=', '.join(message.recipients()),
+        next_attempt=now,
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        queued = [
+            _queued(message, now)
+            for message in email_messages
+            if message.recipients()
+        ]
+        QueuedEmail.objects.bulk_create(queued)
+        return len(queued)
+
+
+def _claim(batch_size):
+    """Забирает пачку писем, не отданную другому воркеру."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.QUEUED_EMAIL_LOCK_TIMEOUT)
+    candidates = QueuedEmail.objects.filter(
+        status=QueuedEmail.QUEUED, next_attempt__lte=now
+    ) | QueuedEmail.objects.filter(
+        status=QueuedEmail.SENDING, next_attempt__lte=stale
+    )
+    claimed = []
+    for email in candidates.order_by('next_attempt')[:batch_size]:
+        taken = QueuedEmail.objects.filter(
+            pk=email.pk, status=email.status, next_attempt=email.next_attempt
+        ).update(status=QueuedEmail.SENDING, next_attempt=now)
+        if taken:
+            claimed.append(email)
+    return claimed
+
+
+def _retry_delay(attempts):
+    return timedelta(
+        seconds=settings.QUEUED_EMAIL_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def _fail(email, error):
+    email.last_error = repr(error)
+    if email.attempts >= settings.QUEUED_EMAIL_MAX_ATTEMPTS:
+        email.status = QueuedEmail.FAILED
+    else:
+        email.status = QueuedEmail.QUEUED
+        email.next_attempt = timezone.now() + _retry_delay(email.attempts)
+
+
+def _save(email):
+    email.save(update_fields=(
+        'status', 'attempts', 'last_error', 'next_attempt', 'sent'
+    ))
+
+
+def deliver_queued_mail(batch_size=None):
+    """
+    Отправляет одну пачку писем. Возвращает пару (отправлено, ошибок).
+
+    Если не удалось даже открыть соединение, вся пачка возвращается в
+    очередь как неудачная попытка, а не ждёт QUEUED_EMAIL_LOCK_TIMEOUT.
+    """
+    batch = _claim(batch_size or settings.QUEUED_EMAIL_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+    try:
+        connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+        connection.open()
+    except Exception as error:
+        for email in batch:
+            email.attempts += 1
+            _fail(email, error)
+            _save(email)
+        return 0, len(batch)
+    sent = failed = 0
+    try:
+        for email in batch:
+            email.attempts += 1
+            try:
+                message = pickle.loads(email.message)
+                message.connection = connection
+                message.send()
+            except Exception as error:
+                failed += 1
+                _fail(email, error)
+            else:
+                sent += 1
+                email.status = QueuedEmail.SENT
+                email.sent = timezone.now()
+                email.last_error = ''
+            _save(email)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def drain_queued_mail(batch_size=None):
+    """Отправляет пачки, пока очередь не опустеет."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = deliver_queued_mail(batch_size)
+        if not sent and not failed:
+            return total_sent, total_failed
+        total_sent += sent
+        total_failed += failed
+
+
+def queue_stats():
+    """Глубина очереди по статусам и возраст самого старого письма."""
+    stats = {status: 0 for status, _ in QueuedEmail.STATUS_CHOICES}
+    rows = QueuedEmail.objects.order_by().values('status').annotate(
+        count=Count('pk'), oldest=Min('created')
+    )
+    oldest = None
+    for row in rows:
+        stats[row['status']] = row['count']
+        if row['status'] == QueuedEmail.QUEUED:
+            oldest = row['oldest']
+    stats['oldest_queued_age'] = (
+        (timezone.now() - oldest).total_seconds() if oldest else 0
+    )
+    return stats
@@ -0,0 +1,94 @@
+import gzip
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import resolve
+from django.utils.cache import get_cache_key
+
+from core.compression import (
+    CompressedPageMiddleware, brotli, compress, minify,
+)
+from posts.models import Group, Post
+
+
+def cpu_ms(func, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) * 1000 / repeat
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер страниц без обработки, после минификации и '
+        'сжатия, и процессорное время на сжатие: на каждый запрос и '
+        'для кешируемых страниц, где сжатые варианты берутся из кеша.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', action='append', default=[],
+            help='Адрес для замера; можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Сколько раз повторить каждый замер.',
+        )
+
+    def default_urls(self):
+        urls = ['/']
+        post = Post.objects.select_related('author').first()
+        if post is not None:
+            urls.append(f'/profile/{post.author.username}/')
+        group = Group.objects.first()
+        if group is not None:
+            urls.append(f'/group/{group.slug}/')
+        return urls
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        client = Client(HTTP_ACCEPT_ENCODING='br, gzip')
+        if brotli is None:
+            self.stdout.write('brotli не установлен, сравнение только с gzip')
+        for url in options['url'] or self.default_urls():
+            # Вьюха без декоратора: исходный HTML, как его отдаёт шаблон.
+            view = resolve(url)
+            raw = view.func.__wrapped__(
+                client.get(url).wsgi_request, *view.args, **view.kwargs
+            ).content
+            minified = minify(raw.decode()).encode()
+            packed = gzip.compress(minified, 9)
+            sizes = [
+                f'исходный {len(raw)} Б',
+                f'минифицированный {len(minified)} Б',
+                f'gzip {len(packed)} Б',
+            ]
+            if brotli is not None:
+                sizes.append(f'br {len(brotli.compress(minified))} Б')
+            self.stdout.write(f'{url}: {", ".join(sizes)}')
+
+            on_the_fly = cpu_ms(
+                lambda: compress(
+                    raw, CompressedPageMiddleware.gzip_level,
+                    CompressedPageMiddleware.brotli_quality,
+                ),
+                repeat,
+            )
+            middleware = cpu_ms(lambda: gzip.compress(raw, 6), repeat)
+            self.stdout.write(
+                f'  процессор на запрос: GZipMiddleware {middleware:.3f} мс, '
+                f'сжатие на лету (gzip и br) {on_the_fly:.3f} мс'
+            )
+            cache.clear()
+            request = client.get(url).wsgi_request
+            if get_cache_key(request) is not None:
+                hit = cpu_ms(lambda: client.get(url), repeat)
+                self.stdout.write(
+                    f'  страница кешируется: ответ из кеша {hit:.3f} мс '
+                    f'целиком, на сжатие 0 мс'
+                )
+            self.stdout.write(
+                f'  экономия трафика: {len(raw) - len(packed)} Б на ответ'
+            )
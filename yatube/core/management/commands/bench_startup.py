@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе, чтобы замерить холодный старт.
+PROBE = '''
+import json
+import sys
+import time
+
+import django
+from django.test import RequestFactory
+
+django.setup()
+start = time.perf_counter()
+if sys.argv[1] == 'warm':
+    from yatube.wsgi import application
+else:
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+startup = time.perf_counter() - start
+
+from posts.models import Group, Post
+
+urls = json.loads(sys.argv[2])
+if not urls:
+    urls = ['/', '/about/author/', '/about/tech/']
+    post = Post.objects.select_related('author', 'group').first()
+    if post is not None:
+        urls.append(f'/posts/{post.pk}/')
+        urls.append(f'/profile/{post.author.username}/')
+    group = Group.objects.first()
+    if group is not None:
+        urls.append(f'/group/{group.slug}/')
+
+factory = RequestFactory()
+result = {'startup': startup, 'requests': []}
+for url in urls:
+    timings = []
+    for _ in range(2):
+        environ = factory.get(url).environ
+        start = time.perf_counter()
+        status = []
+        response = application(environ, lambda s, h, *a: status.append(s))
+        for _ in response:
+            pass
+        response.close()
+        timings.append(time.perf_counter() - start)
+    result['requests'].append([url, status[0], *timings])
+print(json.dumps(result))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет холодный старт WSGI-приложения в отдельном процессе: '
+        'время импорта по приложениям и задержку первого и второго '
+        'запроса к основным страницам, без прогрева и с прогревом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', action='append', default=[],
+            help='Адрес для замера; можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Сколько пакетов показать в отчёте об импорте.',
+        )
+
+    def handle(self, *args, **options):
+        for mode in ('cold', 'warm'):
+            self.stdout.write(f'== {mode} ==')
+            imports, result = self.probe(mode, options['url'])
+            if mode == 'cold':
+                self.report_imports(imports, options['top'])
+            self.stdout.write(
+                f'загрузка WSGI-приложения: {result["startup"] * 1000:.1f} мс'
+            )
+            for url, status, first, second in result['requests']:
+                self.stdout.write(
+                    f'{url}: {status}, первый запрос {first * 1000:.1f} мс, '
+                    f'второй {second * 1000:.1f} мс'
+                )
+
+    def probe(self, mode, urls):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, mode,
+             json.dumps(urls)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr[-2000:])
+        imports = Counter()
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            own, _, name = line[len('import time:'):].split('|')
+            if own.strip().isdigit():
+                imports[name.strip().split('.')[0]] += int(own)
+        return imports, json.loads(process.stdout.splitlines()[-1])
+
+    def report_imports(self, imports, top):
+        self.stdout.write(
+            f'импорт всего: {sum(imports.values()) / 1000:.1f} мс'
+        )
+        for package, microseconds in imports.most_common(top):
+            self.stdout.write(f'  {package}: {microseconds / 1000:.1f} мс')
@@ -0,0 +1,64 @@
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import job_stats, process_pool, run_worker
+
+POOLS = {
+    'thread': ThreadPoolExecutor,
+    'process': process_pool,
+}
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из таблицы Job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOB_WORKERS,
+            help='Сколько задач выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--pool', choices=sorted(POOLS), default='thread',
+            help='Пул потоков или процессов.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1,
+            help='Пауза, когда очередь пуста, секунды.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Только показать состояние очереди.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = job_stats()
+            for row in stats.pop('by_name'):
+                self.stdout.write(
+                    f'{row["name"]} [{row["status"]}]: {row["count"]}'
+                )
+            for name, value in stats.items():
+                self.stdout.write(f'{name}: {value}')
+            return
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        with POOLS[options['pool']](max_workers=options['workers']) as pool:
+            try:
+                run_worker(
+                    worker, pool, options['workers'],
+                    once=options['once'],
+                    interval=options['interval'],
+                    report=self.report,
+                )
+            except KeyboardInterrupt:
+                self.stdout.write('Остановлено.')
+
+    def report(self, done, failed):
+        self.stdout.write(f'Выполнено: {done}, упало: {failed}')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import drain_queued_mail, queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди QueuedEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько писем отправлять за один проход.',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, как фоновый воркер.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проходами в режиме --loop, секунды.',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Только показать глубину очереди.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, value in queue_stats().items():
+                self.stdout.write(f'{name}: {value}')
+            return
+        while True:
+            sent, failed = drain_queued_mail(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Отправлено: {sent}, ошибок: {failed}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
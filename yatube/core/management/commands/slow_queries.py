@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import aggregate, read_log
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает самые дорогие по суммарному времени запросы из '
+        'журнала медленных запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Сколько отпечатков показать.',
+        )
+        parser.add_argument(
+            '--file', help='Файл журнала вместо SLOW_QUERY_LOG_FILE.',
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Выводить план выполнения запросов.',
+        )
+
+    def handle(self, *args, **options):
+        stats = aggregate(read_log(options['file']))
+        if not stats:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        for entry in stats[:options['top']]:
+            self.stdout.write(
+                f'[{entry["fingerprint"]}] всего {entry["total_ms"]:.1f} мс, '
+                f'запросов {entry["count"]}, '
+                f'в среднем {entry["total_ms"] / entry["count"]:.1f} мс, '
+                f'максимум {entry["max_ms"]:.1f} мс'
+            )
+            self.stdout.write(f'  вьюхи: {", ".join(sorted(entry["views"]))}')
+            self.stdout.write(f'  {entry["sql"]}')
+            self.stdout.write(f'  параметры: {entry["params"]}')
+            if options['plans'] and entry['plan']:
+                for line in entry['plan']:
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,23 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .slow_queries import wrap_connections
+
+
+class SlowQueryMiddleware:
+    """Пишет в журнал запросы к базе дольше SLOW_QUERY_THRESHOLD_MS."""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            for wrapper in wrap_connections(
+                request, settings.SLOW_QUERY_THRESHOLD_MS
+            ):
+                stack.enter_context(wrapper)
+            return self.get_response(request)
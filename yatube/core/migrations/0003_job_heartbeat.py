@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-19 17:41
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_running(apps, schema_editor):
+    Job = apps.get_model('core', 'Job')
+    Job.objects.filter(status='running').update(heartbeat=F('started'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, help_text='Воркер отмечает задачу, пока она выполняется.', null=True, verbose_name='Воркер жив'),
+        ),
+        migrations.RunPython(mark_running, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,110 @@
+from django.db import models
+
+
+class QueuedEmail(models.Model):
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    message = models.BinaryField(verbose_name='Письмо')
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    recipients = models.TextField(verbose_name='Получатели')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Поставлено в очередь')
+    next_attempt = models.DateTimeField(verbose_name='Следующая попытка')
+    sent = models.DateTimeField(null=True, blank=True,
+                                verbose_name='Отправлено')
+
+    class Meta:
+        ordering = ('next_attempt',)
+        indexes = (
+            models.Index(fields=('status', 'next_attempt')),
+        )
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+
+    def __str__(self):
+        return self.subject[:15]
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=255, verbose_name='Функция')
+    payload = models.TextField(default='{}', verbose_name='Аргументы')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Предел попыток'
+    )
+    unique_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name='Ключ уникальности',
+        help_text='Пока задача не выполнена, вторая с тем же ключом '
+                  'не ставится.'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    worker = models.CharField(max_length=100, blank=True,
+                              verbose_name='Воркер')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Поставлено в очередь')
+    run_at = models.DateTimeField(verbose_name='Запуск не раньше')
+    started = models.DateTimeField(null=True, blank=True,
+                                   verbose_name='Начато')
+    heartbeat = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Воркер жив',
+        help_text='Воркер отмечает задачу, пока она выполняется.'
+    )
+    finished = models.DateTimeField(null=True, blank=True,
+                                    verbose_name='Завершено')
+
+    class Meta:
+        ordering = ('run_at',)
+        indexes = (
+            models.Index(fields=('status', 'run_at')),
+        )
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return self.name
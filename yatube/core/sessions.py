@@ -0,0 +1,70 @@
+"""
+Сессии в кеше с отложенной записью в базу данных.
+
+Чтение сессии идёт только из кеша, в базу мы ходим лишь при промахе.
+Изменения сессии сразу попадают в кеш, а в таблицу ``django_session``
+сбрасываются не чаще раза в ``SESSION_WRITE_BEHIND_INTERVAL`` секунд.
+Создание и удаление сессии (логин, логаут) пишутся в базу сразу.
+
+Всё это имеет смысл только с кешем, общим для всех процессов. Если
+SESSION_CACHE_ALIAS смотрит в кеш процесса, сессия, изменённая в одном
+воркере, была бы не видна остальным, поэтому хранилище работает как
+обычные сессии в базе.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db, db
+
+from .caching import cache_is_shared
+
+KEY_PREFIX = 'core.sessions'
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._shared = cache_is_shared(settings.SESSION_CACHE_ALIAS)
+
+    def load(self):
+        if not self._shared:
+            return db.SessionStore.load(self)
+        return super().load()
+
+    def exists(self, session_key):
+        if not self._shared:
+            return db.SessionStore.exists(self, session_key)
+        return super().exists(session_key)
+
+    @property
+    def flushed_key(self):
+        return f'{KEY_PREFIX}.flushed.{self._get_or_create_session_key()}'
+
+    def _db_flush_due(self):
+        flushed_at = self._cache.get(self.flushed_key)
+        return (
+            flushed_at is None
+            or time.time() - flushed_at >= (
+                settings.SESSION_WRITE_BEHIND_INTERVAL
+            )
+        )
+
+    def save(self, must_create=False):
+        if not self._shared:
+            return db.SessionStore.save(self, must_create)
+        if must_create or self.session_key is None or self._db_flush_due():
+            super().save(must_create)
+            self._cache.set(
+                self.flushed_key, time.time(), self.get_expiry_age()
+            )
+            return
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        super().delete(session_key)
+        if session_key is not None:
+            self._cache.delete(f'{KEY_PREFIX}.flushed.{session_key}')
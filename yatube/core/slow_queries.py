@@ -0,0 +1,199 @@
+"""
+Журнал медленных запросов к базе.
+
+SlowQueryMiddleware оборачивает каждый запрос к сайту в
+``connection.execute_wrapper``: SQL-запрос дольше SLOW_QUERY_THRESHOLD_MS
+попадает в журнал с именем вьюхи, отпечатком SQL (литералы и списки IN
+заменены на ``?``), образцом параметров и планом выполнения. План
+снимается один раз на отпечаток в процессе.
+
+Записи копятся в кольцевом буфере процесса (recent()) и дописываются
+строками JSON в SLOW_QUERY_LOG_FILE, общий для всех воркеров. Файл
+больше SLOW_QUERY_LOG_MAX_BYTES переименовывается в ``.1``. Команда
+slow_queries сводит записи по отпечаткам и показывает худшие.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+PARAMS_SAMPLE_LENGTH = 200
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_buffer = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+_explained = set()
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def normalize(sql):
+    """SQL без литералов: одинаковые по форме запросы совпадают."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def recent():
+    """Последние медленные запросы этого процесса, новые в конце."""
+    with _lock:
+        return list(_buffer)
+
+
+def _explain(connection, sql, params):
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            ]
+    except Exception:
+        logger.debug('EXPLAIN не выполнен', exc_info=True)
+        return None
+    finally:
+        _local.explaining = False
+
+
+def _write(record):
+    path = settings.SLOW_QUERY_LOG_FILE
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with _lock:
+        try:
+            if os.path.getsize(path) > settings.SLOW_QUERY_LOG_MAX_BYTES:
+                os.replace(path, path + '.1')
+        except FileNotFoundError:
+            pass
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(line)
+
+
+def read_log(path=None):
+    """Записи из файла журнала и его предыдущей части, старые первыми."""
+    path = path or settings.SLOW_QUERY_LOG_FILE
+    for name in (path + '.1', path):
+        try:
+            with open(name, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def aggregate(records):
+    """
+    Сводка по отпечаткам, по убыванию суммарного времени: число
+    запросов, суммарное и максимальное время, вьюхи, пример SQL и план.
+    """
+    stats = {}
+    for record in records:
+        entry = stats.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': record['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+            'params': record['params'],
+            'plan': None,
+        })
+        entry['count'] += 1
+        entry['total_ms'] += record['duration_ms']
+        if record['duration_ms'] >= entry['max_ms']:
+            entry['max_ms'] = record['duration_ms']
+            entry['params'] = record['params']
+        entry['views'].add(record['view'])
+        entry['plan'] = record.get('plan') or entry['plan']
+    return sorted(
+        stats.values(), key=lambda entry: entry['total_ms'], reverse=True
+    )
+
+
+class SlowQueryRecorder:
+    """execute_wrapper, который замеряет запросы одного HTTP-запроса."""
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold_ms = threshold_ms
+
+    def view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        if match is not None:
+            return match.view_name
+        return self.request.path
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'explaining', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms:
+                self.record(context['connection'], sql, params, many,
+                            duration_ms)
+
+    def record(self, connection, sql, params, many, duration_ms):
+        key = fingerprint(sql)
+        plan = None
+        if not many and key not in _explained:
+            _explained.add(key)
+            plan = _explain(connection, sql, params)
+        record = {
+            'time': time.time(),
+            'view': self.view_name(),
+            'fingerprint': key,
+            'sql': normalize(sql),
+            'params': repr(params)[:PARAMS_SAMPLE_LENGTH],
+            'duration_ms': round(duration_ms, 3),
+            'plan': plan,
+        }
+        with _lock:
+            _buffer.append(record)
+        _write(record)
+        logger.warning(
+            'Медленный запрос %.1f мс во %s [%s]: %s',
+            duration_ms, record['view'], key, record['sql'],
+        )
+
+
+def wrap_connections(request, threshold_ms):
+    """Контекстные менеджеры execute_wrapper для всех подключений."""
+    recorder = SlowQueryRecorder(request, threshold_ms)
+    return [
+        connection.execute_wrapper(recorder)
+        for connection in connections.all()
+    ]
@@ -0,0 +1,92 @@
+"""
+Хранилище, которое называет файлы по хешу их содержимого.
+
+Файл ``posts/cat.jpg`` сохраняется как
+``posts/ab/cd/abcd…<sha256>.jpg``. Повторная загрузка той же картинки
+не создаёт новый файл, а возвращает уже существующее имя. Содержимое
+файла под таким именем никогда не меняется, поэтому его можно отдавать
+с заголовком ``Cache-Control: immutable``.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME_RE = re.compile(
+    r'^(?:.+/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[0-9a-z]+)?$'
+)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.match(name))
+
+
+def content_hash(content):
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        digest = content_hash(content)
+        extension = os.path.splitext(filename)[1].lower()
+        return '/'.join(filter(None, (
+            directory, digest[:2], digest[2:4], digest + extension
+        )))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return self._save(name, content).replace('\\', '/')
+
+    def _save(self, name, content):
+        """
+        Пишет файл во временный и атомарно переименовывает его.
+
+        Если два процесса одновременно сохраняют одну и ту же картинку,
+        оба пишут одинаковые байты, и победитель не важен.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        if not os.path.isdir(directory):
+            if self.directory_permissions_mode is not None:
+                old_umask = os.umask(0)
+                try:
+                    os.makedirs(
+                        directory, self.directory_permissions_mode,
+                        exist_ok=True
+                    )
+                finally:
+                    os.umask(old_umask)
+            else:
+                os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+
+post_image_storage = ContentAddressedStorage()
@@ -0,0 +1,90 @@
+import gzip
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.compression import accepted_encodings, minify
+from posts.models import Notification, Post
+
+User = get_user_model()
+
+
+class CompressedPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        for number in range(3):
+            post = Post.objects.create(author=author, text=f'Пост {number}')
+        cls.alice = User.objects.create_user(username='alice')
+        cls.bob = User.objects.create_user(username='bob')
+        Notification.objects.create(user=cls.alice, post=post)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_minify_keeps_verbatim_tags(self):
+        """Отступы убираются, содержимое textarea и pre — нет."""
+        html = (
+            '<div>\n    <p>текст</p>\n\n    <textarea>\n  a\n</textarea>\n'
+            '  <pre>\n  b</pre>\n</div>\n'
+        )
+        self.assertEqual(
+            minify(html),
+            '<div>\n<p>текст</p>\n<textarea>\n  a\n</textarea>\n'
+            '<pre>\n  b</pre>\n</div>',
+        )
+
+    def test_accept_encoding_weights(self):
+        """Кодировки с q=0 не принимаются."""
+        self.assertEqual(
+            accepted_encodings('gzip;q=0, br;q=0.5, Deflate'),
+            {'br', 'deflate'},
+        )
+
+    def test_cached_page_served_precompressed(self):
+        """Главная из кеша отдаётся в gzip без повторного сжатия, тело
+        совпадает с несжатым вариантом."""
+        plain = self.client.get('/')
+        self.assertNotIn('Content-Encoding', plain)
+        with mock.patch('core.compression.gzip.compress') as compress:
+            response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+
+    def test_refused_encoding_not_used(self):
+        """Клиент, запретивший gzip, получает страницу без сжатия."""
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('Пост 0', response.content.decode())
+
+    def test_profile_compressed_on_the_fly(self):
+        """Профиль сжимается при каждом запросе."""
+        plain = self.client.get('/profile/author/')
+        response = self.client.get(
+            '/profile/author/', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_personal_pages_not_cached(self):
+        """Шапка с именем и счётчиком уведомлений одного пользователя не
+        попадает в главную другого и анонима."""
+        self.client.force_login(self.alice)
+        page = self.client.get('/').content.decode()
+        self.assertIn('Пользователь: alice', page)
+        self.assertIn('badge bg-danger', page)
+        self.client.force_login(self.bob)
+        page = self.client.get('/').content.decode()
+        self.assertIn('Пользователь: bob', page)
+        self.assertNotIn('alice', page)
+        self.assertNotIn('badge bg-danger', page)
+        self.client.logout()
+        response = self.client.get('/')
+        self.assertNotIn('Пользователь:', response.content.decode())
+        self.assertIn('Cookie', response['Vary'])
@@ -0,0 +1,215 @@
+from concurrent.futures import Future
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+User = get_user_model()
+
+calls = []
+
+
+def remember(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+def explode():
+    raise RuntimeError('сломалось')
+
+
+class InlineExecutor:
+    """Пул без потоков: тестовая транзакция видна задачам."""
+
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+class SlowFirstExecutor(InlineExecutor):
+    """Первая задача завершается только после четырёх следующих."""
+
+    def __init__(self, max_workers):
+        self.slow = None
+        self.submitted = 0
+
+    def submit(self, func, *args):
+        if self.slow is None:
+            self.slow = (Future(), func, args)
+            return self.slow[0]
+        future = super().submit(func, *args)
+        self.submitted += 1
+        if self.submitted == 4:
+            slow, func, args = self.slow
+            slow.set_result(func(*args))
+        return future
+
+
+@override_settings(
+    JOB_MAX_ATTEMPTS=2,
+    JOB_RETRY_DELAY=10,
+    JOB_PERIODIC={'core.tests.test_jobs.remember': 60},
+)
+class JobTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача сохраняется в таблицу и выполняется воркером."""
+        job = jobs.enqueue(remember, args=(1, 'два'), kwargs={'three': 3})
+        self.assertEqual(job.name, 'core.tests.test_jobs.remember')
+        self.assertEqual(calls, [])
+        self.assertEqual(jobs.run_pending('test'), (1, 0))
+        self.assertEqual(calls, [((1, 'два'), {'three': 3})])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(jobs.run_pending('test'), (0, 0))
+
+    def test_scheduled_job_waits(self):
+        """Отложенная задача не берётся до своего времени."""
+        jobs.enqueue(remember, delay=60)
+        self.assertEqual(jobs.run_pending('test'), (0, 0))
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(jobs.run_pending('test'), (1, 0))
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача повторяется с задержкой, потом помечается
+        ошибкой."""
+        job = jobs.enqueue(explode)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending('test'), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=9))
+        later = timezone.now() + timedelta(seconds=30)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            with self.assertLogs('core.jobs', 'ERROR'):
+                self.assertEqual(jobs.run_pending('test'), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('сломалось', job.last_error)
+
+    def test_claimed_job_not_taken_twice(self):
+        """Задачу в работе другой воркер не забирает, пока она не
+        зависла."""
+        job = jobs.enqueue(remember)
+        self.assertEqual(jobs._claim('first', 10), [job.pk])
+        self.assertEqual(jobs._claim('second', 10), [])
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(jobs._claim('second', 10), [job.pk])
+
+    def test_heartbeat_keeps_long_job(self):
+        """Долгую задачу живого воркера другой воркер не забирает."""
+        job = jobs.enqueue(remember)
+        start = timezone.now()
+        jobs._claim('first', 10)
+        with mock.patch('django.utils.timezone.now',
+                        return_value=start + timedelta(minutes=4)):
+            jobs.heartbeat('first', [job.pk])
+        with mock.patch('django.utils.timezone.now',
+                        return_value=start + timedelta(minutes=8)):
+            self.assertEqual(jobs._claim('second', 10), [])
+        with mock.patch('django.utils.timezone.now',
+                        return_value=start + timedelta(minutes=10)):
+            self.assertEqual(jobs._claim('second', 10), [job.pk])
+
+    def test_slow_job_does_not_block_others(self):
+        """Пока первая задача выполняется, воркер забирает следующие, но
+        не больше, чем у него свободных мест."""
+        for number in range(1, 6):
+            jobs.enqueue(remember, args=(number,))
+        reports = []
+        with mock.patch('core.jobs._execute_in_worker', jobs.execute), \
+                mock.patch('core.jobs._claim', wraps=jobs._claim) as claim:
+            jobs.run_worker(
+                'test', SlowFirstExecutor(2), 2, once=True,
+                report=lambda *counts: reports.append(counts),
+            )
+        self.assertEqual(
+            [batch_size for (_, batch_size), _ in claim.call_args_list],
+            [2, 1, 1, 1, 2],
+        )
+        self.assertEqual(
+            [args for args, _ in calls], [(2,), (3,), (4,), (5,), (1,)]
+        )
+        self.assertEqual(sum(done for done, _ in reports), 5)
+        self.assertEqual(
+            Job.objects.filter(status=Job.DONE).count(), 5
+        )
+
+    def test_periodic_scheduled_once(self):
+        """Периодические задачи ставятся при запуске воркера, а не на
+        каждом проходе цикла."""
+        with mock.patch('core.jobs._execute_in_worker', jobs.execute), \
+                mock.patch('core.jobs.schedule_periodic',
+                           wraps=jobs.schedule_periodic) as schedule, \
+                mock.patch('core.jobs.time.sleep',
+                           side_effect=[None, None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                jobs.run_worker('test', InlineExecutor(2), 2)
+        schedule.assert_called_once_with()
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(Job.objects.filter(status=Job.QUEUED).exists())
+
+    def test_unique_key(self):
+        """Пока задача с ключом не выполнена, вторая не ставится."""
+        first = jobs.enqueue(remember, unique_key='key')
+        self.assertEqual(jobs.enqueue(remember, unique_key='key'), first)
+        jobs.run_pending('test')
+        self.assertNotEqual(jobs.enqueue(remember, unique_key='key'), first)
+
+    def test_periodic_job_rescheduled(self):
+        """Периодическая задача после выполнения ставится заново."""
+        jobs.schedule_periodic()
+        jobs.schedule_periodic()
+        self.assertEqual(Job.objects.count(), 1)
+        jobs.run_pending('test')
+        self.assertEqual(len(calls), 1)
+        following = Job.objects.get(status=Job.QUEUED)
+        self.assertGreater(
+            following.run_at, timezone.now() + timedelta(seconds=50)
+        )
+
+    def test_run_workers_once(self):
+        """run_workers --once выполняет готовые задачи и выходит."""
+        jobs.enqueue(remember, args=(1,))
+        jobs.enqueue(remember, args=(2,))
+        out = StringIO()
+        with mock.patch.dict(
+            'core.management.commands.run_workers.POOLS',
+            {'thread': InlineExecutor},
+        ), mock.patch('core.jobs._execute_in_worker', jobs.execute):
+            call_command('run_workers', once=True, stdout=out)
+        self.assertEqual(sorted(args for args, _ in calls), [(1,), (2,)])
+        self.assertIn('Выполнено: 2', out.getvalue())
+
+    def test_stats_view_for_staff_only(self):
+        """Страница состояния очереди доступна только персоналу."""
+        jobs.enqueue(remember)
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/admin/jobs/').status_code, 302)
+        user.is_staff = True
+        user.save()
+        self.client.force_login(user)
+        response = self.client.get('/admin/jobs/')
+        self.assertEqual(response.context['stats'][Job.QUEUED], 1)
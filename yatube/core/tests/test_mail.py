@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from core.mail import deliver_queued_mail, queue_stats
+from core.models import QueuedEmail
+
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    QUEUED_EMAIL_BACKEND=LOCMEM_BACKEND,
+)
+class QueuedEmailTests(TestCase):
+    def send(self):
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+
+    def test_send_mail_only_queues(self):
+        """send_mail кладёт письмо в очередь и ничего не отправляет."""
+        self.send()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(queue_stats()[QueuedEmail.QUEUED], 1)
+
+    def test_deliver_queued_mail(self):
+        """Воркер доставляет письмо через настоящий бэкенд."""
+        self.send()
+        self.assertEqual(deliver_queued_mail(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
+        self.assertEqual(
+            QueuedEmail.objects.get().status, QueuedEmail.SENT
+        )
+
+    @override_settings(QUEUED_EMAIL_MAX_ATTEMPTS=2)
+    def test_failed_delivery_is_retried(self):
+        """Неудачная отправка откладывается, а после лимита — ошибка."""
+        self.send()
+        with mock.patch.object(
+            mail.EmailMessage, 'send', side_effect=OSError('down')
+        ):
+            self.assertEqual(deliver_queued_mail(), (0, 1))
+            email = QueuedEmail.objects.get()
+            self.assertEqual(email.status, QueuedEmail.QUEUED)
+            self.assertEqual(deliver_queued_mail(), (0, 0))
+            QueuedEmail.objects.update(next_attempt=email.created)
+            self.assertEqual(deliver_queued_mail(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, QueuedEmail.FAILED)
+        self.assertEqual(email.attempts, 2)
+
+    def test_connection_failure_requeues_batch(self):
+        """Если соединение не открылось, письма сразу возвращаются в
+        очередь с засчитанной попыткой и текстом ошибки."""
+        self.send()
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.open',
+            side_effect=OSError('refused'),
+        ):
+            self.assertEqual(deliver_queued_mail(), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.status, QueuedEmail.QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('refused', email.last_error)
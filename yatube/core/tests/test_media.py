@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import Client, TestCase, override_settings
+
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = b'0123456789' * 10
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post(author=cls.user, text='Пост с картинкой')
+        cls.post.image.save('cat.jpg', ContentFile(CONTENT))
+        cls.url = f'/media/{cls.post.image.name}'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_full_file(self):
+        """Картинка поста отдаётся целиком с долгим кешированием."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_range(self):
+        """Заголовок Range отдаёт только запрошенные байты."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_not_modified(self):
+        """Не изменившийся файл отдаётся ответом 304."""
+        response = self.client.get(self.url)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx')
+    def test_accel_redirect(self):
+        """С nginx файл отдаёт фронтенд по X-Accel-Redirect."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            f'/protected-media/{self.post.image.name}'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_unreferenced_file_is_hidden(self):
+        """Файл, на который не ссылается пост, не отдаётся."""
+        storage = Post._meta.get_field('image').storage
+        name = storage.save('posts/orphan.jpg', ContentFile(b'orphan'))
+        self.assertEqual(self.client.get(f'/media/{name}').status_code, 404)
+        self.assertEqual(
+            self.client.get('/media/../manage.py').status_code, 404
+        )
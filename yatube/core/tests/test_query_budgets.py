@@ -0,0 +1,196 @@
+import difflib
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+from core.slow_queries import normalize
+from posts.models import Comment, Follow, Group, Notification, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+# Сколько постов в фикстуре: меньше страницы, ровно страница, несколько.
+SIZES = (1, settings.POSTS_ON_PAGE, settings.POSTS_ON_PAGE * 3)
+
+# Предел времени ответа, секунды; с запасом, чтобы тест не мигал.
+MAX_RENDER_SECONDS = 1.0
+
+# Бюджет запросов на холодный кеш: сессия, пользователь и сама страница.
+# С кешем процесса (LocMemCache в настройках) сессия читается из базы
+# всегда, см. core.caching.
+# Число запросов не должно зависеть от размера фикстуры.
+BUDGETS = {
+    'posts:main': 6,
+    'posts:rss': 2,
+    'posts:atom': 2,
+    'posts:post_create': 4,
+    'posts:groups': 7,
+    'posts:group_rss': 3,
+    'posts:group_atom': 3,
+    'posts:post_edit': 3,
+    'posts:add_comment': 3,
+    'posts:post_detail': 7,
+    'posts:follow_index': 7,
+    'posts:tag': 5,
+    'posts:notifications': 4,
+    'posts:autocomplete': 0,
+    'posts:profile_follow': 4,
+    'posts:profile_unfollow': 4,
+    'posts:profile': 9,
+    'posts:profile_rss': 3,
+    'posts:profile_atom': 3,
+    'users:signup': 3,
+    'users:logout': 4,
+    'users:login': 3,
+    'about:author': 3,
+    'about:tech': 3,
+}
+
+
+def image(number):
+    """Маленькая gif, у каждого номера своё содержимое."""
+    return SimpleUploadedFile(
+        f'{number}.gif',
+        b'GIF89a\x01\x00\x01\x00\x80\x00\x00'
+        + bytes([number % 256, number // 256 % 256, 0])
+        + b'\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D'
+        b'\x01\x00;',
+        content_type='image/gif',
+    )
+
+
+def url_names(*namespaces):
+    """Имена всех маршрутов из пространств имён."""
+    for pattern in get_resolver().url_patterns:
+        if (isinstance(pattern, URLResolver)
+                and pattern.namespace in namespaces):
+            for child in pattern.url_patterns:
+                yield f'{pattern.namespace}:{child.name}'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def populate(self, size):
+        """Дополняет фикстуру до size постов, комментариев и уведомлений."""
+        Follow.objects.get_or_create(user=self.reader, author=self.author)
+        for number in range(Post.objects.count(), size):
+            post = Post.objects.create(
+                author=self.author, group=self.group,
+                text=f'Пост {number} #тег', image=image(number),
+            )
+            Comment.objects.create(
+                post=self.first_post(), author=self.reader,
+                text=f'Комментарий {number}',
+            )
+            Notification.objects.get_or_create(user=self.reader, post=post)
+
+    def first_post(self):
+        return Post.objects.order_by('pk').first()
+
+    def urls(self):
+        post_id = self.first_post().pk
+        author = self.author.username
+        kwargs = {
+            'posts:groups': {'slug': self.group.slug},
+            'posts:tag': {'tag': 'тег'},
+            'posts:group_rss': {'slug': self.group.slug},
+            'posts:group_atom': {'slug': self.group.slug},
+            'posts:post_edit': {'post_id': post_id},
+            'posts:add_comment': {'post_id': post_id},
+            'posts:post_detail': {'post_id': post_id},
+            'posts:profile_follow': {'username': author},
+            'posts:profile_unfollow': {'username': author},
+            'posts:profile': {'username': author},
+            'posts:profile_rss': {'username': author},
+            'posts:profile_atom': {'username': author},
+        }
+        return {
+            name: reverse(name, kwargs=kwargs.get(name)) for name in BUDGETS
+        }
+
+    def measure(self, url):
+        """
+        Запросы страницы на холодном кеше Django. Первый запрос создаёт
+        миниатюры, которые в работе уже существуют, поэтому он тоже идёт
+        мимо кеша страниц; LRU миниатюр процесса cache.clear() не
+        сбрасывает.
+        """
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.client.get(url)
+        cache.clear()
+        self.client.force_login(self.reader)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = self.client.get(url)
+            elapsed = time.perf_counter() - start
+        self.assertLess(response.status_code, 400, url)
+        return [normalize(query['sql']) for query in context], elapsed
+
+    def test_every_view_has_budget(self):
+        """У каждой страницы posts, users и about есть бюджет запросов."""
+        self.assertEqual(
+            set(url_names('posts', 'users', 'about')), set(BUDGETS)
+        )
+
+    def test_query_budgets(self):
+        """Число запросов страниц не растёт с размером данных и не
+        превышает бюджет, время ответа — в пределах нормы."""
+        baseline = {}
+        for size in SIZES:
+            self.populate(size)
+            for name, url in self.urls().items():
+                with self.subTest(view=name, size=size):
+                    queries, elapsed = self.measure(url)
+                    self.assertLess(
+                        elapsed, MAX_RENDER_SECONDS,
+                        f'{url} отвечает {elapsed:.2f} с',
+                    )
+                    expected = baseline.setdefault(name, queries)
+                    if (len(queries) > BUDGETS[name]
+                            or len(queries) != len(expected)):
+                        self.fail(self.report(
+                            name, url, size, expected, queries
+                        ))
+
+    def report(self, name, url, size, expected, queries):
+        diff = '\n'.join(difflib.unified_diff(
+            expected, queries,
+            f'{SIZES[0]} пост(ов)', f'{size} пост(ов)', lineterm='',
+        ))
+        listing = '\n'.join(
+            f'{number:3}. {sql}' for number, sql in enumerate(queries, 1)
+        )
+        return (
+            f'{name} ({url}): {len(queries)} запросов при {size} постах, '
+            f'бюджет {BUDGETS[name]}, при {SIZES[0]} — {len(expected)}.\n'
+            f'Разница:\n{diff or "(нет)"}\nВсе запросы:\n{listing}'
+        )
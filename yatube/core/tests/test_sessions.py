@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.backends import user_cache_key
+
+User = get_user_model()
+
+# Файловый кеш общий для всех процессов на машине, как Redis или
+# Memcached в бою.
+SHARED_CACHE_DIR = tempfile.mkdtemp()
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+    }
+}
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CachedSessionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth', password='1234')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SHARED_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(username='auth', password='1234')
+
+    def test_authorized_request_without_queries(self):
+        """Сессия и пользователь читаются из кеша без запросов в базу."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.context['user'].username, 'auth')
+
+    def test_user_cache_invalidated_on_password_change(self):
+        """Смена пароля сбрасывает закешированного пользователя."""
+        self.authorized_client.get(reverse('about:author'))
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.authorized_client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+
+class PerProcessCacheSessionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth', password='1234')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(username='auth', password='1234')
+
+    def test_user_and_session_read_from_database(self):
+        """С кешем процесса пользователь не кешируется, а сессия сразу
+        пишется в базу: другие воркеры его сброса не увидели бы."""
+        self.authorized_client.get(reverse('about:author'))
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        session = self.authorized_client.session
+        session['seen'] = True
+        session.save()
+        self.assertTrue(
+            Session.objects.get(
+                session_key=session.session_key
+            ).get_decoded()['seen']
+        )
+        # Смена пароля «в другом воркере», мимо сигналов этого процесса.
+        User.objects.filter(pk=self.user.pk).update(password='!')
+        response = self.authorized_client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
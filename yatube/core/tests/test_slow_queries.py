@@ -0,0 +1,57 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.slow_queries import aggregate, fingerprint, normalize, read_log
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_file = os.path.join(directory.name, 'slow.log')
+
+    def test_fingerprint_ignores_literals(self):
+        """Запросы одной формы с разными литералами дают один отпечаток."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE id IN (%s, %s) AND a = 'x'"),
+            'SELECT * FROM t WHERE id IN (...) AND a = ?',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id = 1 LIMIT 20'),
+            fingerprint('SELECT * FROM t  WHERE id = 25 LIMIT 10'),
+        )
+
+    def test_slow_request_is_logged_with_plan(self):
+        """Медленный запрос пишется в файл с вьюхой и планом, команда
+        показывает его в сводке."""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0,
+                               SLOW_QUERY_LOG_FILE=self.log_file):
+            with self.assertLogs('core.slow_queries', 'WARNING'):
+                self.client.get('/')
+        records = list(read_log(self.log_file))
+        self.assertTrue(records)
+        views = {record['view'] for record in records}
+        self.assertIn('posts:main', views)
+        self.assertTrue(any(record['plan'] for record in records))
+        stats = aggregate(records)
+        self.assertEqual(
+            sum(entry['count'] for entry in stats), len(records)
+        )
+        out = StringIO()
+        call_command('slow_queries', file=self.log_file, plans=True,
+                     stdout=out)
+        self.assertIn(stats[0]['fingerprint'], out.getvalue())
+
+    def test_fast_queries_are_not_logged(self):
+        """Запросы быстрее порога в журнал не попадают."""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=10 ** 6,
+                               SLOW_QUERY_LOG_FILE=self.log_file):
+            self.client.get('/about/author/')
+            self.client.get('/')
+        self.assertEqual(list(read_log(self.log_file)), [])
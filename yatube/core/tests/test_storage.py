@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.storage import ContentAddressedStorage, is_hashed_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.storage = ContentAddressedStorage()
+
+    def test_name_is_content_hash(self):
+        """Файл получает имя по хешу в шардированном каталоге."""
+        name = self.storage.save('posts/cat.JPG', ContentFile(b'cat'))
+        self.assertTrue(name.startswith('posts/'))
+        self.assertTrue(name.endswith('.jpg'))
+        self.assertTrue(is_hashed_name(name))
+        with self.storage.open(name) as saved:
+            self.assertEqual(saved.read(), b'cat')
+
+    def test_identical_uploads_are_deduplicated(self):
+        """Одинаковое содержимое сохраняется в один файл."""
+        first = self.storage.save('posts/a.jpg', ContentFile(b'same'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'same'))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core.thumbnail_kvstore import KVStore
+
+
+class WorkerKVStore(KVStore):
+    """Хранилище «отдельного процесса» со своим клиентом кеша."""
+
+    def __init__(self, worker_cache):
+        super().__init__()
+        self.worker_cache = worker_cache
+
+    @property
+    def cache(self):
+        return self.worker_cache
+
+
+@override_settings(THUMBNAIL_LRU_SIZE=2, THUMBNAIL_LRU_CHECK_INTERVAL=0)
+class ThumbnailKVStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = KVStore()
+
+    def test_lru_hit_skips_cache_and_db(self):
+        """Повторное чтение ключа обходится без кеша и базы."""
+        key = add_prefix('posts/cat.jpg')
+        self.store._set_raw(key, '{"size": [960, 339]}')
+        cache.delete(key)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.store._get_raw(key), '{"size": [960, 339]}'
+            )
+
+    def test_lru_is_bounded(self):
+        """Старые ключи вытесняются из LRU."""
+        for name in ('a', 'b', 'c'):
+            self.store._set_raw(add_prefix(name), name)
+        self.assertEqual(
+            list(self.store._lru), [add_prefix('b'), add_prefix('c')]
+        )
+
+    def test_delete_invalidates_other_workers(self):
+        """Удаление ключа сбрасывает LRU других процессов, если у них
+        общий кеш: здесь каждый воркер со своим клиентом файлового
+        кеша поверх одного каталога."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        worker = WorkerKVStore(FileBasedCache(location, {}))
+        other_worker = WorkerKVStore(FileBasedCache(location, {}))
+        key = add_prefix('posts/dog.jpg')
+        worker._set_raw(key, 'old')
+        self.assertEqual(other_worker._get_raw(key), 'old')
+        worker._delete_raw(key)
+        self.assertIsNone(other_worker._get_raw(key))
+
+    def test_per_process_cache_does_not_invalidate(self):
+        """С кешем процесса (LocMemCache) другой воркер сброса не видит
+        и отдаёт ключ из своего LRU — поэтому в бою нужен общий кеш."""
+        worker = WorkerKVStore(LocMemCache('worker', {}))
+        other_worker = WorkerKVStore(LocMemCache('other-worker', {}))
+        key = add_prefix('posts/dog.jpg')
+        worker._set_raw(key, 'old')
+        self.assertEqual(other_worker._get_raw(key), 'old')
+        worker._delete_raw(key)
+        self.assertEqual(other_worker._get_raw(key), 'old')
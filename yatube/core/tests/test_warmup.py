@@ -0,0 +1,79 @@
+from copy import deepcopy
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates
+from django.test import TestCase, override_settings
+
+from core.warmup import compile_templates, warm_up
+from posts import lookups
+from posts.cards import card_key, get_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+def templates(debug):
+    options = deepcopy(settings.TEMPLATES)
+    options[0]['OPTIONS']['debug'] = debug
+    return options
+
+
+def broken_step():
+    raise RuntimeError('сломанный шаг')
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_failed_step_does_not_stop_warm_up(self):
+        """Ошибка одного шага не мешает остальным и запуску."""
+        with self.assertLogs('core.warmup', 'ERROR'):
+            timings = warm_up([
+                'core.tests.test_warmup.broken_step',
+                'core.warmup.populate_resolvers',
+            ])
+        self.assertEqual(len(timings), 2)
+
+    @override_settings(WARMUP_STEPS=[
+        'core.warmup.populate_resolvers',
+        'core.warmup.compile_templates',
+        'posts.warmup.prefill_caches',
+    ])
+    def test_prefill_caches(self):
+        """После прогрева первая страница, её авторы и группы в кеше."""
+        author = User.objects.create_user(username='leo')
+        group = Group.objects.create(
+            title='Классика', slug='classics', description='Описание'
+        )
+        post = Post.objects.create(author=author, group=group, text='Текст')
+        warm_up()
+        with self.assertNumQueries(0):
+            self.assertIn(post.pk, get_cards([post.pk]))
+            self.assertEqual(lookups.authors.get('leo'), author)
+            self.assertEqual(lookups.groups.get('classics'), group)
+
+    def test_prefill_skips_thumbnails(self):
+        """Прогрев не режет миниатюры: карточку картинки без вариантов
+        строит первый запрос."""
+        author = User.objects.create_user(username='leo')
+        post = Post.objects.create(
+            author=author, text='Текст', image='posts/cover.gif'
+        )
+        with mock.patch('posts.cards.get_thumbnail') as get_thumbnail:
+            warm_up(['posts.warmup.prefill_caches'])
+        get_thumbnail.assert_not_called()
+        self.assertIsNone(cache.get(card_key(post.pk)))
+
+    def test_compile_templates_needs_cached_loader(self):
+        """Без кеширующего загрузчика шаблоны не компилируются зря."""
+        patched = mock.patch.object(DjangoTemplates, 'get_template')
+        for debug, compiled in ((True, False), (False, True)):
+            with self.subTest(debug=debug), \
+                    self.settings(TEMPLATES=templates(debug)), \
+                    patched as get_template:
+                compile_templates()
+                self.assertEqual(get_template.called, compiled)
@@ -0,0 +1,45 @@
+"""
+Бэкенд sorl-thumbnail, который умеет назвать миниатюру, не создавая её.
+
+Имя файла миниатюры sorl выводит из исходного файла, геометрии и опций.
+thumbnail_name() повторяет этот расчёт без обращений к KV-хранилищу и
+диску, поэтому шаблон может выдать ссылки на заранее созданные варианты
+картинки бесплатно. Если установлен pillow-avif-plugin, sorl учится
+сохранять миниатюры в AVIF.
+"""
+from sorl.thumbnail import base, default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+
+try:
+    import pillow_avif  # noqa: F401 (регистрирует AVIF в Pillow)
+except ImportError:
+    pass
+else:
+    base.EXTENSIONS.setdefault('AVIF', 'avif')
+
+
+def supported_formats():
+    """Форматы, в которых sorl может сохранить миниатюру."""
+    return set(base.EXTENSIONS)
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    def thumbnail_name(self, file_, geometry_string, **options):
+        """Имя, под которым get_thumbnail() сохранит миниатюру."""
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return self._get_thumbnail_filename(source, geometry_string, options)
+
+    def thumbnail_url(self, file_, geometry_string, **options):
+        return default.storage.url(
+            self.thumbnail_name(file_, geometry_string, **options)
+        )
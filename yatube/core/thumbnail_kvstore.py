@@ -0,0 +1,96 @@
+"""
+KV-хранилище sorl-thumbnail с LRU-кешем внутри процесса.
+
+Каждый тег ``{% thumbnail %}`` спрашивает у хранилища имя и размер
+готовой миниатюры. Штатный cached_db ходит за этим в кеш, а при
+промахе — в базу. Здесь перед ним стоит ограниченный LRU-словарь, так
+что повторные страницы разрешают миниатюры без сетевых обращений.
+
+Удаление ключей (замена или удаление картинки поста) увеличивает
+счётчик эпохи в кеше. Процессы сверяются с ним не чаще раза в
+``THUMBNAIL_LRU_CHECK_INTERVAL`` секунд и при расхождении очищают
+свой LRU. Другие процессы видят новую эпоху, только если кеш у них
+общий (Redis, Memcached); с LocMemCache эпоха у каждого процесса своя,
+и чужое удаление ключа его LRU не сбросит, см. core.caching.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+EPOCH_KEY = 'core.thumbnail_kvstore.epoch'
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    def __init__(self):
+        super().__init__()
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = None
+        self._checked_at = 0
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._checked_at < settings.THUMBNAIL_LRU_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        epoch = self.cache.get(EPOCH_KEY)
+        if epoch != self._epoch:
+            with self._lock:
+                self._lru.clear()
+            self._epoch = epoch
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > settings.THUMBNAIL_LRU_SIZE:
+                self._lru.popitem(last=False)
+
+    def _get_raw(self, key):
+        self._sync()
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+                return value
+        value = super()._get_raw(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self._remember(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+        self._bump_epoch()
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        with self._lock:
+            self._lru.clear()
+        self._bump_epoch()
+
+    def _bump_epoch(self):
+        self.cache.add(EPOCH_KEY, 0, None)
+        try:
+            self._epoch = self.cache.incr(EPOCH_KEY)
+        except ValueError:
+            # Ключ успели вытеснить между add и incr.
+            self.cache.set(EPOCH_KEY, 1, None)
+            self._epoch = 1
+        self._checked_at = time.monotonic()
+
+
+def forget_thumbnails(name):
+    """Удаляет миниатюры картинки и её записи в хранилище sorl."""
+    from sorl.thumbnail import delete
+
+    delete(name, delete_file=False)
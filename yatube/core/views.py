@@ -1,5 +1,28 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
-from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+from django.views.static import was_modified_since
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .jobs import job_stats
+from .storage import is_hashed_name
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 
 def page_not_found(request, *args, **kwargs):
@@ -16,3 +39,127 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def jobs(request):
+    return render(request, 'core/jobs.html', {'stats': job_stats()})
+
+
+def is_immutable_media(path):
+    """Файлы с хешем в имени и миниатюры sorl никогда не меняются."""
+    return (
+        is_hashed_name(path)
+        or path.startswith(thumbnail_settings.THUMBNAIL_PREFIX)
+    )
+
+
+def _parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном.
+
+    Возвращает (начало, конец) включительно, None — если отдавать файл
+    целиком, и False — если диапазон невыполним.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length, block_size=FileResponse.block_size):
+    with open(path, 'rb') as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(block_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, full_path, size, content_type):
+    """
+    Отдаёт файл из Python: целиком — через FileResponse, который
+    WSGI-сервер с wsgi.file_wrapper отправляет через sendfile, без
+    копирования в память процесса; по Range — кусками с диска.
+    """
+    byte_range = _parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(full_path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def _offload_response(path, full_path, content_type):
+    """Передаёт отдачу файла фронтенд-серверу."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE_BACKEND == 'nginx':
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        )
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def media(request, path, document_root=None):
+    """
+    Отдаёт файл из MEDIA_ROOT после проверки доступа.
+
+    С ``MEDIA_SENDFILE_BACKEND = 'nginx'`` или ``'apache'`` сам файл
+    отправляет фронтенд-сервер по заголовку X-Accel-Redirect или
+    X-Sendfile, иначе он отдаётся из Django с поддержкой Range.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(document_root or settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    if not import_string(settings.MEDIA_ACCESS_CHECK)(request, path):
+        raise Http404
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    if settings.MEDIA_SENDFILE_BACKEND:
+        response = _offload_response(path, full_path, content_type)
+    else:
+        response = _file_response(request, full_path, stat.st_size,
+                                  content_type)
+        response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_immutable_media(path):
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.MEDIA_IMMUTABLE_MAX_AGE,
+            immutable=True,
+        )
+    return response
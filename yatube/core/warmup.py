@@ -0,0 +1,95 @@
+"""
+Прогрев процесса при загрузке WSGI-приложения.
+
+Первые запросы к свежему воркеру платят за разбор URLconf и компиляцию
+регулярных выражений маршрутов, компиляцию шаблонов и холодные кеши.
+warm_up() выполняет шаги из WARMUP_STEPS до того, как воркер начнёт
+принимать запросы. Шаг — путь к функции без аргументов; ошибка шага
+пишется в лог и не мешает запуску.
+
+Шаги по умолчанию не трогают sorl и Pillow: они загружаются лениво, при
+первой миниатюре. Загрузить их заранее можно шагом load_thumbnail_engine.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import engines
+from django.template.exceptions import TemplateSyntaxError
+from django.template.loaders.cached import Loader as CachedLoader
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(steps=None):
+    """Выполняет шаги прогрева, возвращает время каждого в секундах."""
+    if steps is None:
+        steps = settings.WARMUP_STEPS
+    timings = {}
+    for path in steps:
+        start = time.perf_counter()
+        try:
+            import_string(path)()
+        except Exception:
+            logger.exception('Шаг прогрева %s не выполнен', path)
+        timings[path] = time.perf_counter() - start
+        logger.info('Прогрев %s: %.1f мс', path, timings[path] * 1000)
+    return timings
+
+
+def _patterns(resolver):
+    for pattern in resolver.url_patterns:
+        yield pattern
+        if isinstance(pattern, URLResolver):
+            yield from _patterns(pattern)
+
+
+def populate_resolvers():
+    """Разбирает URLconf и компилирует регулярные выражения маршрутов."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for pattern in _patterns(resolver):
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            pattern.reverse_dict
+
+
+def _template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(('.html', '.txt')):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def _caches_templates(engine):
+    loaders = getattr(getattr(engine, 'engine', None), 'template_loaders', ())
+    return any(isinstance(loader, CachedLoader) for loader in loaders)
+
+
+def compile_templates():
+    """
+    Компилирует шаблоны проекта. Без кеширующего загрузчика, который
+    Django включает сам при DEBUG = False, скомпилированные шаблоны не
+    сохраняются, и шаг ничего не делает.
+    """
+    for engine in engines.all():
+        if not _caches_templates(engine):
+            continue
+        for directory in settings.WARMUP_TEMPLATE_DIRS:
+            for name in _template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Шаблон %s не компилируется', name)
+
+
+def load_thumbnail_engine():
+    """Загружает движок миниатюр sorl, а с ним и Pillow."""
+    from sorl.thumbnail import default
+
+    default.engine
+    default.kvstore
@@ -1,55 +1,223 @@
-from django.contrib import admin
-from .models import Post, Group, Comment, Follow
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.shortcuts import render
+from django.urls import path, reverse
+from django.utils.html import format_html
 
+from core.admin_utils import (
+    PrefixSearchMixin, PreloadedAutocompleteMixin, input_filter,
+)
+from core.paginators import EstimatedCountPaginator
+from . import autocomplete
+from .deletion import delete_group, deletion_progress
+from .models import ArchivedPost, Post, Group, Comment, Follow
+from .moderation import moderation_progress, schedule_delete, schedule_move
 
-class PostAdmin(admin.ModelAdmin):
+
+class BackgroundDeleteMixin:
+    """
+    Удаляет объекты в фоне порциями вместо одного большого каскада.
+
+    Страница подтверждения не собирает все связанные объекты, а
+    показывает только удаляемые записи. Подкласс задаёт
+    ``schedule_deletion`` — функцию, которая ставит удаление объекта в
+    очередь, и ``deletion_kind`` для хода удаления.
+    """
+    deletion_kind = None
+    schedule_deletion = None
+
+    def get_deleted_objects(self, objs, request):
+        deleted_objects = [str(obj) for obj in objs]
+        model_count = {
+            self.model._meta.verbose_name_plural: len(deleted_objects)
+        }
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.model._meta.verbose_name)
+        return deleted_objects, model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.schedule_deletion(obj)
+
+    def deletion_status(self, obj):
+        progress = deletion_progress(self.deletion_kind, obj.pk)
+        if progress is None:
+            return None
+        deleted = ', '.join(
+            f'{name}: {count}' for name, count in progress['deleted'].items()
+        )
+        return f'{progress["stage"]} {deleted}'.strip()
+    deletion_status.short_description = 'Удаление'
+
+
+class LargeTableAdmin(PreloadedAutocompleteMixin, admin.ModelAdmin):
+    """Список без полного COUNT(*) и с постраничной выборкой по pk."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class MoveToGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        empty_label='без группы',
+    )
+
+
+class ModerationActionForm(ActionForm, MoveToGroupForm):
+    """Выбор действия и группы для move_to_group рядом с ним."""
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk',
                     'text',
                     'pub_date',
                     'author',
                     'group'
                     )
+    list_select_related = ('author', 'group')
     list_editable = ('group',)
+    autocomplete_fields = ('author', 'group')
+    search_fields = ('text',)
+    list_filter = ('pub_date', input_filter('author__username', 'автору'))
+    ordering = ['-pk']
+    empty_value_display = '-пусто-'
+    action_form = ModerationActionForm
+    actions = ('delete_in_background', 'move_to_group')
+
+    def get_actions(self, request):
+        # Штатное удаление поднимает каждый пост в память, его заменяет
+        # delete_in_background.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_urls(self):
+        return [
+            path(
+                'moderation/<str:batch_id>/',
+                self.admin_site.admin_view(self.moderation_view),
+                name='posts_post_moderation',
+            ),
+        ] + super().get_urls()
+
+    def moderation_view(self, request, batch_id):
+        context = dict(
+            self.admin_site.each_context(request),
+            title='Массовая модерация',
+            opts=self.model._meta,
+            progress=moderation_progress(batch_id),
+        )
+        return render(request, 'admin/posts/moderation.html', context)
+
+    def _scheduled(self, request, batch_id, message):
+        url = reverse('admin:posts_post_moderation', args=(batch_id,))
+        self.message_user(
+            request,
+            format_html('{} <a href="{}">Ход выполнения</a>', message, url),
+            messages.SUCCESS,
+        )
+
+    def delete_in_background(self, request, queryset):
+        post_ids = list(queryset.values_list('pk', flat=True))
+        batch_id = schedule_delete(post_ids)
+        self._scheduled(
+            request, batch_id,
+            f'Удаление постов поставлено в очередь: {len(post_ids)}.',
+        )
+    delete_in_background.short_description = 'Удалить выбранные в фоне'
+    delete_in_background.allowed_permissions = ('delete',)
+
+    def move_to_group(self, request, queryset):
+        form = MoveToGroupForm(request.POST)
+        if not form.is_valid():
+            self.message_user(request, 'Группа не найдена.', messages.ERROR)
+            return
+        group = form.cleaned_data['group']
+        post_ids = list(queryset.values_list('pk', flat=True))
+        batch_id = schedule_move(post_ids, group.pk if group else None)
+        self._scheduled(
+            request, batch_id,
+            f'Перенос постов в группу «{group or "без группы"}» '
+            f'поставлен в очередь: {len(post_ids)}.',
+        )
+    move_to_group.short_description = 'Перенести выбранные в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+
+class ArchivedPostAdmin(LargeTableAdmin):
+    """Архив только просматривается, переносит в него фоновая задача."""
+    list_display = ('pk',
+                    'text',
+                    'pub_date',
+                    'author',
+                    'group'
+                    )
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', input_filter('author__username', 'автору'))
+    ordering = ['-pk']
     empty_value_display = '-пусто-'
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(PrefixSearchMixin, BackgroundDeleteMixin,
+                 admin.ModelAdmin):
     list_display = ('pk',
                     'title',
                     'slug',
+                    'deletion_status',
                     )
     search_fields = ('title',)
     ordering = ['pk']
     empty_value_display = '-пусто-'
+    deletion_kind = 'group'
+    prefix_index = autocomplete.groups
+    schedule_deletion = staticmethod(delete_group)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk',
                     'post',
                     'author',
                     'text',
                     'created'
                     )
-    search_fields = ('author',)
-    list_filter = ('created', 'author',)
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    search_fields = ('=author__username',)
+    list_filter = ('created', input_filter('author__username', 'автору'))
     ordering = ['pk']
     empty_value_display = '-пусто-'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('pk',
                     'user',
                     'author',
                     )
-    search_fields = ('author', 'user')
-    list_filter = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=author__username', '=user__username')
+    list_filter = (input_filter('user__username', 'подписчику'),
+                   input_filter('author__username', 'автору'))
     ordering = ['pk']
     empty_value_display = '-пусто-'
 
 
 admin.site.register(Post, PostAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,184 @@
+"""
+Архив старых постов.
+
+Почти все запросы приходятся на свежие посты, а сортировка и индексы
+таблицы постов растут вместе со всей историей. Фоновая задача
+archive_old_posts переносит посты старше POST_ARCHIVE_AFTER_DAYS вместе
+с комментариями в таблицы ArchivedPost и ArchivedComment той же формы,
+от старых к новым. Поэтому любой архивный пост старше любого горячего,
+и общая лента — это горячие посты, а за ними архивные.
+
+post_list() отдаёт Paginator такую ленту: первые страницы читаются
+только из горячей таблицы, архив трогают лишь глубокие страницы.
+get_post_or_404() ищет пост в архиве, если его нет среди горячих.
+Архивные посты только читаются: комментировать и редактировать их
+нельзя, уведомления и теги (см. posts.tags) удаляются при переносе.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import Http404
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import lookups
+from .cards import forget_card
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Notification, Post, PostTag,
+)
+from .notifications import unread_cache_key
+from .timeline import author_key
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'posts.archive.version'
+COUNT_KEY = 'posts.archive.count.{}.{}'
+COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def archive_version():
+    """Меняется при каждом изменении архива; входит в ключи счётчиков."""
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def forget_counts():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+class PostList:
+    """
+    Горячие посты, за ними архивные — список для Paginator. Число
+    архивных постов берётся из кеша до следующего изменения архива.
+    """
+
+    def __init__(self, hot, archived, count_key):
+        self.hot = hot
+        self.archived = archived
+        self.count_key = count_key
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    def archived_count(self):
+        key = COUNT_KEY.format(archive_version(), self.count_key)
+        count = cache.get(key)
+        if count is None:
+            count = self.archived.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+
+    def count(self):
+        return self.hot_count + self.archived_count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        posts = []
+        if start < self.hot_count:
+            posts.extend(self.hot[start:stop])
+        if stop is None or stop > self.hot_count:
+            posts.extend(self.archived[
+                max(start - self.hot_count, 0):
+                None if stop is None else stop - self.hot_count
+            ])
+        return posts
+
+
+def post_list(**filters):
+    """Лента постов с фильтрами по полям поста, от новых к старым."""
+    count_key = ','.join(
+        f'{name}={getattr(value, "pk", value)}'
+        for name, value in sorted(filters.items())
+    )
+    return PostList(
+        Post.objects.filter(**filters).select_related('author', 'group'),
+        ArchivedPost.objects.filter(**filters).select_related(
+            'author', 'group'
+        ),
+        count_key,
+    )
+
+
+def get_post_or_404(post_id):
+    try:
+        return lookups.posts.get_or_404(post_id)
+    except Http404:
+        return lookups.archived_posts.get_or_404(post_id)
+
+
+def _copy(source, target, column, values):
+    """Копирует строки INSERT ... SELECT, не поднимая их в Python."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(field.column) for field in target._meta.concrete_fields
+    )
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(target._meta.db_table)} ({columns}) '
+            f'SELECT {columns} FROM {quote(source._meta.db_table)} '
+            f'WHERE {quote(column)} IN ({placeholders})',
+            values,
+        )
+
+
+def _move(pks):
+    with transaction.atomic():
+        # Блокировка не даёт добавить комментарий к переносимому посту.
+        authors = set(Post.objects.select_for_update().filter(
+            pk__in=pks
+        ).values_list('author_id', flat=True))
+        _copy(Post, ArchivedPost, 'id', pks)
+        _copy(Comment, ArchivedComment, 'post_id', pks)
+        notified = set(Notification.objects.filter(
+            post_id__in=pks
+        ).values_list('user_id', flat=True))
+        Notification.objects.filter(post_id__in=pks).delete()
+        Comment.objects.filter(post_id__in=pks).delete()
+        PostTag.objects.filter(post_id__in=pks).delete()
+        # Без сигналов удаления: картинка и её миниатюры остаются у
+        # архивной копии.
+        hot = Post.objects.filter(pk__in=pks)
+        hot._raw_delete(hot.db)
+    cache.delete_many(
+        [author_key(pk) for pk in authors]
+        + [unread_cache_key(pk) for pk in notified]
+    )
+    for pk in pks:
+        forget_card(pk)
+    lookups.posts.forget_pks(pks)
+    lookups.archived_posts.forget_pks(pks)
+
+
+def archive_old_posts(days=None, chunk_size=None):
+    """
+    Фоновая задача: переносит в архив посты старше ``days`` дней
+    (POST_ARCHIVE_AFTER_DAYS) порциями по ``chunk_size`` постов
+    (POST_ARCHIVE_CHUNK_SIZE), каждая в своей транзакции. Возвращает
+    число перенесённых постов.
+    """
+    if days is None:
+        days = settings.POST_ARCHIVE_AFTER_DAYS
+    if days is None:
+        return 0
+    chunk_size = chunk_size or settings.POST_ARCHIVE_CHUNK_SIZE
+    border = timezone.now() - timedelta(days=days)
+    old = Post.objects.filter(pub_date__lt=border).order_by(
+        'pub_date', 'pk'
+    ).values_list('pk', flat=True)
+    moved = 0
+    while True:
+        chunk = list(old[:chunk_size])
+        if not chunk:
+            break
+        _move(chunk)
+        forget_counts()
+        moved += len(chunk)
+        logger.info('В архив перенесено постов: %s', moved)
+    return moved
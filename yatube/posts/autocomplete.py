@@ -0,0 +1,233 @@
+"""
+Автодополнение авторов и групп по префиксу.
+
+Поиск ``icontains`` по таблице пользователей читает её целиком. Здесь
+каждый процесс держит в памяти отсортированный массив пар
+``(термин, id)``: имя пользователя, имя, фамилия и полное имя автора,
+название, slug и слова названия группы в нижнем регистре. Все термины
+с нужным префиксом лежат в массиве подряд, начало находит bisect, так
+что ответ стоит O(log n + limit) и не ходит в базу.
+
+Индексы строятся шагом прогрева build_indexes или при первом поиске и
+обновляются сигналами сохранения и удаления пользователей и групп.
+Обновление правит массив на месте и пишет изменение в журнал в кеше:
+счётчик версий и по ключу на каждую версию. Остальные процессы
+сверяются со счётчиком не чаще раза в AUTOCOMPLETE_CHECK_INTERVAL
+секунд и применяют пропущенные изменения; индекс строится заново, только
+если процесс отстал больше чем на AUTOCOMPLETE_MAX_CHANGES версий или
+часть журнала пропала из кеша.
+
+Журнал общий для процессов, только если кеш общий (Redis, Memcached);
+с LocMemCache каждый процесс видит лишь свои изменения, см.
+core.caching.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import Group
+
+User = get_user_model()
+
+VERSION_KEY = 'posts.autocomplete.{}.version'
+CHANGE_KEY = 'posts.autocomplete.{}.change.{}'
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class PrefixIndex:
+    """
+    Отсортированный массив терминов одной модели. Массив и описания
+    объектов меняются на месте под блокировкой, поиск берёт ту же
+    блокировку на время обхода префикса.
+    """
+
+    def __init__(self, name, queryset, fields, describe, extra_fields=()):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self.describe = describe
+        # Поля, от которых зависит, попадает ли объект в индекс.
+        self.extra_fields = extra_fields
+        self._keys = []
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._built = False
+        self._version = None
+        self._checked_at = 0
+
+    @property
+    def version_key(self):
+        return VERSION_KEY.format(self.name)
+
+    def change_key(self, version):
+        return CHANGE_KEY.format(self.name, version)
+
+    def _entry(self, values):
+        """Термины и описание объекта по значениям полей fields."""
+        item = self.describe(*values)
+        terms = set()
+        for value in item.values():
+            value = normalize(value)
+            if value:
+                terms.add(value)
+                terms.update(value.split())
+        return terms, item
+
+    def build(self):
+        keys = []
+        entries = {}
+        for pk, *values in self.queryset.values_list('pk', *self.fields):
+            entries[pk] = self._entry(values)
+            keys.extend((term, pk) for term in entries[pk][0])
+        keys.sort()
+        with self._lock:
+            self._keys, self._entries = keys, entries
+            self._built = True
+
+    def _apply(self, pk, values):
+        """
+        Убирает термины объекта pk и, если values не None, вносит их
+        заново. Вызывается под self._lock.
+        """
+        old = self._entries.pop(pk, None)
+        for term in old[0] if old else ():
+            del self._keys[bisect_left(self._keys, (term, pk))]
+        if values is not None:
+            self._entries[pk] = self._entry(values)
+            for term in self._entries[pk][0]:
+                insort(self._keys, (term, pk))
+
+    def _catch_up(self, version):
+        """
+        Применяет изменения из журнала от своей версии до version.
+        Возвращает False, если журнал начат заново, процесс отстал
+        слишком сильно или часть изменений пропала из кеша.
+        """
+        if self._version is None or not (
+            0 < version - self._version <= settings.AUTOCOMPLETE_MAX_CHANGES
+        ):
+            return False
+        keys = [
+            self.change_key(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        with self._lock:
+            for key in keys:
+                self._apply(*changes[key])
+        return True
+
+    def sync(self):
+        """Строит индекс или догоняет журнал, если индекс устарел."""
+        now = time.monotonic()
+        if (self._built and now - self._checked_at
+                < settings.AUTOCOMPLETE_CHECK_INTERVAL):
+            return
+        self._checked_at = now
+        version = cache.get(self.version_key)
+        if version is None:
+            # Журнал пропал из кеша: начинается новый, и все процессы
+            # строят индекс заново.
+            cache.add(self.version_key, time.time_ns(), None)
+            version = cache.get(self.version_key)
+        if self._built and version == self._version:
+            return
+        # Версия читается до построения: изменения, сделанные во время
+        # него, уже в базе, и повторное их применение ничего не меняет.
+        if not (self._built and self._catch_up(version)):
+            self.build()
+        self._version = version
+
+    def search_pks(self, query, limit):
+        """id объектов, у которых есть термин с префиксом query."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.sync()
+        found = {}
+        with self._lock:
+            keys = self._keys
+            index = bisect_left(keys, (prefix,))
+            while index < len(keys) and len(found) < limit:
+                term, pk = keys[index]
+                if not term.startswith(prefix):
+                    break
+                found[pk] = None
+                index += 1
+        return list(found)
+
+    def search(self, query, limit):
+        """Описания найденных объектов, от термина к термину по алфавиту."""
+        pks = self.search_pks(query, limit)
+        entries = self._entries
+        found = (entries.get(pk) for pk in pks)
+        return [entry[1] for entry in found if entry is not None]
+
+    def update(self, obj, indexed=True, update_fields=None):
+        """
+        Вносит объект в индекс заново или, если indexed ложно, убирает, и
+        записывает изменение в журнал. Сохранение, не задевшее полей
+        индекса (например, last_login при входе), ничего не меняет.
+        """
+        if update_fields is not None and not set(update_fields) & set(
+            self.fields + self.extra_fields
+        ):
+            return
+        values = None
+        if indexed:
+            values = [getattr(obj, field) for field in self.fields]
+        with self._lock:
+            if self._built:
+                self._apply(obj.pk, values)
+        version = self._next_version()
+        cache.set(
+            self.change_key(version), (obj.pk, values),
+            settings.AUTOCOMPLETE_CHANGE_TIMEOUT,
+        )
+        # Если между своими изменениями были чужие, их применит sync().
+        if self._version is not None and self._version == version - 1:
+            self._version = version
+
+    def _next_version(self):
+        cache.add(self.version_key, time.time_ns(), None)
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            # Ключ успели вытеснить между add и incr: начинается новый
+            # журнал.
+            version = time.time_ns()
+            cache.set(self.version_key, version, None)
+            return version
+
+
+def _author(username, first_name, last_name):
+    return {
+        'username': username,
+        'full_name': f'{first_name} {last_name}'.strip(),
+    }
+
+
+def _group(slug, title):
+    return {'slug': slug, 'title': title}
+
+
+authors = PrefixIndex(
+    'authors', User.objects.filter(is_active=True),
+    ('username', 'first_name', 'last_name'), _author, ('is_active',),
+)
+groups = PrefixIndex('groups', Group.objects.all(), ('slug', 'title'), _group)
+
+
+def build_indexes():
+    """Шаг прогрева: строит индексы авторов и групп."""
+    for index in (authors, groups):
+        index.sync()
@@ -0,0 +1,247 @@
+"""
+Компактное представление поста для кеша.
+
+Закешированный экземпляр Post тянет за собой ``_state``, связанные
+объекты и все поля автора, включая хеш пароля. PostCard хранит только
+то, что нужно карточке в ленте, упаковывается в байты через struct и
+при этом выглядит для шаблонов как Post: ``post.author.get_full_name``,
+``post.group.slug``, ``post.image`` и так далее.
+"""
+import logging
+import struct
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post, PostBase
+
+logger = logging.getLogger(__name__)
+
+CARD_KEY = 'posts.card.{}'
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# id, author_id, group_id (0 — без группы), pub_date в микросекундах,
+# ширина и высота картинки (0 — неизвестны) и длины девяти строк.
+HEADER = struct.Struct('<QQQqII9I')
+
+VALUES = (
+    'id', 'text', 'pub_date', 'author_id', 'author__username',
+    'author__first_name', 'author__last_name', 'group_id', 'group__slug',
+    'group__title', 'image', 'image_variants', 'image_width',
+    'image_height', 'image_placeholder',
+)
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def _init(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+
+class AuthorCard(_Frozen):
+    __slots__ = ('pk', 'username', 'full_name')
+
+    def __init__(self, pk, username, full_name):
+        self._init(pk=pk, username=username, full_name=full_name)
+
+    def get_full_name(self):
+        return self.full_name
+
+    def __str__(self):
+        return self.username
+
+
+class GroupCard(_Frozen):
+    __slots__ = ('pk', 'slug', 'title')
+
+    def __init__(self, pk, slug, title):
+        self._init(pk=pk, slug=slug, title=title)
+
+    def __str__(self):
+        return self.title
+
+
+class PostCard(_Frozen):
+    __slots__ = (
+        'id', 'text', 'pub_date', 'author', 'group', 'image',
+        'image_variants', 'image_width', 'image_height',
+        'image_placeholder', 'thumbnail_url',
+    )
+
+    def __init__(self, id, text, pub_date, author, group=None, image='',
+                 image_variants='', image_width=None, image_height=None,
+                 image_placeholder='', thumbnail_url=''):
+        self._init(
+            id=id, text=text, pub_date=pub_date, author=author, group=group,
+            image=image, image_variants=image_variants,
+            image_width=image_width, image_height=image_height,
+            image_placeholder=image_placeholder,
+            thumbnail_url=thumbnail_url,
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def author_id(self):
+        return self.author.pk
+
+    @property
+    def group_id(self):
+        return self.group.pk if self.group else None
+
+    def __eq__(self, other):
+        if isinstance(other, (PostCard, PostBase)):
+            return self.id == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.text[:15]
+
+    def __reduce__(self):
+        return decode, (self.encode(),)
+
+    def encode(self):
+        group = self.group
+        strings = [
+            value.encode() for value in (
+                self.text, self.author.username, self.author.full_name,
+                group.slug if group else '', group.title if group else '',
+                self.image, self.image_variants, self.image_placeholder,
+                self.thumbnail_url,
+            )
+        ]
+        return HEADER.pack(
+            self.id,
+            self.author.pk,
+            group.pk if group else 0,
+            (self.pub_date - EPOCH) // timedelta(microseconds=1),
+            self.image_width or 0,
+            self.image_height or 0,
+            *(len(value) for value in strings),
+        ) + b''.join(strings)
+
+    @classmethod
+    def from_values(cls, row):
+        (pk, text, pub_date, author_id, username, first_name, last_name,
+         group_id, group_slug, group_title, image, image_variants,
+         image_width, image_height, image_placeholder) = row
+        group = None
+        if group_id is not None:
+            group = GroupCard(group_id, group_slug, group_title)
+        return cls(
+            id=pk,
+            text=text,
+            pub_date=pub_date,
+            author=AuthorCard(
+                author_id, username, f'{first_name} {last_name}'.strip()
+            ),
+            group=group,
+            image=image or '',
+            image_variants=image_variants,
+            image_width=image_width,
+            image_height=image_height,
+            image_placeholder=image_placeholder,
+            # С нарезанными вариантами шаблон строит <picture> без неё.
+            thumbnail_url='' if image_variants else _thumbnail_url(image),
+        )
+
+    @classmethod
+    def from_post(cls, post):
+        group = post.group
+        return cls.from_values((
+            post.pk, post.text, post.pub_date, post.author_id,
+            post.author.username, post.author.first_name,
+            post.author.last_name, post.group_id,
+            group.slug if group else None, group.title if group else None,
+            post.image.name, post.image_variants, post.image_width,
+            post.image_height, post.image_placeholder,
+        ))
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        """Строит карточки одним запросом, минуя экземпляры Post."""
+        return [cls.from_values(row) for row in queryset.values_list(*VALUES)]
+
+
+def decode(data):
+    (pk, author_id, group_id, microseconds, image_width, image_height,
+     *lengths) = HEADER.unpack_from(data)
+    strings = []
+    offset = HEADER.size
+    for length in lengths:
+        strings.append(data[offset:offset + length].decode())
+        offset += length
+    (text, username, full_name, group_slug, group_title, image,
+     image_variants, image_placeholder, thumbnail_url) = strings
+    return PostCard(
+        id=pk,
+        text=text,
+        pub_date=EPOCH + timedelta(microseconds=microseconds),
+        author=AuthorCard(author_id, username, full_name),
+        group=GroupCard(group_id, group_slug, group_title)
+        if group_id else None,
+        image=image,
+        image_variants=image_variants,
+        image_width=image_width or None,
+        image_height=image_height or None,
+        image_placeholder=image_placeholder,
+        thumbnail_url=thumbnail_url,
+    )
+
+
+def _thumbnail_url(image):
+    if not image:
+        return ''
+    # Имя миниатюры зависит от хранилища исходника: с хранилищем поля
+    # оно совпадает с миниатюрой шаблона и известно сборщику media_gc.
+    source = ImageFile(image, Post._meta.get_field('image').storage)
+    try:
+        return get_thumbnail(
+            source, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+        ).url
+    except Exception:
+        logger.warning('Нет миниатюры для %s', image, exc_info=True)
+        return ''
+
+
+def card_key(post_id):
+    return CARD_KEY.format(post_id)
+
+
+def get_cards(post_ids):
+    """
+    Карточки постов по id из кеша; недостающие строятся одним запросом.
+    Возвращает словарь id -> PostCard только для существующих постов.
+    """
+    cached = cache.get_many([card_key(pk) for pk in post_ids])
+    cards = {card.id: card for card in cached.values()}
+    missing = [pk for pk in post_ids if pk not in cards]
+    if missing:
+        built = PostCard.from_queryset(Post.objects.filter(pk__in=missing))
+        cache.set_many(
+            {card_key(card.id): card for card in built},
+            settings.POST_CARD_CACHE_TIMEOUT,
+        )
+        cards.update((card.id, card) for card in built)
+    return cards
+
+
+def forget_card(post_id):
+    cache.delete(card_key(post_id))
@@ -0,0 +1,19 @@
+from .notifications import unread_count
+
+
+def notifications(request):
+    """
+    Число непрочитанных уведомлений; считается, только если нужно.
+
+    Страница с этим счётчиком своя у каждого пользователя, поэтому
+    кеш страниц (cache_page и CompressedCacheMiddleware) её не
+    сохраняет.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # Флаг UpdateCacheMiddleware: ответ не попадёт в кеш страниц.
+    request._cache_update_cache = False
+    return {
+        'unread_notifications': lambda: unread_count(user),
+    }
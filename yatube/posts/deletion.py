@@ -0,0 +1,163 @@
+"""
+Удаление пользователей и групп небольшими порциями в фоне.
+
+Каскадное удаление автора с тысячами постов собирает в памяти все
+связанные объекты и держит одну долгую транзакцию, блокируя SQLite для
+остальных запросов. Вместо этого пользователь сразу блокируется
+(tombstone), а его комментарии, посты с картинками и подписки удаляются
+порциями по DELETION_CHUNK_SIZE, каждая в своей короткой транзакции.
+Ход удаления пишется в кеш и доступен через deletion_progress().
+Задачу выполняет воркер run_workers, отдельный процесс, поэтому веб-
+процессы видят ход, только если кеш общий (Redis, Memcached); с
+LocMemCache deletion_progress() в них возвращает None, см. core.caching.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from core.jobs import enqueue
+from core.thumbnail_kvstore import forget_thumbnails
+
+from . import lookups
+from .archive import forget_counts
+from .cards import forget_card
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, Notification,
+    Post,
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+PROGRESS_KEY = 'posts.deletion.{}.{}'
+PROGRESS_TIMEOUT = 60 * 60 * 24
+
+
+def deletion_progress(kind, pk):
+    """Ход удаления: ``{'stage': ..., 'deleted': {...}, 'done': bool}``."""
+    return cache.get(PROGRESS_KEY.format(kind, pk))
+
+
+def _report(kind, pk, stage, deleted, done=False):
+    cache.set(
+        PROGRESS_KEY.format(kind, pk),
+        {'stage': stage, 'deleted': dict(deleted), 'done': done},
+        PROGRESS_TIMEOUT,
+    )
+
+
+def _delete_in_chunks(queryset, on_chunk=None):
+    """Удаляет объекты порциями, после каждой отдаёт число удалённых."""
+    total = 0
+    pks = queryset.order_by().values_list('pk', flat=True)
+    while True:
+        chunk = list(pks[:settings.DELETION_CHUNK_SIZE])
+        if not chunk:
+            return
+        with transaction.atomic():
+            objects = queryset.model.objects.filter(pk__in=chunk)
+            if on_chunk is not None:
+                on_chunk(objects)
+            objects.delete()
+        total += len(chunk)
+        yield total
+
+
+def delete_unreferenced_images(posts):
+    """
+    Удаляет файлы картинок постов из queryset posts после коммита
+    текущей транзакции, то есть порции. Одинаковые картинки хранятся
+    одним файлом, поэтому файл, на который ещё ссылается другой
+    пост, горячий или архивный, остаётся вместе с миниатюрами.
+    """
+    names = set(posts.exclude(image='').values_list('image', flat=True))
+    if not names:
+        return
+    pks = list(posts.values_list('pk', flat=True))
+
+    def delete_files():
+        storage = Post._meta.get_field('image').storage
+        shared = set()
+        for model in (Post, ArchivedPost):
+            referenced = model.objects.filter(image__in=names)
+            if model is posts.model:
+                referenced = referenced.exclude(pk__in=pks)
+            shared.update(referenced.values_list('image', flat=True))
+        for name in names - shared:
+            storage.delete(name)
+            forget_thumbnails(name)
+
+    transaction.on_commit(delete_files)
+
+
+def tombstone_user(user):
+    """Блокирует пользователя сразу, до удаления его данных."""
+    user.is_active = False
+    user.set_unusable_password()
+    user.save(update_fields=('is_active', 'password'))
+
+
+def purge_user(user_id):
+    stages = (
+        ('comments', Comment.objects.filter(author_id=user_id), None),
+        ('archived_comments',
+         ArchivedComment.objects.filter(author_id=user_id), None),
+        ('notifications', Notification.objects.filter(user_id=user_id),
+         None),
+        ('posts', Post.objects.filter(author_id=user_id),
+         delete_unreferenced_images),
+        ('archived_posts', ArchivedPost.objects.filter(author_id=user_id),
+         delete_unreferenced_images),
+        ('follows', Follow.objects.filter(user_id=user_id), None),
+        ('followers', Follow.objects.filter(author_id=user_id), None),
+    )
+    deleted = {}
+    for stage, queryset, on_chunk in stages:
+        deleted[stage] = 0
+        for count in _delete_in_chunks(queryset, on_chunk):
+            deleted[stage] = count
+            _report('user', user_id, stage, deleted)
+    User.objects.filter(pk=user_id).delete()
+    _report('user', user_id, 'done', deleted, done=True)
+    logger.info('Пользователь %s удалён: %s', user_id, deleted)
+
+
+def purge_group(group_id):
+    deleted = {'posts': 0, 'archived_posts': 0}
+    stages = (
+        ('posts', Post, lookups.posts),
+        ('archived_posts', ArchivedPost, lookups.archived_posts),
+    )
+    for stage, model, lookup in stages:
+        posts = model.objects.filter(group_id=group_id).order_by()
+        while True:
+            chunk = list(posts.values_list(
+                'pk', flat=True
+            )[:settings.DELETION_CHUNK_SIZE])
+            if not chunk:
+                break
+            model.objects.filter(pk__in=chunk).update(group=None)
+            # update() не шлёт сигналов, кеши постов сбрасываются вручную.
+            lookup.forget_pks(chunk)
+            for pk in chunk:
+                forget_card(pk)
+            deleted[stage] += len(chunk)
+            _report('group', group_id, stage, deleted)
+    forget_counts()
+    Group.objects.filter(pk=group_id).delete()
+    _report('group', group_id, 'done', deleted, done=True)
+
+
+def delete_user(user):
+    tombstone_user(user)
+    _report('user', user.pk, 'queued', {})
+    enqueue(purge_user, args=(user.pk,))
+
+
+def delete_group(group):
+    _report('group', group.pk, 'queued', {})
+    enqueue(purge_group, args=(group.pk,))
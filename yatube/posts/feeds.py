@@ -0,0 +1,232 @@
+"""
+Ленты RSS и Atom: весь сайт, группа и автор.
+
+Для каждой ленты в кеше лежит пара ``(время изменения, записи)``, где
+записи — не больше FEED_LENGTH пар ``(pub_date, id поста)`` от новых к
+старым. Сохранение поста правит списки лент, в которые он попадает, и
+сдвигает их время изменения; удаление поста из полного списка и
+перенос в другую группу сбрасывают список, и он строится заново
+запросом при следующем обращении. Сами посты берутся из кеша карточек.
+Список, построенный заново, получает время изменения из данных — дату
+самого нового поста, — поэтому пересборка после вытеснения из кеша или
+в другом процессе не меняет Last-Modified и ETag.
+
+Списки общие для процессов, только если кеш общий (Redis, Memcached).
+С LocMemCache у каждого процесса свои списки, и правку видит лишь
+процесс, сохранивший пост, см. core.caching.
+
+Списки строятся только по горячей таблице: архивные посты старше года,
+и опрашивающие ленту давно их получили. Пост, ушедший в архив уже
+после попадания в список, по-прежнему выводится — из архива.
+
+Время изменения отдаётся в Last-Modified, по нему же строится ETag,
+поэтому опрос ленты, в которой ничего не поменялось, заканчивается
+ответом 304 без обращения к базе.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import linebreaks
+from django.utils.http import http_date, quote_etag
+from django.utils.text import Truncator
+
+from . import lookups
+from .cards import EPOCH, PostCard, get_cards
+from .models import ArchivedPost, Post
+
+FEED_KEY = 'posts.feed.{}'
+
+
+def feed_key(name):
+    return FEED_KEY.format(name)
+
+
+def feed_names(author_id, group_id):
+    names = ['site', f'author.{author_id}']
+    if group_id is not None:
+        names.append(f'group.{group_id}')
+    return names
+
+
+def _build(filters):
+    entries = list(Post.objects.filter(**filters).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pub_date', 'pk')[:settings.FEED_LENGTH])
+    return (entries[0][0] if entries else EPOCH), entries
+
+
+def feed_state(name, filters):
+    """Время изменения и записи ленты; при промахе кеша — из базы."""
+    key = feed_key(name)
+    state = cache.get(key)
+    if state is None:
+        state = _build(filters)
+        cache.set(key, state, settings.FEED_CACHE_TIMEOUT)
+    return state
+
+
+def add_post(post):
+    """Вносит новый или изменённый пост в списки его лент."""
+    entry = post.pub_date, post.pk
+    old_group_id = getattr(post, '_old_group_id', None)
+    if old_group_id is not None and old_group_id != post.group_id:
+        forget_group(old_group_id)
+    for name in feed_names(post.author_id, post.group_id):
+        key = feed_key(name)
+        state = cache.get(key)
+        if state is None:
+            continue
+        entries = [item for item in state[1] if item[1] != post.pk]
+        if (len(entries) == len(state[1]) >= settings.FEED_LENGTH
+                and entry < entries[-1]):
+            # Пост старше всей ленты и в неё не попадает.
+            continue
+        entries.append(entry)
+        entries.sort(reverse=True)
+        cache.set(
+            key,
+            (timezone.now(), entries[:settings.FEED_LENGTH]),
+            settings.FEED_CACHE_TIMEOUT,
+        )
+
+
+def remove_post(post):
+    """
+    Убирает пост из лент. Полный список, из которого ушёл пост, нечем
+    дополнить, поэтому такие списки сбрасываются целиком.
+    """
+    names = feed_names(post.author_id, post.group_id)
+    states = cache.get_many([feed_key(name) for name in names])
+    cache.delete_many([
+        key for key, (_, entries) in states.items()
+        if any(pk == post.pk for _, pk in entries)
+    ])
+
+
+def forget_group(group_id):
+    cache.delete(feed_key(f'group.{group_id}'))
+
+
+def forget_feeds(post):
+    cache.delete_many([
+        feed_key(name) for name in feed_names(post.author_id, post.group_id)
+    ])
+
+
+def feed_posts(entries):
+    """Карточки постов по записям ленты; ушедшие в архив — отдельным
+    запросом."""
+    pks = [pk for _, pk in entries]
+    cards = get_cards(pks)
+    missing = [pk for pk in pks if pk not in cards]
+    if missing:
+        cards.update((card.id, card) for card in PostCard.from_queryset(
+            ArchivedPost.objects.filter(pk__in=missing)
+        ))
+    return [cards[pk] for pk in pks if pk in cards]
+
+
+class Source:
+    """Лента, которую отдаёт PostsFeed: имя, фильтр и описание."""
+
+    def __init__(self, name, filters, title, link, description):
+        self.name = name
+        self.filters = filters
+        self.title = title
+        self.link = link
+        self.description = description
+        self.updated, self.entries = feed_state(name, filters)
+
+    @property
+    def etag(self):
+        return quote_etag(f'{self.name}-{self.updated.timestamp()}')
+
+
+class PostsFeed(Feed):
+    """Лента последних постов сайта в RSS 2.0."""
+
+    def get_object(self, request, slug=None, username=None):
+        # Feed.__call__ вызывает get_object ещё раз, после проверки
+        # условного запроса.
+        if hasattr(request, 'feed_source'):
+            return request.feed_source
+        if slug is not None:
+            group = lookups.groups.get_or_404(slug)
+            source = Source(
+                f'group.{group.pk}', {'group_id': group.pk},
+                f'Yatube: {group.title}',
+                reverse('posts:groups', kwargs={'slug': slug}),
+                group.description,
+            )
+        elif username is not None:
+            author = lookups.authors.get_or_404(username)
+            name = author.get_full_name() or author.username
+            source = Source(
+                f'author.{author.pk}', {'author_id': author.pk},
+                f'Yatube: {name}',
+                reverse('posts:profile', kwargs={'username': username}),
+                f'Все посты пользователя {name}',
+            )
+        else:
+            source = Source(
+                'site', {}, 'Yatube', reverse('posts:main'),
+                'Последние обновления на сайте Yatube',
+            )
+        request.feed_source = source
+        return source
+
+    def __call__(self, request, *args, **kwargs):
+        source = self.get_object(request, *args, **kwargs)
+        response = get_conditional_response(
+            request,
+            etag=source.etag,
+            last_modified=int(source.updated.timestamp()),
+        )
+        if response is None:
+            response = super().__call__(request, *args, **kwargs)
+        response['ETag'] = source.etag
+        response['Last-Modified'] = http_date(source.updated.timestamp())
+        return response
+
+    def title(self, source):
+        return source.title
+
+    def link(self, source):
+        return source.link
+
+    def description(self, source):
+        return source.description
+
+    def items(self, source):
+        return feed_posts(source.entries)
+
+    def item_title(self, post):
+        return Truncator(post.text).words(10)
+
+    def item_description(self, post):
+        return linebreaks(post.text)
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class AtomPostsFeed(PostsFeed):
+    """Та же лента в Atom."""
+
+    feed_type = Atom1Feed
+
+    def subtitle(self, source):
+        return source.description
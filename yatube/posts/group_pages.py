@@ -0,0 +1,92 @@
+"""
+Кеш страниц групп.
+
+У каждой группы есть версия в кеше. Число постов группы и отрисованная
+лента страницы (фрагмент шаблона group_list.html) кешируются с версией
+в ключе, а лента ещё и со slug и номером страницы. Сохранение и
+удаление поста меняют версию только его группы, а при переносе поста
+в другую группу — обеих. Так же версию меняет правка самой группы.
+Старые записи никто не удаляет, они просто больше не читаются и
+вытесняются из кеша.
+
+Посты страницы выбираются лениво: если фрагмент уже в кеше, шаблон
+их не перебирает и запроса за ними нет.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .archive import post_list
+
+VERSION_KEY = 'posts.group.{}.version'
+COUNT_KEY = 'posts.group.{}.{}.count'
+
+
+def group_version(group_id):
+    return cache.get_or_set(VERSION_KEY.format(group_id), time.time_ns, None)
+
+
+def forget_groups(*group_ids):
+    """Сбрасывает кеш страниц групп; None среди id пропускаются."""
+    version = time.time_ns()
+    cache.set_many({
+        VERSION_KEY.format(group_id): version
+        for group_id in set(group_ids) if group_id is not None
+    }, None)
+
+
+class LazySlice:
+    """Срез ленты, который выполняется при первом обращении."""
+
+    def __init__(self, posts, start, stop):
+        self.posts = posts
+        self.start = start
+        self.stop = stop
+
+    @cached_property
+    def items(self):
+        return list(self.posts[self.start:self.stop])
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+class GroupPosts:
+    """Посты группы для Paginator с числом постов из кеша."""
+
+    def __init__(self, group, version):
+        self.group = group
+        self.version = version
+        self.posts = post_list(group=group)
+
+    def count(self):
+        key = COUNT_KEY.format(self.group.pk, self.version)
+        count = cache.get(key)
+        if count is None:
+            count = self.posts.count()
+            cache.set(key, count, settings.GROUP_PAGE_CACHE_TIMEOUT)
+        return count
+
+    def __getitem__(self, index):
+        return LazySlice(self.posts, index.start, index.stop)
+
+
+def group_page(group, number):
+    """
+    Страница ленты группы и версия, которую нужно добавить к ключу
+    кеша фрагмента.
+    """
+    version = group_version(group.pk)
+    paginator = Paginator(
+        GroupPosts(group, version), settings.POSTS_ON_PAGE
+    )
+    return paginator.get_page(number), version
@@ -0,0 +1,162 @@
+"""
+Кешированный поиск групп, авторов и постов для вьюх.
+
+Каждая страница группы, профиля и поста начинается с
+``get_object_or_404`` по slug, username или id — одним и тем же
+запросом к базе для одних и тех же объектов. Здесь объекты хранятся в
+кеше по первичному ключу, а slug и username — как ссылки на этот ключ.
+Найденный по ссылке объект сверяется с искомым значением, поэтому
+переименование не вернёт чужой объект. Отсутствующие значения тоже
+кешируются (на меньший срок), чтобы поток запросов к несуществующей
+странице не доходил до базы.
+
+Записи сбрасываются сигналами при сохранении и удалении объектов.
+Пользователи, в том числе авторы постов, кешируются только с
+публичными полями PUBLIC_USER_FIELDS. Объекты из кеша только для
+чтения: вьюха, которая пишет в базу, перечитывает строку.
+
+Посты кешируются вместе с автором и группой; смена имени автора или
+названия группы видна на странице поста не позже, чем через
+LOOKUP_CACHE_TIMEOUT.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import ArchivedPost, Group, Post
+
+User = get_user_model()
+
+MISSING = 'missing'
+
+
+class CachedLookup:
+    """Поиск объектов модели по уникальному полю через кеш."""
+
+    def __init__(self, queryset, field='pk'):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.field = field
+        self.prefix = f'posts.lookup.{self.model._meta.label_lower}'
+
+    def object_key(self, pk):
+        return f'{self.prefix}.pk.{pk}'
+
+    def alias_key(self, value):
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'{self.prefix}.{self.field}.{digest}'
+
+    def key(self, value):
+        if self.field == 'pk':
+            return self.object_key(value)
+        return self.alias_key(value)
+
+    def matches(self, obj, value):
+        return str(getattr(obj, self.field)) == str(value)
+
+    def get(self, value):
+        """Объект по значению поля или None."""
+        return self.get_many([value]).get(value)
+
+    def get_or_404(self, value):
+        obj = self.get(value)
+        if obj is None:
+            raise Http404(
+                f'No {self.model._meta.object_name} matches the given query.'
+            )
+        return obj
+
+    def get_many(self, values):
+        """
+        Объекты по списку значений поля: словарь значение -> объект,
+        только для найденных. Промахи добираются одним запросом.
+        """
+        values = list(dict.fromkeys(values))
+        cached = cache.get_many([self.key(value) for value in values])
+        found = {}
+        pending = []
+        aliases = {}
+        for value in values:
+            hit = cached.get(self.key(value))
+            if hit is None:
+                pending.append(value)
+            elif hit == MISSING:
+                continue
+            elif self.field == 'pk':
+                found[value] = hit
+            else:
+                aliases[value] = hit
+        if aliases:
+            objects = cache.get_many(
+                [self.object_key(pk) for pk in aliases.values()]
+            )
+            for value, pk in aliases.items():
+                obj = objects.get(self.object_key(pk))
+                if obj is not None and self.matches(obj, value):
+                    found[value] = obj
+                else:
+                    pending.append(value)
+        if pending:
+            found.update(self._load(pending))
+        return found
+
+    def _load(self, values):
+        lookup = 'pk__in' if self.field == 'pk' else f'{self.field}__in'
+        try:
+            objects = list(self.queryset.filter(**{lookup: values}))
+        except (TypeError, ValueError):
+            objects = []
+        by_value = {str(getattr(obj, self.field)): obj for obj in objects}
+        found = {}
+        entries = {}
+        for value in values:
+            obj = by_value.get(str(value))
+            if obj is None:
+                continue
+            found[value] = obj
+            entries[self.object_key(obj.pk)] = obj
+            if self.field != 'pk':
+                entries[self.alias_key(value)] = obj.pk
+        cache.set_many(entries, settings.LOOKUP_CACHE_TIMEOUT)
+        cache.set_many(
+            {self.key(value): MISSING for value in values
+             if value not in found},
+            settings.LOOKUP_MISSING_CACHE_TIMEOUT,
+        )
+        return found
+
+    def forget(self, obj):
+        """Сбрасывает объект и ссылку на него по текущему значению поля."""
+        keys = [self.object_key(obj.pk)]
+        if self.field != 'pk':
+            keys.append(self.alias_key(getattr(obj, self.field)))
+        cache.delete_many(keys)
+
+    def forget_pks(self, pks):
+        cache.delete_many([self.object_key(pk) for pk in pks])
+
+
+# Поля пользователя, которые видны на страницах. Хеш пароля, почта и
+# остальные поля в общий кеш не попадают.
+PUBLIC_USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+PRIVATE_AUTHOR_FIELDS = [
+    f'author__{field.name}' for field in User._meta.concrete_fields
+    if field.name not in PUBLIC_USER_FIELDS
+]
+
+groups = CachedLookup(Group.objects.all(), 'slug')
+authors = CachedLookup(User.objects.only(*PUBLIC_USER_FIELDS), 'username')
+posts = CachedLookup(
+    Post.objects.select_related('author', 'group').defer(
+        *PRIVATE_AUTHOR_FIELDS
+    )
+)
+archived_posts = CachedLookup(
+    ArchivedPost.objects.select_related('author', 'group').defer(
+        *PRIVATE_AUTHOR_FIELDS
+    )
+)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_old_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые посты с комментариями в архив сейчас, не '
+        'дожидаясь фоновой задачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Переносить посты старше стольких дней '
+                 '(по умолчанию POST_ARCHIVE_AFTER_DAYS).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько постов переносить в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        moved = archive_old_posts(options['days'], options['chunk_size'])
+        self.stdout.write(f'Перенесено в архив постов: {moved}')
@@ -0,0 +1,81 @@
+import pickle
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.cards import PostCard, decode
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает, сколько памяти в кеше занимает пост в виде Post и в '
+        'виде PostCard, и замеряет скорость упаковки и распаковки карточек.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=1000,
+            help='Сколько постов сгенерировать для замера.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Сколько раз повторить упаковку и распаковку.',
+        )
+        parser.add_argument(
+            '--from-db', action='store_true',
+            help='Взять последние посты из базы вместо сгенерированных.',
+        )
+
+    def handle(self, *args, **options):
+        posts = self.posts(options['count'], options['from_db'])
+        if not posts:
+            self.stdout.write('Нет постов, нечего замерять.')
+            return
+        cards = [PostCard.from_post(post) for post in posts]
+        self.stdout.write(f'Постов: {len(posts)}')
+        for name, objects in (('Post', posts), ('PostCard', cards)):
+            size = sum(
+                len(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+                for obj in objects
+            )
+            self.stdout.write(
+                f'{name}: {size / len(objects):.0f} байт на пост в кеше'
+            )
+        encoded = [card.encode() for card in cards]
+        for name, run in (
+            ('encode', lambda: [card.encode() for card in cards]),
+            ('decode', lambda: [decode(data) for data in encoded]),
+        ):
+            self.throughput(name, run, len(cards), options['repeat'])
+
+    def posts(self, count, from_db):
+        if from_db:
+            return list(
+                Post.objects.select_related('author', 'group')[:count]
+            )
+        author = User(
+            pk=1, username='author', first_name='Лев', last_name='Толстой',
+            password='pbkdf2_sha256$' + 'x' * 70,
+        )
+        group = Group(pk=1, slug='classics', title='Классика',
+                      description='Описание группы ' * 10)
+        now = timezone.now()
+        return [
+            Post(pk=pk, text='Текст поста ' * 20, pub_date=now, author=author,
+                 group=group)
+            for pk in range(1, count + 1)
+        ]
+
+    def throughput(self, name, run, count, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{name}: {count * repeat / elapsed:,.0f} карточек в секунду'
+        )
@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.functional import empty
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+
+from core.thumbnail_kvstore import KVStore as LRUStore
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время, за которое разрешаются миниатюры одной страницы '
+        'ленты, со штатным KV-хранилищем sorl и с LRU-слоем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Сколько раз отрисовать страницу для каждого хранилища.',
+        )
+
+    def handle(self, *args, **options):
+        posts = list(
+            Post.objects.exclude(image='')[:settings.POSTS_ON_PAGE]
+        )
+        if not posts:
+            self.stdout.write('Нет постов с картинками, нечего замерять.')
+            return
+        self.stdout.write(f'Миниатюр на странице: {len(posts)}')
+        try:
+            for name, store in (('cached_db', CachedDBStore()),
+                                ('lru', LRUStore())):
+                default.kvstore._wrapped = store
+                self.resolve(posts)
+                self.report(name, posts, options['repeat'])
+        finally:
+            default.kvstore._wrapped = empty
+
+    def resolve(self, posts):
+        for post in posts:
+            get_thumbnail(
+                post.image, '960x339', crop='center', upscale=True
+            ).url
+
+    def report(self, name, posts, repeat):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                self.resolve(posts)
+                timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'{name}: медиана {statistics.median(timings) * 1000:.3f} мс, '
+            f'максимум {max(timings) * 1000:.3f} мс на страницу, '
+            f'запросов к базе {len(queries) / repeat:.1f} на страницу'
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from posts.media_gc import MIN_AGE, ORIGINALS, collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, в том '
+        'числе архивный, и миниатюры, которые не нужны ни одной живой '
+        'картинке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, какие файлы будут удалены.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько потоков удаляют файлы.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько строк читать из базы и файлов удалять за раз.',
+        )
+
+    def handle(self, *args, **options):
+        counts = {ORIGINALS: 0}
+        total = size = 0
+        for kind, name, file_size in collect_garbage(
+            dry_run=options['dry_run'],
+            min_age=options['min_age'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        ):
+            counts[kind] = counts.get(kind, 0) + 1
+            total += 1
+            size += file_size
+            if options['verbosity'] > 1:
+                self.stdout.write(name)
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} файлов: {total} ({size // 1024} КБ), из них '
+            f'картинок: {counts[ORIGINALS]}, миниатюр: '
+            f'{total - counts[ORIGINALS]}'
+        )
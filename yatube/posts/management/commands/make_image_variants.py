@@ -0,0 +1,61 @@
+import logging
+import os
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.jobs import process_pool
+from posts.models import Post
+from posts.thumbnails import current_signature, make_variants
+
+logger = logging.getLogger(__name__)
+
+
+def make(post_id):
+    try:
+        make_variants(post_id)
+    except Exception:
+        logger.exception('Не удалось нарезать картинку поста %s', post_id)
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        'Нарезает варианты картинок (ширины и форматы из POST_IMAGE_WIDTHS '
+        'и POST_IMAGE_FORMATS) для постов, у которых их ещё нет, и '
+        'считает недостающие размеры и заглушки картинок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Сколько процессов нарезают картинки.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Сколько постов выбирать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        signature = current_signature()
+        posts = Post.objects.exclude(image='').filter(
+            ~Q(image_variants=signature) | Q(image_width__isnull=True)
+        ).order_by('pk').values_list('pk', flat=True)
+        done = failed = 0
+        last_pk = 0
+        with process_pool(options['workers']) as pool:
+            while True:
+                chunk = list(
+                    posts.filter(pk__gt=last_pk)[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                last_pk = chunk[-1]
+                for ok in pool.map(make, chunk):
+                    done += ok
+                    failed += not ok
+                self.stdout.write(f'Обработано постов: {done + failed}')
+        self.stdout.write(
+            f'Готово: {done}, ошибок: {failed}, варианты: {signature}'
+        )
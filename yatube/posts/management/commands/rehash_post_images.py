@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+
+from core.storage import is_hashed_name
+from core.thumbnail_kvstore import forget_thumbnails
+from posts.media import is_referenced
+from posts.models import ArchivedPost, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки горячих и архивных постов под имена по хешу '
+        'содержимого. '
+        'Файлы читаются и пишутся потоком, одинаковые картинки '
+        'схлопываются в один файл.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, какие файлы будут перенесены.',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        renamed = missing = 0
+        for model, pk, name in self.posts_with_images(options['batch_size']):
+            if is_hashed_name(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Пост {pk}: файл {name} не найден')
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'Пост {pk}: {name}')
+                renamed += 1
+                continue
+            with storage.open(name) as source:
+                new_name = storage.save(name, source)
+            model.objects.filter(pk=pk, image=name).update(image=new_name)
+            # Старый файл и его миниатюры нужны, пока на него ссылается
+            # другой пост, горячий или архивный.
+            if not is_referenced(name):
+                forget_thumbnails(name)
+                storage.delete(name)
+            renamed += 1
+        self.stdout.write(
+            f'Перенесено: {renamed}, не найдено файлов: {missing}'
+        )
+
+    def posts_with_images(self, batch_size):
+        for model in (Post, ArchivedPost):
+            last_pk = 0
+            while True:
+                batch = list(
+                    model.objects.filter(pk__gt=last_pk).exclude(image='')
+                    .order_by('pk').values_list('pk', 'image')[:batch_size]
+                )
+                if not batch:
+                    break
+                for pk, name in batch:
+                    yield model, pk, name
+                last_pk = batch[-1][0]
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, PostTag
+from posts.tags import parse, tag_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново разбирает хештеги и упоминания во всех горячих постах и '
+        'пересобирает таблицу тегов. Уведомления об упоминаниях не '
+        'рассылаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько постов обрабатывать в одной транзакции.',
+        )
+
+    def flush(self, chunk):
+        with transaction.atomic():
+            PostTag.objects.filter(
+                post_id__in=[post.pk for post in chunk]
+            ).delete()
+            rows = []
+            for post in chunk:
+                rows.extend(tag_rows(post, parse(post.text)))
+            PostTag.objects.bulk_create(rows)
+        return len(rows)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.objects.order_by('pk').only(
+            'pk', 'text', 'pub_date'
+        ).iterator(chunk_size=chunk_size)
+        done = tags = 0
+        chunk = []
+        for post in posts:
+            chunk.append(post)
+            if len(chunk) >= chunk_size:
+                tags += self.flush(chunk)
+                done += len(chunk)
+                chunk = []
+                self.stdout.write(f'Обработано постов: {done}')
+        if chunk:
+            tags += self.flush(chunk)
+            done += len(chunk)
+        self.stdout.write(f'Готово: постов {done}, тегов {tags}')
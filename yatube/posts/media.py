@@ -0,0 +1,37 @@
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from core.thumbnail_kvstore import forget_thumbnails
+
+from .models import ArchivedPost, Post
+
+
+def is_referenced(name):
+    """Ссылается ли на картинку name пост, горячий или архивный."""
+    return (
+        Post.objects.filter(image=name).exists()
+        or ArchivedPost.objects.filter(image=name).exists()
+    )
+
+
+def forget_unreferenced_thumbnails(name):
+    """
+    Фоновая задача: забывает миниатюры и варианты картинки name, если на
+    неё больше не ссылается ни один пост. Одинаковые картинки хранятся
+    одним файлом, и миниатюры, нарезанные для одного поста, выводит и
+    другой. Задача выполняется после коммита, поэтому видит и пост,
+    сохранённый с той же картинкой в той же транзакции.
+    """
+    if not is_referenced(name):
+        forget_thumbnails(name)
+
+
+def can_access_media(request, path):
+    """
+    Картинки отдаются, только пока на них ссылается пост, горячий или
+    архивный; файлы удалённых и заменённых картинок видит лишь персонал.
+    """
+    if request.user.is_staff:
+        return True
+    if path.startswith(thumbnail_settings.THUMBNAIL_PREFIX):
+        return True
+    return is_referenced(path)
@@ -0,0 +1,234 @@
+"""
+Сборка мусора в медиа.
+
+Удаляет оригиналы картинок, на которые не ссылается ни горячий, ни
+архивный пост, и миниатюры, которые не нужны ни одной живой картинке:
+остатки удалённых постов, заменённых картинок и старых наборов
+вариантов.
+
+На миллионах файлов ни список файлов, ни список ссылок не поднимается
+в память целиком. Ссылки читаются из базы порциями по первичному ключу
+и складываются в ReferenceSet — отсортированный массив 64-битных хешей
+имён, восемь байт на имя. Имена живых миниатюр нигде не хранятся: их
+заново выводит thumbnail_name() из имени картинки и подписи вариантов,
+так же как это делают шаблон и карточки. Каталоги обходятся
+os.scandir() без рекурсии и списков, каждый файл сразу проверяется по
+множеству, а лишние удаляются пачками в пуле потоков.
+
+Совпадение хешей может только оставить лишний файл, но не удалить
+нужный. Файлы моложе min_age не трогаются: картинку могли загрузить, а
+пост ещё не сохранить, или нарезать миниатюру для поста, созданного
+после чтения ссылок. Оригиналы перед удалением ещё раз сверяются с
+базой.
+"""
+import hashlib
+import heapq
+import os
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.thumbnail_kvstore import forget_thumbnails
+
+from .cards import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from .models import ArchivedPost, Post
+from .thumbnails import current_signature, geometry, options, parse_signature
+
+ORIGINALS = 'original'
+THUMBNAILS = 'thumbnail'
+
+# Сколько хешей копится в списке, прежде чем уйти в компактный массив.
+RUN_SIZE = 1 << 16
+
+# Файлы моложе стольких секунд не удаляются.
+MIN_AGE = 60 * 60 * 24
+
+
+def _hash(name):
+    return int.from_bytes(
+        hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class ReferenceSet:
+    """
+    Множество имён файлов в виде отсортированного ``array('Q')`` их
+    хешей. Добавленные хеши копятся порциями по RUN_SIZE, каждая порция
+    сортируется отдельно, а перед первой проверкой порции сливаются в
+    один массив.
+    """
+
+    def __init__(self):
+        self._runs = []
+        self._pending = []
+
+    def add(self, name):
+        self._pending.append(_hash(name))
+        if len(self._pending) >= RUN_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._runs.append(array('Q', sorted(self._pending)))
+            self._pending = []
+
+    def _merge(self):
+        self._flush()
+        if len(self._runs) > 1:
+            self._runs = [array('Q', heapq.merge(*self._runs))]
+
+    def __contains__(self, name):
+        if self._pending or len(self._runs) > 1:
+            self._merge()
+        if not self._runs:
+            return False
+        hashes = self._runs[0]
+        key = _hash(name)
+        index = bisect_left(hashes, key)
+        return index < len(hashes) and hashes[index] == key
+
+    def __len__(self):
+        return sum(map(len, self._runs)) + len(self._pending)
+
+
+def referenced_images(chunk_size):
+    """Пары ``(картинка, подпись вариантов)`` горячих и архивных постов."""
+    for model in (Post, ArchivedPost):
+        rows = model.objects.exclude(image='').order_by('pk').values_list(
+            'pk', 'image', 'image_variants'
+        )
+        last_pk = 0
+        while True:
+            chunk = list(rows.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            for _, image, signature in chunk:
+                yield image, signature
+
+
+def thumbnail_names(name, signature):
+    """
+    Имена миниатюр, которые может запросить картинка: миниатюра
+    карточки и варианты по подписи поста и по текущим настройкам.
+    """
+    backend = default.backend
+    storage = Post._meta.get_field('image').storage
+    # Карточка и шаблон строят миниатюру с хранилищем поля картинки, от
+    # которого зависит её имя.
+    yield backend.thumbnail_name(
+        ImageFile(name, storage), THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+    )
+    for variants in {signature, current_signature()} - {''}:
+        try:
+            formats, widths = parse_signature(variants)
+        except ValueError:
+            continue
+        for image_format in formats:
+            for width in widths:
+                yield backend.thumbnail_name(
+                    name, geometry(width), **options(image_format)
+                )
+
+
+def _walk(path):
+    """Файлы под каталогом path, DirEntry по одному."""
+    directories = [path]
+    while directories:
+        try:
+            scanner = os.scandir(directories.pop())
+        except FileNotFoundError:
+            continue
+        with scanner as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def _unreferenced(names):
+    """Оставляет из names только те, на которые по-прежнему нет ссылок."""
+    used = set(Post.objects.filter(
+        image__in=names
+    ).values_list('image', flat=True))
+    used.update(ArchivedPost.objects.filter(
+        image__in=names
+    ).values_list('image', flat=True))
+    return [name for name in names if name not in used]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def collect_garbage(dry_run=False, min_age=MIN_AGE, workers=4,
+                    chunk_size=500):
+    """
+    Находит и, если не dry_run, удаляет лишние файлы картинок.
+
+    Генератор: отдаёт тройки ``(вид, имя, размер)`` по каждому лишнему
+    файлу, вид — ORIGINALS или THUMBNAILS. Файлы удаляются пачками по
+    chunk_size в workers потоков.
+    """
+    storage = Post._meta.get_field('image').storage
+    images = ReferenceSet()
+    thumbnails = ReferenceSet()
+    for name, signature in referenced_images(chunk_size):
+        images.add(name)
+        for thumbnail in thumbnail_names(name, signature):
+            thumbnails.add(thumbnail)
+
+    cutoff = time.time() - min_age
+    # Сначала миниатюры: удаляя оригинал, forget_thumbnails() стирает и
+    # его миниатюры, и они не попали бы в отчёт.
+    sweeps = (
+        (THUMBNAILS, default.storage, thumbnail_settings.THUMBNAIL_PREFIX,
+         thumbnails),
+        (ORIGINALS, storage, Post._meta.get_field('image').upload_to,
+         images),
+    )
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for kind, kind_storage, prefix, live in sweeps:
+            location = kind_storage.path('')
+            batch = []
+            for entry in _walk(kind_storage.path(prefix)):
+                name = os.path.relpath(entry.path, location).replace(
+                    os.sep, '/'
+                )
+                if name in live:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > cutoff:
+                    continue
+                batch.append((name, entry.path, stat.st_size))
+                if len(batch) >= chunk_size:
+                    yield from _sweep(executor, kind, batch, dry_run)
+                    batch = []
+            if batch:
+                yield from _sweep(executor, kind, batch, dry_run)
+
+
+def _sweep(executor, kind, batch, dry_run):
+    if kind == ORIGINALS:
+        orphans = set(_unreferenced([name for name, _, _ in batch]))
+        batch = [row for row in batch if row[0] in orphans]
+    if dry_run:
+        yield from ((kind, name, size) for name, _, size in batch)
+        return
+    removed = executor.map(_remove, [path for _, path, _ in batch])
+    for (name, _, size), ok in zip(batch, removed):
+        if not ok:
+            continue
+        if kind == ORIGINALS:
+            forget_thumbnails(name)
+        yield kind, name, size
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_author_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.CharField(blank=True, editable=False, help_text='Форматы и ширины нарезанных миниатюр, см. posts.thumbnails.', max_length=100, verbose_name='Варианты картинки'),
+        ),
+    ]
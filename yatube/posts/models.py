@@ -1,10 +1,16 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.storage import post_image_storage
+
 User = get_user_model()
 
 
-class Post(models.Model):
+class PostBase(models.Model):
+    """
+    Поля поста. Общие у горячей таблицы Post и архива ArchivedPost:
+    перенос в архив копирует строки столбец в столбец.
+    """
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста',
@@ -29,18 +35,81 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=post_image_storage,
+        blank=True,
+        db_index=True
+    )
+    image_variants = models.CharField(
+        'Варианты картинки',
+        max_length=100,
+        blank=True,
+        editable=False,
+        help_text='Форматы и ширины нарезанных миниатюр, см. '
+                  'posts.thumbnails.'
+    )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False
     )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Крошечная копия миниатюры в data URI, видна, пока '
+                  'грузится картинка.'
+    )
+
+    is_archived = False
 
     class Meta:
+        abstract = True
         ordering = ('-pub_date',)
-        verbose_name = 'Пост'
-        verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(fields=('author', '-pub_date')),
+        )
 
     def __str__(self):
         return self.text[:15]
 
 
+class Post(PostBase):
+    class Meta(PostBase.Meta):
+        verbose_name = 'Пост'
+        verbose_name_plural = 'Посты'
+
+
+class ArchivedPost(PostBase):
+    """Пост старше POST_ARCHIVE_AFTER_DAYS, см. posts.archive."""
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        'Group',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='Группа'
+    )
+
+    is_archived = True
+
+    class Meta(PostBase.Meta):
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Имя группы')
     slug = models.SlugField(unique=True, verbose_name='slug')
@@ -71,6 +140,24 @@ class Comment(models.Model):
                                    verbose_name='Время комментария')
 
 
+class ArchivedComment(models.Model):
+    """Комментарий к архивному посту, переносится вместе с ним."""
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    created = models.DateTimeField(verbose_name='Время комментария')
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -84,3 +171,76 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор'
     )
+
+
+class Notification(models.Model):
+    NEW_POST = 'post'
+    MENTION = 'mention'
+    KINDS = (
+        (NEW_POST, 'Новая запись автора'),
+        (MENTION, 'Упоминание'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Пост'
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KINDS,
+        default=NEW_POST,
+        verbose_name='Тип'
+    )
+    is_read = models.BooleanField(default=False, verbose_name='Прочитано')
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name='Время уведомления')
+
+    class Meta:
+        ordering = ('-pk',)
+        indexes = (
+            models.Index(fields=('user', 'is_read')),
+        )
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+
+class PostTag(models.Model):
+    """
+    Хештег или упоминание из текста поста, см. posts.tags. Дата
+    публикации скопирована из поста, чтобы лента тега читалась по индексу.
+    """
+    HASHTAG = '#'
+    MENTION = '@'
+    KINDS = (
+        (HASHTAG, 'Хештег'),
+        (MENTION, 'Упоминание'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tags',
+        verbose_name='Пост'
+    )
+    kind = models.CharField(max_length=1, choices=KINDS, verbose_name='Тип')
+    tag = models.CharField(max_length=150, verbose_name='Тег')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        unique_together = ('post', 'kind', 'tag')
+        indexes = (
+            models.Index(fields=('kind', 'tag', '-pub_date')),
+        )
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+
+    def __str__(self):
+        return f'{self.kind}{self.tag}'
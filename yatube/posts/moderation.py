@@ -0,0 +1,147 @@
+"""
+Массовая модерация постов в фоне.
+
+Штатное действие админки «удалить выбранные» поднимает в память каждый
+пост со связанными объектами и шлёт сигналы по одному, а на тысячах
+постов запрос не укладывается в таймаут. Здесь действие только ставит
+задачу, а она обрабатывает посты порциями по DELETION_CHUNK_SIZE, каждую
+в своей короткой транзакции: удаляет их без сборщика каскада и
+сигналов или переносит в другую группу одним update().
+
+Раз сигналы не срабатывают, всё, что они делают, делается здесь явно:
+файлы картинок удаляются после коммита порции, если на них больше никто
+не ссылается, миниатюры забываются, а кеши карточек, лент авторов,
+страниц групп, RSS и счётчиков уведомлений сбрасываются. Ход работы
+пишется в кеш и доступен через moderation_progress(). Задачу выполняет
+воркер run_workers, поэтому веб-процессы видят ход, только если кеш
+общий (Redis, Memcached), см. core.caching.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.jobs import enqueue
+
+from . import lookups
+from .cards import forget_card
+from .deletion import delete_unreferenced_images
+from .feeds import feed_key, feed_names
+from .group_pages import forget_groups
+from .models import Comment, Notification, Post, PostTag
+from .notifications import unread_cache_key
+from .timeline import author_key
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = 'posts.moderation.{}'
+PROGRESS_TIMEOUT = 60 * 60 * 24
+
+
+def moderation_progress(batch_id):
+    """
+    Ход задачи: ``{'action': ..., 'total': ..., 'processed': ...,
+    'done': bool}`` или None, если задача неизвестна.
+    """
+    return cache.get(PROGRESS_KEY.format(batch_id))
+
+
+def _report(batch_id, action, total, processed, done=False):
+    cache.set(
+        PROGRESS_KEY.format(batch_id),
+        {
+            'action': action,
+            'total': total,
+            'processed': processed,
+            'done': done,
+        },
+        PROGRESS_TIMEOUT,
+    )
+
+
+def _chunks(post_ids):
+    for start in range(0, len(post_ids), settings.DELETION_CHUNK_SIZE):
+        yield post_ids[start:start + settings.DELETION_CHUNK_SIZE]
+
+
+def _forget(rows, group_ids=()):
+    """Сбрасывает кеши постов ``(pk, author_id, group_id)``."""
+    pks = [pk for pk, _, _ in rows]
+    lookups.posts.forget_pks(pks)
+    for pk in pks:
+        forget_card(pk)
+    keys = {author_key(author_id) for _, author_id, _ in rows}
+    for _, author_id, group_id in rows:
+        keys.update(
+            feed_key(name) for name in feed_names(author_id, group_id)
+        )
+    keys.update(feed_key(f'group.{pk}') for pk in group_ids if pk)
+    cache.delete_many(list(keys))
+    forget_groups(*group_ids, *(group_id for _, _, group_id in rows))
+
+
+def _delete_chunk(chunk):
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=chunk)
+        rows = list(posts.values_list('pk', 'author_id', 'group_id'))
+        delete_unreferenced_images(posts)
+        notified = set(Notification.objects.filter(
+            post_id__in=chunk
+        ).values_list('user_id', flat=True))
+        Notification.objects.filter(post_id__in=chunk).delete()
+        Comment.objects.filter(post_id__in=chunk).delete()
+        PostTag.objects.filter(post_id__in=chunk).delete()
+        # Без сборщика каскада и сигналов удаления: связанные строки уже
+        # удалены, их работа делается ниже.
+        posts._raw_delete(posts.db)
+    _forget(rows)
+    cache.delete_many([unread_cache_key(pk) for pk in notified])
+    return len(rows)
+
+
+def delete_posts(batch_id, post_ids):
+    """Фоновая задача: удаляет посты порциями."""
+    processed = 0
+    for chunk in _chunks(post_ids):
+        processed += _delete_chunk(chunk)
+        _report(batch_id, 'delete', len(post_ids), processed)
+    _report(batch_id, 'delete', len(post_ids), processed, done=True)
+    logger.info('Удалено постов: %s из %s', processed, len(post_ids))
+
+
+def _move_chunk(chunk, group_id):
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=chunk)
+        rows = list(posts.values_list('pk', 'author_id', 'group_id'))
+        posts.update(group_id=group_id)
+    _forget(rows, group_ids=[group_id])
+    return len(rows)
+
+
+def move_posts(batch_id, post_ids, group_id):
+    """Фоновая задача: переносит посты в группу (None — без группы)."""
+    processed = 0
+    for chunk in _chunks(post_ids):
+        processed += _move_chunk(chunk, group_id)
+        _report(batch_id, 'move', len(post_ids), processed)
+    _report(batch_id, 'move', len(post_ids), processed, done=True)
+
+
+def _start(action, func, post_ids, *args):
+    batch_id = uuid.uuid4().hex
+    post_ids = sorted(post_ids)
+    _report(batch_id, action, len(post_ids), 0)
+    enqueue(func, args=(batch_id, post_ids, *args))
+    return batch_id
+
+
+def schedule_delete(post_ids):
+    """Ставит удаление постов в очередь, возвращает id задачи."""
+    return _start('delete', delete_posts, post_ids)
+
+
+def schedule_move(post_ids, group_id):
+    """Ставит перенос постов в группу в очередь, возвращает id задачи."""
+    return _start('move', move_posts, post_ids, group_id)
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import Follow, Notification, Post
+
+User = get_user_model()
+
+UNREAD_CACHE_KEY = 'posts.notifications.unread.{}'
+
+
+def unread_cache_key(user_id):
+    return UNREAD_CACHE_KEY.format(user_id)
+
+
+def unread_count(user):
+    key = unread_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count)
+    return count
+
+
+def notify_followers(post_id):
+    """
+    Рассылает уведомление о новом посте всем подписчикам автора.
+
+    Подписчики читаются курсором и пишутся пачками по
+    NOTIFICATIONS_BATCH_SIZE, так что память не растёт с числом
+    подписчиков. Вызывается в фоне после коммита поста.
+    """
+    post = Post.objects.filter(pk=post_id).only('author_id').first()
+    if post is None:
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    ).iterator(chunk_size=settings.NOTIFICATIONS_BATCH_SIZE)
+    batch = []
+    for user_id in followers:
+        batch.append(Notification(user_id=user_id, post_id=post_id))
+        if len(batch) >= settings.NOTIFICATIONS_BATCH_SIZE:
+            _flush(batch)
+            batch = []
+    _flush(batch)
+
+
+def notify_mentioned(post_id, usernames):
+    """
+    Уведомляет пользователей, упомянутых в посте через @username; автор
+    сам себя не уведомляет. Вызывается в фоне после коммита поста.
+    """
+    post = Post.objects.filter(pk=post_id).only('author_id').first()
+    if post is None:
+        return
+    users = User.objects.filter(
+        username__in=usernames, is_active=True
+    ).exclude(pk=post.author_id).values_list('pk', flat=True)
+    _flush([
+        Notification(user_id=user_id, post_id=post_id,
+                     kind=Notification.MENTION)
+        for user_id in users
+    ])
+
+
+def _flush(batch):
+    if not batch:
+        return
+    Notification.objects.bulk_create(batch)
+    cache.delete_many([unread_cache_key(n.user_id) for n in batch])
+
+
+def notifications_page(user, before=None):
+    """
+    Страница уведомлений с пагинацией по ключу: ``before`` — id
+    последнего уведомления предыдущей страницы.
+
+    Возвращает список уведомлений и id для ссылки на следующую страницу.
+    """
+    per_page = settings.NOTIFICATIONS_ON_PAGE
+    notifications = Notification.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+    if before is not None:
+        notifications = notifications.filter(pk__lt=before)
+    page = list(notifications[:per_page + 1])
+    next_before = page[per_page - 1].pk if len(page) > per_page else None
+    return page[:per_page], next_before
+
+
+def mark_read(user, notifications):
+    unread = [n.pk for n in notifications if not n.is_read]
+    if unread:
+        Notification.objects.filter(pk__in=unread).update(is_read=True)
+        cache.delete(unread_cache_key(user.pk))
@@ -0,0 +1,192 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.jobs import enqueue
+
+from . import autocomplete, feeds, lookups
+from .cards import forget_card
+from .archive import forget_counts
+from .group_pages import forget_groups
+from .media import forget_unreferenced_thumbnails
+from .models import ArchivedPost, Group, Post
+from .notifications import notify_followers, notify_mentioned
+from .tags import index_post
+from .thumbnails import NOT_MEASURED, make_variants
+from .timeline import add_post, remove_post
+
+User = get_user_model()
+
+# Поля, которые выводятся из картинки и при её смене пересчитываются.
+IMAGE_DERIVED_FIELDS = (
+    'image_variants', 'image_width', 'image_height', 'image_placeholder',
+)
+
+
+@receiver(post_save, sender=Post)
+def notify_on_publish(sender, instance, created, **kwargs):
+    if created:
+        enqueue(notify_followers, args=(instance.pk,))
+
+
+@receiver(post_save, sender=Post)
+def index_tags(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    mentioned = index_post(instance, created)
+    if mentioned:
+        enqueue(notify_mentioned, args=(instance.pk, mentioned))
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, update_fields=None, **kwargs):
+    instance._old_image = ''
+    instance._old_group_id = None
+    if instance.pk is None:
+        return
+    # Фоновые задачи сохраняют пост с update_fields без картинки и
+    # группы, и старые значения им не нужны.
+    if update_fields is not None and not (
+        {'image', 'group', 'group_id'} & set(update_fields)
+    ):
+        return
+    old_values = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image', *IMAGE_DERIVED_FIELDS
+    ).first()
+    if old_values is None:
+        return
+    instance._old_group_id, old_image, *derived = old_values
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance._old_image = old_image or ''
+    # Варианты и размеры может дописать фоновая задача, у сохраняемого
+    # экземпляра они могут быть устаревшими.
+    if instance._old_image == instance.image.name:
+        for field, value in zip(IMAGE_DERIVED_FIELDS, derived):
+            setattr(instance, field, value)
+    else:
+        # Имя загруженного файла станет известно только после записи в
+        # хранилище: та же картинка получит прежнее имя, и
+        # restore_or_cut_variants() вернёт ей прежние варианты.
+        instance._old_derived = dict(zip(IMAGE_DERIVED_FIELDS, derived))
+        instance.image_variants = ''
+        # Размеры и заглушку новой картинки считает make_variants.
+        for field, value in NOT_MEASURED.items():
+            setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Post)
+def forget_replaced_image(sender, instance, **kwargs):
+    old_image = getattr(instance, '_old_image', '')
+    if old_image and old_image != instance.image.name:
+        enqueue(forget_unreferenced_thumbnails, args=(old_image,))
+
+
+@receiver(post_save, sender=Post)
+def restore_or_cut_variants(sender, instance, update_fields=None,
+                            **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if not instance.image:
+        return
+    if instance.image.name != getattr(instance, '_old_image', ''):
+        enqueue(make_variants, args=(instance.pk,))
+        return
+    old_derived = getattr(instance, '_old_derived', None)
+    if old_derived:
+        # Заново загружена та же картинка: update() без сигналов
+        # возвращает варианты и размеры, сброшенные в pre_save.
+        Post.objects.filter(
+            pk=instance.pk, image=instance.image.name
+        ).update(**old_derived)
+        for field, value in old_derived.items():
+            setattr(instance, field, value)
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        enqueue(forget_unreferenced_thumbnails,
+                args=(instance.image.name,))
+
+
+@receiver(post_save, sender=Post)
+def update_author_timeline(sender, instance, **kwargs):
+    forget_card(instance.pk)
+    add_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_author_timeline(sender, instance, **kwargs):
+    forget_card(instance.pk)
+    remove_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_feeds(sender, instance, **kwargs):
+    feeds.add_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_feeds(sender, instance, **kwargs):
+    feeds.remove_post(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_cached_post(sender, instance, **kwargs):
+    lookups.posts.forget(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_group_pages(sender, instance, **kwargs):
+    # При переносе в другую группу меняются страницы обеих.
+    forget_groups(
+        instance.group_id, getattr(instance, '_old_group_id', None)
+    )
+
+
+@receiver(post_save, sender=ArchivedPost)
+@receiver(post_delete, sender=ArchivedPost)
+def forget_cached_archived_post(sender, instance, **kwargs):
+    lookups.archived_posts.forget(instance)
+    forget_counts()
+    forget_groups(instance.group_id)
+    feeds.forget_feeds(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    lookups.groups.forget(instance)
+    forget_groups(instance.pk)
+    feeds.forget_group(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def index_group(sender, instance, update_fields=None, **kwargs):
+    autocomplete.groups.update(instance, update_fields=update_fields)
+
+
+@receiver(post_delete, sender=Group)
+def unindex_group(sender, instance, **kwargs):
+    autocomplete.groups.update(instance, indexed=False)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_author(sender, instance, **kwargs):
+    lookups.authors.forget(instance)
+
+
+@receiver(post_save, sender=User)
+def index_author(sender, instance, update_fields=None, **kwargs):
+    autocomplete.authors.update(
+        instance, indexed=instance.is_active, update_fields=update_fields
+    )
+
+
+@receiver(post_delete, sender=User)
+def unindex_author(sender, instance, **kwargs):
+    autocomplete.authors.update(instance, indexed=False)
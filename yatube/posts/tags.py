@@ -0,0 +1,93 @@
+"""
+Хештеги и упоминания в текстах постов.
+
+При сохранении поста его текст разбирается, а ``#тег`` и ``@username``
+записываются в таблицу PostTag вместе с датой публикации поста. Лента
+тега — выборка по индексу ``(kind, tag, -pub_date)`` с пагинацией по
+курсору, так что поиск по тегу не сканирует тексты постов. Новые
+упоминания рассылают уведомления упомянутым пользователям.
+
+Теги есть только у горячих постов: при переносе в архив они удаляются.
+"""
+import re
+
+from django.conf import settings
+from django.db.models import Q
+
+from .cards import get_cards
+from .models import PostTag
+from .timeline import older_than, post_cursor
+
+HASHTAG_RE = re.compile(r'(?<![\w#&])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]+)')
+
+TAG_MAX_LENGTH = PostTag._meta.get_field('tag').max_length
+
+
+def parse(text):
+    """Множество пар ``(вид, тег)`` из текста поста."""
+    tags = {(PostTag.HASHTAG, tag.lower()) for tag in HASHTAG_RE.findall(text)}
+    for username in MENTION_RE.findall(text):
+        # Точка в конце — скорее конец предложения, чем часть имени.
+        username = username.rstrip('.-')
+        if username:
+            tags.add((PostTag.MENTION, username))
+    return {
+        (kind, tag) for kind, tag in tags if len(tag) <= TAG_MAX_LENGTH
+    }
+
+
+def tag_rows(post, tags):
+    return [
+        PostTag(post_id=post.pk, kind=kind, tag=tag, pub_date=post.pub_date)
+        for kind, tag in tags
+    ]
+
+
+def index_post(post, created=False):
+    """
+    Приводит теги поста в соответствие с его текстом. Возвращает имена
+    пользователей, упомянутых впервые.
+    """
+    tags = parse(post.text)
+    old = set() if created else set(PostTag.objects.filter(
+        post_id=post.pk
+    ).values_list('kind', 'tag'))
+    removed = old - tags
+    if removed:
+        condition = Q()
+        for kind, tag in removed:
+            condition |= Q(kind=kind, tag=tag)
+        PostTag.objects.filter(condition, post_id=post.pk).delete()
+    added = tags - old
+    PostTag.objects.bulk_create(tag_rows(post, added))
+    return sorted(tag for kind, tag in added if kind == PostTag.MENTION)
+
+
+def split_tag(value):
+    """``'@leo'`` — упоминание leo, всё остальное — хештег."""
+    if value.startswith(PostTag.MENTION):
+        return PostTag.MENTION, value[1:]
+    return PostTag.HASHTAG, value.lstrip(PostTag.HASHTAG).lower()
+
+
+def tag_feed(kind, tag, after=None):
+    """
+    Страница постов с тегом после курсора ``after``, от новых к старым.
+
+    Возвращает список постов и курсор следующей страницы или None.
+    """
+    per_page = settings.POSTS_ON_PAGE
+    rows = PostTag.objects.filter(kind=kind, tag=tag).order_by(
+        '-pub_date', '-post_id'
+    )
+    if after is not None:
+        rows = rows.filter(older_than(after, 'post_id'))
+    post_ids = list(rows.values_list('post_id', flat=True)[:per_page + 1])
+    cards = get_cards(post_ids)
+    posts = [cards[pk] for pk in post_ids if pk in cards]
+    next_cursor = None
+    if len(post_ids) > per_page:
+        posts = posts[:per_page]
+        next_cursor = post_cursor(posts[-1])
+    return posts, next_cursor
@@ -0,0 +1,21 @@
+from django import template
+
+from posts import thumbnails
+from posts.cards import THUMBNAIL_GEOMETRY
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(post):
+    """Варианты картинки поста или карточки для ``<picture>``."""
+    return thumbnails.picture(
+        post.image, post.image_variants, post.image_width
+    )
+
+
+@register.simple_tag
+def thumbnail_box():
+    """Размеры миниатюры ленты, которая выводится без вариантов."""
+    width, height = THUMBNAIL_GEOMETRY.split('x')
+    return {'width': int(width), 'height': int(height)}
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', '1234'
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.posts = Post.objects.bulk_create(
+            Post(author=cls.authors[i % 3], text=f'Пост {i}', group=cls.group)
+            for i in range(150)
+        )
+        post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=author, text='Комментарий')
+            for author in cls.authors
+        )
+        Follow.objects.create(user=cls.authors[0], author=cls.authors[1])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def get_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, queries
+
+    def test_changelists_open(self):
+        """Списки в админке открываются и используют оценку числа строк."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                response, _ = self.get_queries(
+                    reverse(f'admin:posts_{model}_changelist')
+                )
+                self.assertFalse(response.context['cl'].show_full_result_count)
+
+    def test_post_changelist_query_count_is_flat(self):
+        """Число запросов не зависит от числа авторов и групп на странице."""
+        url = reverse('admin:posts_post_changelist')
+        self.get_queries(url)
+        _, first_page = self.get_queries(url)
+        _, last_page = self.get_queries(url + '?p=1')
+        self.assertEqual(len(first_page), len(last_page))
+        # С кешем процесса сессия и пользователь читаются из базы, см.
+        # core.caching; авторы постов по одному не читаются.
+        self.assertLess(len(first_page), 7)
+        sql = ' '.join(query['sql'] for query in first_page)
+        self.assertEqual(
+            sql.count('FROM "auth_user" WHERE "auth_user"."id" ='), 1
+        )
+
+    def test_input_filter(self):
+        """Фильтр по автору принимает имя пользователя."""
+        response, _ = self.get_queries(
+            reverse('admin:posts_comment_changelist')
+            + '?author__username=author1'
+        )
+        results = response.context['cl'].result_list
+        self.assertEqual(
+            [comment.author.username for comment in results], ['author1']
+        )
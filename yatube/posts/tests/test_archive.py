@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.archive import archive_old_posts, post_list
+from posts.models import (
+    ArchivedComment, ArchivedPost, Comment, Group, Notification, Post,
+)
+
+User = get_user_model()
+
+# Горячих постов меньше страницы, вторая страница целиком из архива.
+HOT = 3
+OLD = settings.POSTS_ON_PAGE + 2
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(HOT + OLD):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+        long_ago = timezone.now() - timedelta(
+            days=settings.POST_ARCHIVE_AFTER_DAYS + 1
+        )
+        for number, post in enumerate(Post.objects.order_by('pk')[:OLD]):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=long_ago + timedelta(minutes=number)
+            )
+        cls.old_post = Post.objects.order_by('pk').first()
+        Comment.objects.create(
+            post=cls.old_post, author=cls.reader, text='Старый комментарий'
+        )
+        Notification.objects.create(user=cls.reader, post=cls.old_post)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_old_posts_moved_with_comments(self):
+        """Старые посты переезжают в архив с комментариями, уведомления
+        о них удаляются, свежие остаются на месте."""
+        expected = list(Post.objects.values_list('pk', 'text', 'pub_date'))
+        self.assertEqual(archive_old_posts(chunk_size=5), OLD)
+        self.assertEqual(Post.objects.count(), HOT)
+        self.assertEqual(ArchivedPost.objects.count(), OLD)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old_post.pk)
+        self.assertEqual(comment.text, 'Старый комментарий')
+        moved = list(ArchivedPost.objects.values_list(
+            'pk', 'text', 'pub_date'
+        )) + list(Post.objects.values_list('pk', 'text', 'pub_date'))
+        self.assertCountEqual(moved, expected)
+        self.assertEqual(archive_old_posts(), 0)
+
+    def test_post_list_continues_into_archive(self):
+        """Лента идёт от горячих постов к архивным без пропусков."""
+        expected = list(Post.objects.values_list('pk', flat=True))
+        archive_old_posts()
+        posts = post_list(group=self.group)
+        self.assertEqual(posts.count(), HOT + OLD)
+        self.assertEqual([post.pk for post in posts[0:HOT + OLD]], expected)
+        self.assertEqual(
+            [post.pk for post in posts[HOT - 1:HOT + 1]],
+            expected[HOT - 1:HOT + 1],
+        )
+        self.assertIsInstance(posts[HOT], ArchivedPost)
+
+    def test_deep_pages_and_detail_read_archive(self):
+        """Глубокие страницы профиля и страница архивного поста
+        показывают архив; комментировать его нельзя."""
+        archive_old_posts()
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            {'page': 2},
+        )
+        self.assertTrue(all(
+            post.is_archived for post in response.context['page_obj']
+        ))
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, HOT + OLD
+        )
+        self.assertContains(response, f'Всего постов: {HOT + OLD}')
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.old_post.pk}
+        ))
+        self.assertEqual(response.context['author_post_count'], HOT + OLD)
+        self.assertContains(response, 'Старый комментарий')
+        self.assertNotContains(response, 'Добавить комментарий')
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.old_post.pk}),
+            {'text': 'Новый'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_archived_image_served(self):
+        """Картинка архивного поста по-прежнему отдаётся."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            storage = Post._meta.get_field('image').storage
+            name = storage.save('posts/old.jpg', ContentFile(b'old'))
+            Post.objects.filter(pk=self.old_post.pk).update(image=name)
+            archive_old_posts()
+            self.assertTrue(ArchivedPost.objects.filter(image=name).exists())
+            response = self.client.get(f'/media/{name}')
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import autocomplete
+from posts.deletion import tombstone_user
+from posts.models import Group
+
+User = get_user_model()
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.leo = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.fyodor = User.objects.create_user(
+            username='fyodor', first_name='Фёдор', last_name='Достоевский'
+        )
+        cls.group = Group.objects.create(
+            title='Русская классика', slug='classics', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        # Индексы живут в процессе и переживают откат транзакций тестов.
+        autocomplete.authors.build()
+        autocomplete.groups.build()
+
+    def search(self, query):
+        return self.client.get(
+            reverse('posts:autocomplete'), {'q': query}
+        ).json()
+
+    def test_prefix_of_any_name(self):
+        """Авторы находятся по началу логина, имени и фамилии, группы —
+        по началу slug и слов названия, без запросов к базе."""
+        with self.assertNumQueries(0):
+            authors = self.search('ТОЛ')['authors']
+            self.assertEqual(
+                [author['username'] for author in authors], ['leo']
+            )
+            self.assertEqual(
+                self.search('федор')['authors'][0]['full_name'],
+                'Фёдор Достоевский',
+            )
+            found = self.search('клас')
+        self.assertEqual(found['groups'], [{
+            'slug': 'classics',
+            'title': 'Русская классика',
+            'url': reverse('posts:groups', kwargs={'slug': 'classics'}),
+        }])
+        self.assertEqual(found['authors'], [])
+        self.assertEqual(self.search(''), {'authors': [], 'groups': []})
+
+    def test_index_follows_saves(self):
+        """Переименование, новая группа и блокировка автора сразу видны
+        в подсказках."""
+        self.leo.last_name = 'Николаевич'
+        self.leo.save()
+        Group.objects.create(title='Поэзия', slug='poetry', description='')
+        self.assertEqual(self.search('тол')['authors'], [])
+        self.assertEqual(len(self.search('никол')['authors']), 1)
+        self.assertEqual(len(self.search('поэ')['groups']), 1)
+        tombstone_user(self.fyodor)
+        self.assertEqual(self.search('fyo')['authors'], [])
+
+    def other_process_index(self):
+        return autocomplete.PrefixIndex(
+            'groups', Group.objects.all(), ('slug', 'title'),
+            autocomplete._group,
+        )
+
+    def test_other_process_applies_changes(self):
+        """Другой процесс применяет изменения из журнала, не перестраивая
+        индекс и не обращаясь к базе."""
+        index = self.other_process_index()
+        self.assertEqual(len(index.search('рус', 10)), 1)
+        Group.objects.create(title='Русский рок', slug='rock', description='')
+        self.group.title = 'Классика'
+        self.group.save()
+        with self.settings(AUTOCOMPLETE_CHECK_INTERVAL=0), \
+                mock.patch.object(index, 'build') as build, \
+                self.assertNumQueries(0):
+            found = index.search('рус', 10)
+            self.assertEqual(index.search('клас', 10)[0]['title'], 'Классика')
+        build.assert_not_called()
+        self.assertEqual([group['slug'] for group in found], ['rock'])
+
+    def test_other_process_rebuilds_index(self):
+        """Процесс, отставший сильнее AUTOCOMPLETE_MAX_CHANGES или
+        потерявший журнал, перестраивает индекс."""
+        index = self.other_process_index()
+        self.assertEqual(len(index.search('рус', 10)), 1)
+        for number in range(3):
+            Group.objects.create(
+                title=f'Русский рок {number}', slug=f'rock{number}',
+                description='',
+            )
+        patched = mock.patch.object(index, 'build', wraps=index.build)
+        with self.settings(AUTOCOMPLETE_CHECK_INTERVAL=0,
+                           AUTOCOMPLETE_MAX_CHANGES=2), patched as build:
+            self.assertEqual(len(index.search('рус', 10)), 4)
+            self.assertEqual(build.call_count, 1)
+            Group.objects.create(title='Русь', slug='rus', description='')
+            cache.clear()
+            self.assertEqual(len(index.search('рус', 10)), 5)
+            self.assertEqual(build.call_count, 2)
+
+    def test_admin_autocomplete_uses_index(self):
+        """Автокомплит админки ищет авторов по префиксу фамилии."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', '1234'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:auth_user_autocomplete'), {'term': 'дост'}
+        )
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            ['fyodor'],
+        )
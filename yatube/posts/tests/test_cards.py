@@ -0,0 +1,88 @@
+import pickle
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from posts.cards import PostCard, card_key, decode, get_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Классика', slug='classics', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Всё смешалось в доме'
+        )
+        cls.orphan = Post.objects.create(author=cls.author, text='Без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_encode_decode_round_trip(self):
+        """Карточка переживает упаковку в байты и pickle без потерь."""
+        for post in (self.post, self.orphan):
+            card = PostCard.from_post(post)
+            for restored in (decode(card.encode()),
+                             pickle.loads(pickle.dumps(card))):
+                self.assertEqual(restored.encode(), card.encode())
+                self.assertEqual(restored.pub_date, post.pub_date)
+                self.assertEqual(restored.group_id, post.group_id)
+                self.assertEqual(restored, post)
+
+    def test_card_is_immutable(self):
+        """Поля карточки нельзя менять и добавлять."""
+        card = PostCard.from_post(self.post)
+        with self.assertRaises(AttributeError):
+            card.text = 'Другой текст'
+        with self.assertRaises(AttributeError):
+            card.author.username = 'other'
+
+    def test_from_queryset_single_query(self):
+        """Карточки строятся одним запросом без экземпляров Post."""
+        with self.assertNumQueries(1):
+            cards = PostCard.from_queryset(
+                Post.objects.order_by('pk')[:10]
+            )
+        self.assertEqual(cards, [self.post, self.orphan])
+        self.assertEqual(cards[0].author.get_full_name(), 'Лев Толстой')
+
+    def test_get_cards_uses_cache_and_forgets_on_save(self):
+        """Повторная выборка идёт из кеша, сохранение поста сбрасывает
+        карточку."""
+        get_cards([self.post.pk])
+        with self.assertNumQueries(0):
+            cards = get_cards([self.post.pk])
+        self.assertEqual(cards[self.post.pk].text, self.post.text)
+        self.post.text = 'Все счастливые семьи'
+        self.post.save()
+        self.assertIsNone(cache.get(card_key(self.post.pk)))
+        self.assertEqual(
+            get_cards([self.post.pk])[self.post.pk].text,
+            'Все счастливые семьи',
+        )
+
+    def test_renders_like_post(self):
+        """Шаблон карточки поста одинаково выводит Post и PostCard."""
+        template = Template(
+            "{{ post.author.get_full_name }}|"
+            "{% url 'post:profile' post.author %}|"
+            "{% url 'post:groups' post.group.slug %}|"
+            "{{ post.group.title }}|{{ post.text }}|"
+            "{% url 'post:post_detail' post.id %}"
+        )
+        card = PostCard.from_post(self.post)
+        self.assertEqual(
+            template.render(Context({'post': card})),
+            template.render(Context({'post': self.post})),
+        )
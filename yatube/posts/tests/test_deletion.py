@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.deletion import deletion_progress, purge_group, purge_user
+from posts.models import Comment, Follow, Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+User = get_user_model()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    DELETION_CHUNK_SIZE=2,
+    BACKGROUND_TASKS_EAGER=True,
+)
+class BackgroundDeletionTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.posts = Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}', group=self.group)
+            for i in range(5)
+        )
+        self.post = Post.objects.create(author=self.reader, text='Чужой')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def test_purge_user(self):
+        """Данные пользователя удаляются порциями с отчётом о ходе."""
+        post = Post(author=self.author, text='С картинкой')
+        post.image.save('cat.gif', ContentFile(
+            b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff'
+            b'\xff,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+        ))
+        storage = Post._meta.get_field('image').storage
+        purge_user(self.author.pk)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(storage.exists(post.image.name))
+        progress = deletion_progress('user', self.author.pk)
+        self.assertTrue(progress['done'])
+        self.assertEqual(progress['deleted']['posts'], 6)
+
+    def test_purge_group(self):
+        """Посты удаляемой группы остаются без группы."""
+        purge_group(self.group.pk)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 6)
+        self.assertTrue(deletion_progress('group', self.group.pk)['done'])
+
+    @mock.patch('posts.deletion.enqueue')
+    def test_admin_tombstones_user(self, enqueue):
+        """Удаление из админки сразу блокирует пользователя."""
+        admin = User.objects.create_superuser('admin', 'a@yatube.ru', '1')
+        client = Client()
+        client.force_login(admin)
+        client.post(
+            reverse('admin:auth_user_delete', args=(self.author.pk,)),
+            {'post': 'yes'},
+        )
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertFalse(self.author.has_usable_password())
+        self.assertEqual(
+            deletion_progress('user', self.author.pk)['stage'], 'queued'
+        )
+        enqueue.assert_called_once_with(purge_user, args=(self.author.pk,))
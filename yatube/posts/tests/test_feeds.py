@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_list_latest_posts(self):
+        """RSS и Atom сайта, группы и автора отдают последние посты."""
+        urls = (
+            reverse('posts:rss'),
+            reverse('posts:atom'),
+            reverse('posts:group_rss', kwargs={'slug': 'group'}),
+            reverse('posts:group_atom', kwargs={'slug': 'group'}),
+            reverse('posts:profile_rss', kwargs={'username': 'author'}),
+            reverse('posts:profile_atom', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertLess(
+                    content.index('Пост 2'), content.index('Пост 0')
+                )
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'nothing'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(FEED_LENGTH=2)
+    def test_feed_bounded_and_updated_on_save(self):
+        """В ленте не больше FEED_LENGTH постов, новый пост появляется в
+        закешированной ленте без её пересборки."""
+        url = reverse('posts:rss')
+        content = self.client.get(url).content.decode()
+        self.assertNotIn('Пост 0', content)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        # Список не пересобирается, запрос только за карточкой поста.
+        with self.assertNumQueries(1):
+            content = self.client.get(url).content.decode()
+        self.assertIn('Свежий пост', content)
+        self.assertNotIn('Пост 1', content)
+
+    def test_conditional_requests(self):
+        """Повторный опрос без изменений получает 304, после правки
+        поста — новую ленту."""
+        url = reverse('posts:group_atom', kwargs={'slug': 'group'})
+        response = self.client.get(url)
+        etag, modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+        post = Post.objects.get(text='Пост 1')
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Исправленный пост', response.content.decode())
+
+    def test_rebuilt_feed_keeps_validators(self):
+        """Лента, построенная заново, отдаёт те же Last-Modified и ETag:
+        время изменения берётся из даты самого нового поста."""
+        url = reverse('posts:rss')
+        first = self.client.get(url)
+        cache.clear()
+        second = self.client.get(url)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first['Last-Modified'], second['Last-Modified'])
+        newest = Post.objects.latest('pub_date').pub_date
+        self.assertEqual(
+            second['Last-Modified'], http_date(newest.timestamp())
+        )
+
+    def test_moved_post_leaves_group_feed(self):
+        """Пост, перенесённый в другую группу, пропадает из ленты старой
+        группы и появляется в ленте новой."""
+        old = reverse('posts:group_rss', kwargs={'slug': 'group'})
+        new = reverse('posts:group_rss', kwargs={'slug': 'other'})
+        self.client.get(old)
+        self.client.get(new)
+        post = Post.objects.get(text='Пост 1')
+        post.group = self.other
+        post.save()
+        self.assertNotIn('Пост 1', self.client.get(old).content.decode())
+        self.assertIn('Пост 1', self.client.get(new).content.decode())
+        post.delete()
+        self.assertNotIn('Пост 1', self.client.get(new).content.decode())
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.group_pages import group_version
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class GroupPagesCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.first = Group.objects.create(
+            title='Первая', slug='first', description='Описание'
+        )
+        cls.second = Group.objects.create(
+            title='Вторая', slug='second', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.first, text='Пост первой группы'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def page(self, group):
+        return self.client.get(
+            reverse('posts:groups', kwargs={'slug': group.slug})
+        ).content.decode()
+
+    def test_cached_page_skips_post_queries(self):
+        """Повторная страница группы не выбирает посты из базы."""
+        self.page(self.first)
+        with CaptureQueriesContext(connection) as context:
+            content = self.page(self.first)
+        self.assertIn('Пост первой группы', content)
+        tables = ' '.join(query['sql'] for query in context)
+        self.assertNotIn('posts_post', tables)
+
+    def test_new_post_resets_only_its_group(self):
+        """Новый пост сбрасывает кеш своей группы и не трогает чужую."""
+        self.page(self.first)
+        self.page(self.second)
+        second_version = group_version(self.second.pk)
+        Post.objects.create(
+            author=self.author, group=self.first, text='Свежий пост'
+        )
+        self.assertIn('Свежий пост', self.page(self.first))
+        self.assertEqual(group_version(self.second.pk), second_version)
+
+    def test_moving_post_resets_both_groups(self):
+        """Перенос поста в другую группу через форму виден на страницах
+        обеих групп."""
+        self.page(self.first)
+        self.page(self.second)
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': self.post.text, 'group': self.second.pk},
+        )
+        self.assertNotIn('Пост первой группы', self.page(self.first))
+        self.assertIn('Пост первой группы', self.page(self.second))
+
+    def test_deleted_post_and_group_change(self):
+        """Удаление поста и правка группы сбрасывают её страницы."""
+        self.page(self.first)
+        version = group_version(self.first.pk)
+        self.first.description = 'Новое описание'
+        self.first.save()
+        self.assertNotEqual(group_version(self.first.pk), version)
+        Post.objects.get(pk=self.post.pk).delete()
+        self.assertNotIn('Пост первой группы', self.page(self.first))
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.lookups import authors, groups, posts
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class CachedLookupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='leo')
+        cls.group = Group.objects.create(
+            title='Классика', slug='classics', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeated_lookup_from_cache(self):
+        """Повторный поиск по slug, username и id не ходит в базу."""
+        for lookup, value, expected in (
+            (groups, 'classics', self.group),
+            (authors, 'leo', self.author),
+            (posts, self.post.pk, self.post),
+        ):
+            with self.subTest(lookup=lookup.prefix):
+                self.assertEqual(lookup.get(value), expected)
+                with self.assertNumQueries(0):
+                    self.assertEqual(lookup.get(value), expected)
+
+    def test_post_cached_with_author_and_group(self):
+        """Пост из кеша отдаёт автора и группу без запросов."""
+        posts.get(self.post.pk)
+        with self.assertNumQueries(0):
+            post = posts.get(self.post.pk)
+            self.assertEqual(post.author.username, 'leo')
+            self.assertEqual(post.group.slug, 'classics')
+
+    def test_missing_value_cached_until_created(self):
+        """Отсутствие объекта кешируется и сбрасывается при создании."""
+        with self.assertRaises(Http404):
+            groups.get_or_404('new')
+        with self.assertNumQueries(0):
+            self.assertIsNone(groups.get('new'))
+        group = Group.objects.create(
+            title='Новая', slug='new', description='Описание'
+        )
+        self.assertEqual(groups.get('new'), group)
+
+    def test_rename_and_delete_invalidate(self):
+        """Переименованный и удалённый объект не отдаётся из кеша."""
+        group = Group.objects.create(
+            title='Старая', slug='old', description='Описание'
+        )
+        self.assertEqual(groups.get('old'), group)
+        group.slug = 'renamed'
+        group.save()
+        self.assertIsNone(groups.get('old'))
+        self.assertEqual(groups.get('renamed').slug, 'renamed')
+        group.delete()
+        self.assertIsNone(groups.get('renamed'))
+
+    def test_get_many_single_query(self):
+        """Пакетный поиск добирает промахи одним запросом."""
+        other = User.objects.create_user(username='anna')
+        authors.get('leo')
+        with self.assertNumQueries(1):
+            found = authors.get_many(['leo', 'anna', 'nobody'])
+        self.assertEqual(found, {'leo': self.author, 'anna': other})
+        with self.assertNumQueries(0):
+            authors.get_many(['leo', 'anna', 'nobody'])
+
+    def test_invalid_post_id(self):
+        """Нечисловой id считается отсутствующим постом."""
+        self.assertIsNone(posts.get('abc'))
+
+    def test_private_user_fields_not_cached(self):
+        """Хеш пароля и почта не попадают в кеш ни с автором, ни с
+        постом."""
+        self.author.email = 'leo@yatube.ru'
+        self.author.set_password('secret')
+        self.author.save()
+        authors.get('leo')
+        posts.get(self.post.pk)
+        for key in (
+            authors.object_key(self.author.pk),
+            posts.object_key(self.post.pk),
+        ):
+            cached = cache.get(key)
+            user = getattr(cached, 'author', cached)
+            self.assertEqual(user.username, 'leo')
+            self.assertNotIn('password', user.__dict__)
+            self.assertNotIn('email', user.__dict__)
+
+    def test_edit_writes_over_fresh_row(self):
+        """Правка поста, закешированного до чужого изменения, не
+        возвращает старые значения полей."""
+        posts.get(self.post.pk)
+        moved = self.post.pub_date - timedelta(days=1)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=moved)
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Правка', 'group': ''},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Правка')
+        self.assertEqual(self.post.pub_date, moved)
@@ -0,0 +1,145 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default, get_thumbnail
+
+from posts import media_gc
+from posts.cards import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS, get_cards
+from posts.models import ArchivedPost, Post
+from posts.thumbnails import make_variants
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+SMALL_GIF = (
+    b'GIF89a\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff'
+    b'!\xf9\x04\x00\x00\x00\x00\x00,\x00\x00\x00\x00\x02\x00\x01\x00'
+    b'\x00\x02\x02\x0c\n\x00;'
+)
+
+
+def media_files():
+    return {
+        os.path.relpath(os.path.join(root, name), TEMP_MEDIA_ROOT)
+        for root, _, names in os.walk(TEMP_MEDIA_ROOT) for name in names
+    }
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_WIDTHS=(320, 960),
+    POST_IMAGE_FORMATS=('WEBP', 'JPEG'),
+)
+class MediaGarbageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        default.kvstore.clear()
+        author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            author=author, text='Горячий',
+            image=SimpleUploadedFile('hot.gif', SMALL_GIF, 'image/gif'),
+        )
+        get_thumbnail(self.post.image, THUMBNAIL_GEOMETRY,
+                      **THUMBNAIL_OPTIONS)
+        make_variants(self.post.pk)
+        storage = Post._meta.get_field('image').storage
+        archived = storage.save(
+            'posts/old.gif', ContentFile(SMALL_GIF + b'\x00')
+        )
+        ArchivedPost.objects.create(
+            author=author, text='Архивный', image=archived
+        )
+        self.live = media_files()
+        self.orphan = storage.save(
+            'posts/orphan.gif', ContentFile(SMALL_GIF + b'\x01')
+        )
+        self.stale = get_thumbnail(self.orphan, '100x100').name
+
+    def tearDown(self):
+        # Записи sorl о миниатюрах живут в памяти процесса и пережили бы
+        # откат транзакции и удалённые файлы.
+        default.kvstore.clear()
+
+    def collect(self, *args):
+        out = io.StringIO()
+        call_command(
+            'collect_media_garbage', '--min-age=0', '--chunk-size=1', *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_orphans_removed(self):
+        """Картинка без поста и её миниатюры удаляются, картинки горячих
+        и архивных постов, их карточки и варианты остаются."""
+        self.assertIn(self.stale, media_files())
+        # Миниатюра карточки и четыре варианта.
+        self.assertEqual(
+            len([name for name in self.live if name.startswith('cache/')]), 5
+        )
+        output = self.collect()
+        self.assertEqual(media_files(), self.live)
+        self.assertIn('Удалено файлов: 2', output)
+
+    @override_settings(POST_IMAGE_WIDTHS=(320,))
+    def test_card_thumbnail_kept(self):
+        """Миниатюра, которую построила карточка поста без вариантов,
+        остаётся, даже когда её размер не совпадает ни с одним
+        вариантом."""
+        post = Post.objects.create(
+            author=self.post.author, text='Без вариантов',
+            image=SimpleUploadedFile(
+                'card.gif', SMALL_GIF + b'\x02', 'image/gif'
+            ),
+        )
+        url = get_cards([post.pk])[post.pk].thumbnail_url
+        path = os.path.relpath(
+            url, Post._meta.get_field('image').storage.base_url
+        )
+        self.assertIn(path, media_files())
+        self.collect()
+        self.assertIn(path, media_files())
+
+    def test_dry_run(self):
+        """Пробный прогон только считает лишние файлы."""
+        before = media_files()
+        output = self.collect('--dry-run', '--verbosity=2')
+        self.assertEqual(media_files(), before)
+        self.assertIn(self.orphan, output)
+        self.assertIn('Будет удалено файлов: 2', output)
+
+    def test_recent_files_kept(self):
+        """Свежие файлы и картинки, на которые успел сослаться пост, не
+        удаляются."""
+        self.assertIn('Удалено файлов: 0', self.collect('--min-age=3600'))
+        Post.objects.filter(pk=self.post.pk).update(image=self.orphan)
+        self.collect()
+        self.assertIn(self.orphan, media_files())
+
+    def test_reference_set(self):
+        """Множество ссылок находит имена из всех порций."""
+        names = [f'posts/{number}.jpg' for number in range(50)]
+        media_gc.RUN_SIZE, run_size = 7, media_gc.RUN_SIZE
+        try:
+            references = media_gc.ReferenceSet()
+            for name in names[::2]:
+                references.add(name)
+            found = [name for name in names if name in references]
+        finally:
+            media_gc.RUN_SIZE = run_size
+        self.assertEqual(found, names[::2])
+        self.assertEqual(len(references), 25)
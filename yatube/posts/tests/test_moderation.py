@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.cards import card_key, get_cards
+from posts.group_pages import group_version
+from posts.models import Comment, Group, Notification, Post, PostTag
+from posts.thumbnails import make_variants, picture
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+SMALL_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff'
+    b'\xff,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+User = get_user_model()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    DELETION_CHUNK_SIZE=2,
+    BACKGROUND_TASKS_EAGER=True,
+)
+class BulkModerationTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        self.spam = [
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Спам #{i}'
+            )
+            for i in range(5)
+        ]
+        self.post = Post.objects.create(author=self.reader, text='Не спам')
+        Comment.objects.create(
+            post=self.spam[0], author=self.reader, text='Комментарий'
+        )
+        Notification.objects.create(user=self.reader, post=self.spam[0])
+        admin = User.objects.create_superuser('admin', 'a@yatube.ru', '1')
+        self.client = Client()
+        self.client.force_login(admin)
+
+    def act(self, action, posts, **data):
+        return self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': action,
+                '_selected_action': [post.pk for post in posts],
+                **data,
+            },
+            follow=True,
+        )
+
+    def batch_progress(self, response):
+        url = [
+            str(message) for message in response.context['messages']
+        ][0].split('href="')[1].split('"')[0]
+        return self.client.get(url).context['progress']
+
+    def test_delete_in_background(self):
+        """Посты удаляются порциями вместе с комментариями, тегами,
+        уведомлениями и файлом картинки; кеши сброшены."""
+        self.spam[1].image.save('spam.gif', ContentFile(SMALL_GIF))
+        image = self.spam[1].image.name
+        storage = Post._meta.get_field('image').storage
+        get_cards([post.pk for post in self.spam])
+        version = group_version(self.group.pk)
+        response = self.act('delete_in_background', self.spam)
+        self.assertEqual(Post.objects.get(), self.post)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(PostTag.objects.exists())
+        self.assertFalse(storage.exists(image))
+        self.assertIsNone(cache.get(card_key(self.spam[0].pk)))
+        self.assertNotEqual(group_version(self.group.pk), version)
+        self.assertEqual(
+            self.batch_progress(response),
+            {'action': 'delete', 'total': 5, 'processed': 5, 'done': True},
+        )
+
+    def test_delete_keeps_shared_image_thumbnails(self):
+        """Картинка, которую выводит оставшийся пост, сохраняется вместе
+        с миниатюрами."""
+        self.spam[1].image.save('spam.gif', ContentFile(SMALL_GIF))
+        self.post.image.save('same.gif', ContentFile(SMALL_GIF))
+        self.assertEqual(self.post.image.name, self.spam[1].image.name)
+        make_variants(self.post.pk)
+        self.post.refresh_from_db()
+        src = picture(self.post.image, self.post.image_variants)['src']
+        path = os.path.join(TEMP_MEDIA_ROOT, src[len('/media/'):])
+        self.assertTrue(os.path.exists(path))
+        self.act('delete_in_background', self.spam)
+        self.assertTrue(self.post.image.storage.exists(self.post.image.name))
+        self.assertTrue(os.path.exists(path))
+
+    def test_move_to_group(self):
+        """Перенос в группу меняет ленты обеих групп, пустой выбор
+        оставляет посты без группы."""
+        versions = group_version(self.group.pk), group_version(self.other.pk)
+        self.act('move_to_group', self.spam[:3], group=self.other.pk)
+        self.assertEqual(self.other.posts.count(), 3)
+        self.assertNotEqual(
+            (group_version(self.group.pk), group_version(self.other.pk)),
+            versions,
+        )
+        response = self.act('move_to_group', self.spam[3:])
+        self.assertFalse(self.group.posts.exists())
+        self.assertEqual(self.batch_progress(response)['processed'], 2)
+
+    def test_default_delete_disabled(self):
+        """Штатного удаления выбранных постов в админке нет."""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        form = response.context['action_form']
+        actions = dict(form.fields['action'].choices)
+        self.assertNotIn('delete_selected', actions)
+        self.assertIn('delete_in_background', actions)
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.shortcuts import render
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.views.decorators.cache import cache_page
+
+from posts.models import Follow, Notification, Post
+from posts.notifications import notify_followers, unread_count
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_BATCH_SIZE=2, NOTIFICATIONS_ON_PAGE=2)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.followers = [
+            User.objects.create_user(username=f'follower{i}')
+            for i in range(5)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=user, author=cls.author) for user in cls.followers
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.followers[0])
+
+    def publish(self, count=1):
+        for _ in range(count):
+            post = Post.objects.create(author=self.author, text='Новый пост')
+            notify_followers(post.pk)
+
+    def test_notify_followers(self):
+        """Каждый подписчик получает одно уведомление о новом посте."""
+        self.publish()
+        self.assertEqual(Notification.objects.count(), len(self.followers))
+        self.assertEqual(unread_count(self.followers[0]), 1)
+
+    def test_unread_badge_is_cached(self):
+        """Счётчик непрочитанных после первого запроса берётся из кеша."""
+        self.publish()
+        unread_count(self.followers[0])
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.followers[0]), 1)
+        self.publish()
+        self.assertEqual(unread_count(self.followers[0]), 2)
+
+    def test_badge_keeps_page_out_of_cache(self):
+        """Страница со счётчиком не сохраняется в кеш страниц, и аноним
+        не видит чужой счётчик."""
+        self.publish()
+
+        @cache_page(60)
+        def header(request):
+            return render(request, 'includes/header.html')
+
+        request = RequestFactory().get('/header/')
+        request.user = self.followers[0]
+        self.assertIn('badge bg-danger', header(request).content.decode())
+        request = RequestFactory().get('/header/')
+        request.user = AnonymousUser()
+        self.assertNotIn('badge bg-danger', header(request).content.decode())
+
+    def test_notifications_page_keyset(self):
+        """Страница уведомлений листается по ключу и отмечает прочитанное."""
+        self.publish(3)
+        response = self.client.get(reverse('posts:notifications'))
+        first_page = response.context['notification_list']
+        self.assertEqual(len(first_page), 2)
+        next_before = response.context['next_before']
+        self.assertEqual(next_before, first_page[-1].pk)
+        response = self.client.get(
+            reverse('posts:notifications') + f'?before={next_before}'
+        )
+        self.assertEqual(len(response.context['notification_list']), 1)
+        self.assertIsNone(response.context['next_before'])
+        self.assertEqual(unread_count(self.followers[0]), 0)
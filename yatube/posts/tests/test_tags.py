@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Notification, Post, PostTag
+from posts.notifications import notify_mentioned
+from posts.tags import index_post, parse
+from posts.timeline import decode_cursor
+
+User = get_user_model()
+
+
+class TagsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def tags(self, post):
+        return set(post.tags.values_list('kind', 'tag'))
+
+    def test_parse(self):
+        """Хештеги приводятся к нижнему регистру, точка после
+        упоминания и якоря в ссылках тегами не считаются."""
+        self.assertEqual(
+            parse('#Django и #django, спасибо @reader. См. a#b, &#39; и '
+                  'почту leo@mail.ru'),
+            {('#', 'django'), ('@', 'reader')},
+        )
+
+    def test_tags_follow_text(self):
+        """Правка поста добавляет новые теги и убирает исчезнувшие,
+        уведомление получают только впервые упомянутые."""
+        post = Post.objects.create(
+            author=self.author, text='#python @author @reader'
+        )
+        self.assertEqual(
+            self.tags(post),
+            {('#', 'python'), ('@', 'author'), ('@', 'reader')},
+        )
+        post.text = '#django @reader'
+        post.save()
+        self.assertEqual(self.tags(post), {('#', 'django'), ('@', 'reader')})
+        self.assertEqual(index_post(post), [])
+        notify_mentioned(post.pk, ['author', 'reader', 'nobody'])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.reader)
+        self.assertEqual(notification.kind, Notification.MENTION)
+        self.client.force_login(self.reader)
+        self.assertContains(
+            self.client.get(reverse('posts:notifications')), 'Вас упомянул'
+        )
+
+    @override_settings(POSTS_ON_PAGE=2)
+    def test_tag_feed_keyset_pages(self):
+        """Лента тега листается по курсору без повторов и пропусков,
+        упоминания открываются по /tags/@username/."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'{i} #тег')
+            for i in range(5)
+        ]
+        Post.objects.create(author=self.author, text='другой #текст')
+        seen = []
+        after = None
+        while True:
+            response = self.client.get(
+                reverse('posts:tag', kwargs={'tag': 'Тег'}),
+                {'after': after} if after else {},
+            )
+            seen.extend(post.pk for post in response.context['page_obj'])
+            after = response.context['next_cursor']
+            if after is None:
+                break
+            self.assertIsNotNone(decode_cursor(after))
+        self.assertEqual(seen, [post.pk for post in reversed(posts)])
+        mention = Post.objects.create(author=self.author, text='@reader')
+        response = self.client.get(
+            reverse('posts:tag', kwargs={'tag': '@reader'})
+        )
+        self.assertEqual(list(response.context['page_obj']), [mention])
+
+    def test_reindex_command(self):
+        """Команда восстанавливает теги старых постов порциями."""
+        for i in range(5):
+            Post.objects.create(author=self.author, text=f'#old{i % 2}')
+        PostTag.objects.all().delete()
+        out = StringIO()
+        call_command('reindex_tags', chunk_size=2, stdout=out)
+        self.assertEqual(
+            PostTag.objects.filter(tag='old0').count(), 3
+        )
+        self.assertEqual(PostTag.objects.count(), 5)
+        self.assertIn('тегов 5', out.getvalue())
@@ -0,0 +1,210 @@
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.jobs import run_pending
+from core.models import Job
+from posts.models import Post
+from posts.cards import PostCard, decode
+from posts.thumbnails import current_signature, make_variants, picture
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+SMALL_GIF = (
+    b'GIF89a\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff'
+    b'!\xf9\x04\x00\x00\x00\x00\x00,\x00\x00\x00\x00\x02\x00\x01\x00'
+    b'\x00\x02\x02\x0c\n\x00;'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_WIDTHS=(320, 960),
+    POST_IMAGE_FORMATS=('AVIF', 'WEBP', 'JPEG'),
+)
+class ImageVariantsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            author=self.author, text='Текст',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_make_variants(self):
+        """Нарезанные варианты лежат на диске ровно по ссылкам srcset."""
+        self.assertIsNone(picture(self.post.image, ''))
+        make_variants(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, current_signature())
+        variants = picture(self.post.image, self.post.image_variants)
+        types = [source['type'] for source in variants['sources']]
+        self.assertEqual(types[-2:], ['image/webp', 'image/jpeg'])
+        urls = re.findall(
+            r'(\S+) \d+w',
+            ' '.join(source['srcset'] for source in variants['sources']),
+        )
+        self.assertEqual(len(urls), 2 * len(types))
+        for url in urls + [variants['src']]:
+            path = os.path.join(TEMP_MEDIA_ROOT, url[len('/media/'):])
+            self.assertTrue(os.path.exists(path), url)
+
+    def test_new_image_resets_variants(self):
+        """Смена картинки сбрасывает подпись, а сохранение поста с
+        устаревшим экземпляром — нет."""
+        stale = Post.objects.get(pk=self.post.pk)
+        make_variants(self.post.pk)
+        stale.text = 'Новый текст'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, current_signature())
+        self.post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, '')
+
+    def test_same_image_upload_keeps_variants(self):
+        """Повторная загрузка той же картинки под другим именем сохраняет
+        подпись вариантов и не ставит нарезку заново."""
+        make_variants(self.post.pk)
+        jobs = Job.objects.filter(name='posts.thumbnails.make_variants')
+        queued = jobs.count()
+        self.post.image = SimpleUploadedFile(
+            'again.gif', SMALL_GIF, 'image/gif'
+        )
+        self.post.save()
+        self.assertEqual(self.post.image_variants, current_signature())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, current_signature())
+        self.assertEqual(jobs.count(), queued)
+
+    def test_save_does_not_decode_image(self):
+        """Сохранение поста с новой картинкой не открывает её Pillow и
+        сбрасывает размеры старой."""
+        make_variants(self.post.pk)
+        self.post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        with mock.patch('posts.thumbnails._measure') as measure:
+            self.post.save()
+        measure.assert_not_called()
+        self.post.refresh_from_db()
+        self.assertIsNone(self.post.image_width)
+        self.assertEqual(self.post.image_placeholder, '')
+
+    def test_shared_image_keeps_thumbnails(self):
+        """Удаление поста и замена картинки не стирают варианты, пока
+        ту же картинку выводит другой пост."""
+        make_variants(self.post.pk)
+        self.post.refresh_from_db()
+        src = picture(self.post.image, self.post.image_variants)['src']
+        path = os.path.join(TEMP_MEDIA_ROOT, src[len('/media/'):])
+        for _ in range(2):
+            twin = Post.objects.create(
+                author=self.author, text='Близнец',
+                image=SimpleUploadedFile('twin.gif', SMALL_GIF, 'image/gif'),
+            )
+            self.assertEqual(twin.image.name, self.post.image.name)
+        twin.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        twin.save()
+        Post.objects.exclude(pk__in=[self.post.pk, twin.pk]).get().delete()
+        Job.objects.filter(name='posts.thumbnails.make_variants').delete()
+        run_pending('test')
+        self.assertTrue(os.path.exists(path))
+        self.post.delete()
+        run_pending('test')
+        self.assertFalse(os.path.exists(path))
+
+    def test_text_save_skips_old_values_lookup(self):
+        """Сохранение без картинки и группы в update_fields не читает
+        старые значения поста."""
+        self.post.text = 'Правка'
+        with CaptureQueriesContext(connection) as context:
+            self.post.save(update_fields=['text'])
+        self.assertFalse([
+            query for query in context
+            if query['sql'].startswith('SELECT "posts_post"."group_id"')
+        ])
+
+    def test_thumbnail_without_variants_sized(self):
+        """Миниатюра без вариантов выводится с размерами миниатюры."""
+        content = self.client.get('/').content.decode()
+        self.assertIn('width="960" height="339"', content)
+
+    def test_feed_renders_picture(self):
+        """Лента выводит <picture> с источником WebP."""
+        make_variants(self.post.pk)
+        content = self.client.get('/').content.decode()
+        self.assertIn('<picture>', content)
+        self.assertIn('type="image/webp"', content)
+
+    def test_image_size_and_placeholder(self):
+        """Размеры и заглушку считает фоновая задача, а не сохранение
+        поста; они переживают кеш карточки."""
+        self.post.refresh_from_db()
+        self.assertIsNone(self.post.image_width)
+        make_variants(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
+        self.assertTrue(
+            self.post.image_placeholder.startswith('data:image/webp;base64,')
+        )
+        card = decode(PostCard.from_post(self.post).encode())
+        self.assertEqual((card.image_width, card.image_height), (2, 1))
+        self.assertEqual(card.image_placeholder, self.post.image_placeholder)
+
+    def test_make_variants_measures_old_posts(self):
+        """Фоновая задача досчитывает размеры постов без них, а srcset
+        не предлагает вариантов шире исходной картинки."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=None, image_height=None, image_placeholder=''
+        )
+        make_variants(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_width, 2)
+        self.assertTrue(self.post.image_placeholder)
+        variants = picture(
+            self.post.image, self.post.image_variants, self.post.image_width
+        )
+        self.assertTrue(
+            all(' 960w' not in source['srcset']
+                for source in variants['sources'])
+        )
+
+    def test_feed_renders_sized_lazy_images(self):
+        """Картинки ленты выводятся с размерами и заглушкой, первая —
+        без отложенной загрузки, остальные — с ней."""
+        second = Post.objects.create(
+            author=self.author, text='Второй',
+            image=SimpleUploadedFile('second.gif', SMALL_GIF, 'image/gif'),
+        )
+        make_variants(self.post.pk)
+        make_variants(second.pk)
+        content = self.client.get('/').content.decode()
+        # Картинка шириной 2 пикселя: в srcset только самый узкий вариант.
+        self.assertEqual(content.count('width="320" height="113"'), 2)
+        self.assertEqual(content.count('loading="eager"'), 1)
+        self.assertEqual(content.count('loading="lazy"'), 1)
+        self.assertEqual(content.count('background: url(data:image/'), 2)
@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.archive import archive_old_posts
+from posts.models import ArchivedPost, Follow, Post
+from posts.timeline import author_key, decode_cursor, follow_feed
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_AUTHOR_DEPTH=3, POSTS_ON_PAGE=4)
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+        start = timezone.now() - timedelta(days=1)
+        for i in range(15):
+            post = Post.objects.create(
+                author=cls.authors[i % 3], text=f'Пост {i}'
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=start + timedelta(minutes=i)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self):
+        return list(Post.objects.filter(
+            author__in=self.authors[:2]
+        ).order_by('-pub_date', '-pk').values_list('pk', flat=True))
+
+    def walk(self):
+        result = []
+        after = None
+        while True:
+            posts, cursor = follow_feed(self.reader, after)
+            result.extend(post.pk for post in posts)
+            if cursor is None:
+                return result
+            after = decode_cursor(cursor)
+
+    def test_feed_matches_database_order(self):
+        """Лента по курсору совпадает с выборкой из базы, включая
+        страницы глубже, чем хранят списки авторов."""
+        self.assertEqual(self.walk(), self.expected())
+
+    def test_first_page_from_cache(self):
+        """Первая страница из тёплого кеша — только запрос подписок,
+        карточки постов берутся из кеша."""
+        follow_feed(self.reader)
+        with self.assertNumQueries(1):
+            posts, cursor = follow_feed(self.reader)
+        self.assertEqual([post.pk for post in posts], self.expected()[:4])
+        self.assertIsNotNone(cursor)
+
+    def test_cold_timelines_in_one_query(self):
+        """Списки всех авторов на холодном кеше строятся одним запросом,
+        сколько бы авторов ни было в подписках."""
+        Follow.objects.create(user=self.reader, author=self.authors[2])
+        # Подписки, списки авторов, авторы с архивом и карточки постов.
+        with self.assertNumQueries(4):
+            follow_feed(self.reader)
+        for author in self.authors:
+            timeline = cache.get(author_key(author.pk))
+            self.assertEqual(
+                [pk for _, pk in timeline],
+                list(Post.objects.filter(author=author).order_by(
+                    '-pub_date', '-pk'
+                ).values_list('pk', flat=True)[:3]),
+            )
+
+    def test_new_post_updates_timeline(self):
+        """Новый пост сразу попадает в закешированную ленту."""
+        follow_feed(self.reader)
+        post = Post.objects.create(author=self.authors[0], text='Новый')
+        posts, _ = follow_feed(self.reader)
+        self.assertEqual(posts[0], post)
+        post.delete()
+        posts, _ = follow_feed(self.reader)
+        self.assertNotIn(post, posts)
+
+    def test_stale_timeline_is_rebuilt(self):
+        """Устаревший список автора пересобирается из базы."""
+        cache.set(author_key(self.authors[0].pk), [(10 ** 17, 999999)])
+        posts, _ = follow_feed(self.reader)
+        self.assertEqual([post.pk for post in posts], self.expected()[:4])
+
+
+@override_settings(POSTS_ON_PAGE=2, POST_ARCHIVE_AFTER_DAYS=30)
+class ArchivedFollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.reader, author=author)
+        start = timezone.now() - timedelta(days=34, hours=12)
+        for i in range(8):
+            post = Post.objects.create(author=author, text=f'Пост {i}')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=start + timedelta(days=i)
+            )
+        archive_old_posts()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_continues_into_archive(self):
+        """Короткие списки авторов не обрывают ленту: за горячими постами
+        идут архивные."""
+        self.assertEqual(ArchivedPost.objects.count(), 5)
+        result = []
+        after = None
+        while True:
+            posts, cursor = follow_feed(self.reader, after)
+            result.extend(post.text for post in posts)
+            if cursor is None:
+                break
+            after = decode_cursor(cursor)
+        self.assertEqual(result, [f'Пост {i}' for i in range(7, -1, -1)])
@@ -0,0 +1,211 @@
+"""
+Варианты картинки поста для ``<picture>``.
+
+Картинка нарезается в нескольких ширинах и форматах (AVIF, WebP, JPEG)
+фоновой задачей make_variants при сохранении поста или командой
+make_image_variants для старых постов. Что именно нарезано, записывается
+в ``Post.image_variants`` подписью вида ``WEBP,JPEG:320,640,960``.
+Шаблон строит srcset по этой подписи, не обращаясь ни к диску, ни к
+KV-хранилищу sorl; пока подписи нет, выводится обычная миниатюра.
+
+Формат выбирает браузер по ``type`` у ``<source>`` — это то же
+согласование по Accept, но HTML остаётся общим для всех клиентов и
+продолжает кешироваться целиком.
+
+Размеры исходной картинки и заглушка (крошечная копия миниатюры в data
+URI) считаются один раз, measure() в той же задаче make_variants, и
+хранятся в посте: сохранение поста не декодирует картинку, а шаблон
+выводит ``<img>`` с размерами и фоном-заглушкой, не открывая файл.
+Ширины больше исходной в srcset не попадают — это растянутые копии,
+которые весят больше, но не показывают ничего нового, а размеры
+``<img>`` берутся у самого широкого оставшегося варианта.
+"""
+import base64
+import io
+import logging
+
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+
+from core.thumbnail_backend import supported_formats
+
+from . import lookups
+from .cards import forget_card
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Пропорции миниатюры ленты, 960x339.
+ASPECT = 339 / 960
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+# Значения measure() для поста без картинки.
+NOT_MEASURED = {
+    'image_width': None, 'image_height': None, 'image_placeholder': '',
+}
+
+# Тег Orientation в EXIF; значения 5–8 — поворот на 90 градусов.
+ORIENTATION = 0x0112
+
+
+def geometry(width):
+    return f'{width}x{round(width * ASPECT)}'
+
+
+def options(image_format):
+    return {'crop': 'center', 'upscale': True, 'format': image_format}
+
+
+def box(width):
+    """Ширина и высота варианта шириной width для атрибутов ``<img>``."""
+    return {'width': width, 'height': round(width * ASPECT)}
+
+
+def variant_url(name, width, image_format):
+    return default.backend.thumbnail_url(
+        name, geometry(width), **options(image_format)
+    )
+
+
+def current_signature():
+    formats = [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in supported_formats()
+    ]
+    widths = ','.join(str(width) for width in settings.POST_IMAGE_WIDTHS)
+    return f'{",".join(formats)}:{widths}'
+
+
+def parse_signature(signature):
+    formats, _, widths = signature.partition(':')
+    formats = formats.split(',')
+    if not set(formats) <= set(MIME_TYPES):
+        raise ValueError(f'Неизвестный формат в подписи {signature!r}')
+    return formats, [int(width) for width in widths.split(',')]
+
+
+def picture(image, signature, width=None):
+    """
+    Разметка ``<picture>`` по подписи вариантов: ``sources`` — словари с
+    type, srcset и sizes от предпочтительного формата к запасному,
+    ``src`` — самый широкий вариант запасного формата для ``<img>``,
+    ``width`` и ``height`` — его размеры. С известной шириной исходной
+    картинки ``width`` более широкие варианты, кроме самого узкого,
+    пропускаются. Без подписи или с испорченной подписью возвращает
+    None.
+    """
+    if not image or not signature:
+        return None
+    name = getattr(image, 'name', image)
+    try:
+        formats, widths = parse_signature(signature)
+    except ValueError:
+        return None
+    if width:
+        widths = [
+            variant for variant in widths if variant <= width
+        ] or widths[:1]
+    return {
+        'sources': [
+            {
+                'type': MIME_TYPES.get(image_format, ''),
+                'srcset': ', '.join(
+                    f'{variant_url(name, width, image_format)} {width}w'
+                    for width in widths
+                ),
+                'sizes': settings.POST_IMAGE_SIZES,
+            }
+            for image_format in formats
+        ],
+        'src': variant_url(name, widths[-1], formats[-1]),
+        **box(widths[-1]),
+    }
+
+
+def _placeholder(image):
+    from PIL import Image, ImageOps
+
+    width = settings.POST_IMAGE_PLACEHOLDER_WIDTH
+    size = (width, max(round(width * ASPECT), 1))
+    image_format = settings.POST_IMAGE_PLACEHOLDER_FORMAT
+    # Для JPEG draft() декодирует сразу в уменьшенном масштабе.
+    image.draft('RGB', (size[0] * 4, size[0] * 4))
+    small = ImageOps.fit(
+        ImageOps.exif_transpose(image).convert('RGB'), size,
+        Image.BILINEAR,
+    )
+    buffer = io.BytesIO()
+    small.save(buffer, image_format, quality=40)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:{Image.MIME[image_format]};base64,{data}'
+
+
+def _measure(file):
+    from PIL import Image
+
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+            if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):
+                width, height = height, width
+            placeholder = _placeholder(image)
+    finally:
+        file.seek(0)
+    return {
+        'image_width': width, 'image_height': height,
+        'image_placeholder': placeholder,
+    }
+
+
+def measure(image):
+    """
+    Размеры картинки поста с учётом поворота из EXIF и заглушка для
+    шаблона: словарь с image_width, image_height и image_placeholder.
+    Только что загруженный файл читается с начала и перематывается
+    обратно, файл из хранилища открывается и закрывается. Отсутствующая
+    или нечитаемая картинка даёт пустые значения.
+    """
+    if not image:
+        return dict(NOT_MEASURED)
+    try:
+        if not image._committed:
+            return _measure(image)
+        with image.open():
+            return _measure(image)
+    except Exception:
+        logger.warning('Не удалось разобрать картинку %s', image,
+                       exc_info=True)
+        return dict(NOT_MEASURED)
+
+
+def make_variants(post_id):
+    """
+    Фоновая задача: нарезает варианты картинки поста и, если у поста
+    ещё нет размеров и заглушки (новая картинка или старый пост),
+    считает их.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'image_width'
+    ).first()
+    if post is None or not post.image:
+        return
+    name = post.image.name
+    signature = current_signature()
+    formats, widths = parse_signature(signature)
+    for image_format in formats:
+        for width in widths:
+            get_thumbnail(name, geometry(width), **options(image_format))
+    changes = {'image_variants': signature}
+    if post.image_width is None:
+        changes.update(measure(post.image))
+    # update() без сигналов: сохранённый пост мог сменить картинку, пока
+    # шла нарезка, поэтому условие и на имя файла.
+    if Post.objects.filter(pk=post_id, image=name).update(**changes):
+        forget_card(post_id)
+        lookups.posts.forget_pks([post_id])
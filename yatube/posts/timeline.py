@@ -0,0 +1,247 @@
+"""
+Лента подписок, собранная из списков последних постов авторов.
+
+Для каждого автора в кеше лежит ограниченный список пар
+``(время публикации в микросекундах, id поста)`` от новых к старым.
+Список обновляется при сохранении и удалении поста, а при промахе кеша
+строится заново запросом по индексу ``(author, -pub_date)``.
+
+Страница ленты — это k-путевое слияние списков всех авторов, на которых
+подписан пользователь, начиная с курсора, и один запрос за самими
+постами. Запрос ``author_id IN (...)`` по таблице постов нужен только
+для страниц глубже, чем хранят списки. Списки строятся по горячей
+таблице; список автора, у которого есть архивные посты, кончается
+меткой ARCHIVED, и страница, дошедшая до конца такого списка, тоже
+собирается из базы — горячие посты, а за ними архивные.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .cards import PostCard, get_cards
+from .models import ArchivedPost, Follow, Post
+
+AUTHOR_KEY = 'posts.timeline.author.{}'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Последняя запись списка автора с архивными постами: младше любой
+# настоящей записи, и за ней посты, которых в списке нет.
+ARCHIVED = (-1, 0)
+
+
+def author_key(author_id):
+    return AUTHOR_KEY.format(author_id)
+
+
+def _microseconds(pub_date):
+    return (pub_date - EPOCH) // timedelta(microseconds=1)
+
+
+def _entry(post):
+    return _microseconds(post.pub_date), post.pk
+
+
+def encode_cursor(entry):
+    return '{}_{}'.format(*entry)
+
+
+def post_cursor(post):
+    """Курсор страницы, которая начинается после поста ``post``."""
+    return encode_cursor(_entry(post))
+
+
+def older_than(after, pk_field='pk'):
+    """Условие «старше курсора» в порядке ``-pub_date, -pk``."""
+    pub_date = EPOCH + timedelta(microseconds=after[0])
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{pk_field}__lt': after[1]}
+    )
+
+
+def decode_cursor(value):
+    try:
+        timestamp, pk = value.split('_')
+        return int(timestamp), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _build(author_ids):
+    """
+    Строит списки авторов одним запросом: ROW_NUMBER() по каждому автору
+    отбирает его последние TIMELINE_AUTHOR_DEPTH постов, так что
+    холодная лента стоит одного запроса при любом числе подписок. Ещё
+    один запрос находит авторов с архивными постами.
+    """
+    ranked = Post.objects.filter(author_id__in=author_ids).order_by().annotate(
+        author_rank=Window(
+            RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('pk').desc()],
+        )
+    ).values('pk', 'author_id', 'pub_date', 'author_rank')
+    sql, params = ranked.query.sql_with_params()
+    posts = Post.objects.raw(
+        f'SELECT id, author_id, pub_date FROM ({sql}) ranked '
+        f'WHERE author_rank <= %s',
+        (*params, settings.TIMELINE_AUTHOR_DEPTH),
+    )
+    timelines = {author_id: [] for author_id in author_ids}
+    for post in posts:
+        timelines[post.author_id].append(_entry(post))
+    for timeline in timelines.values():
+        timeline.sort(reverse=True)
+    for author_id in ArchivedPost.objects.filter(
+        author_id__in=author_ids
+    ).order_by().values_list('author_id', flat=True).distinct():
+        timelines[author_id].append(ARCHIVED)
+    cache.set_many(
+        {author_key(author_id): timeline
+         for author_id, timeline in timelines.items()},
+        settings.TIMELINE_CACHE_TIMEOUT,
+    )
+    return timelines
+
+
+def author_timelines(author_ids):
+    """Списки последних постов авторов; недостающие строятся из базы."""
+    cached = cache.get_many([author_key(pk) for pk in author_ids])
+    timelines = {}
+    missing = []
+    for author_id in author_ids:
+        timeline = cached.get(author_key(author_id))
+        if timeline is None:
+            missing.append(author_id)
+        else:
+            timelines[author_id] = timeline
+    if missing:
+        timelines.update(_build(missing))
+    return timelines
+
+
+def _update(author_id, change):
+    key = author_key(author_id)
+    timeline = cache.get(key)
+    if timeline is not None:
+        cache.set(key, change(timeline), settings.TIMELINE_CACHE_TIMEOUT)
+
+
+def add_post(post):
+    entry = _entry(post)
+
+    def change(timeline):
+        timeline = [item for item in timeline if item[1] != post.pk]
+        timeline.append(entry)
+        timeline.sort(reverse=True)
+        return timeline[:settings.TIMELINE_AUTHOR_DEPTH]
+
+    _update(post.author_id, change)
+
+
+def remove_post(post):
+    _update(
+        post.author_id,
+        lambda timeline: [item for item in timeline if item[1] != post.pk],
+    )
+
+
+def _horizon(timeline):
+    """Запись, старше которой список автора не знает постов, или None."""
+    archived = timeline[-1:] == [ARCHIVED]
+    entries = timeline[:-1] if archived else timeline
+    if len(entries) >= settings.TIMELINE_AUTHOR_DEPTH:
+        return entries[-1]
+    return ARCHIVED if archived else None
+
+
+def _merge(timelines, after, limit):
+    """
+    Сливает списки авторов от новых к старым, начиная после курсора.
+
+    Возвращает не больше ``limit`` записей и признак того, что они
+    полные. Обрезанный список автора и список с меткой ARCHIVED ничего
+    не говорят о постах старше своей последней записи, и если страница
+    заходит за эту границу, её нужно собирать из базы.
+    """
+    horizon = max(
+        filter(None, map(_horizon, timelines.values())), default=None
+    )
+    merged = heapq.merge(*timelines.values(), reverse=True)
+    merged = (entry for entry in merged if entry != ARCHIVED)
+    if after is not None:
+        merged = (entry for entry in merged if entry < after)
+    entries = list(islice(merged, limit))
+    complete = horizon is None or (
+        len(entries) == limit and entries[-1] >= horizon
+    )
+    return entries, complete
+
+
+def _fetch(entries, author_ids):
+    """
+    Собирает карточки постов из кеша, недостающие — одним запросом.
+    Если запись списка не совпала с постом (список устарел), возвращает
+    None.
+    """
+    cards = get_cards([pk for _, pk in entries])
+    result = []
+    for entry in entries:
+        post = cards.get(entry[1])
+        if (post is None or post.author_id not in author_ids
+                or _entry(post) != entry):
+            return None
+        result.append(post)
+    return result
+
+
+def _from_database(author_ids, after, limit):
+    cards = []
+    # Архивные посты старше всех горячих, поэтому архив читается, только
+    # когда горячих не хватило на страницу.
+    for model in (Post, ArchivedPost):
+        posts = model.objects.filter(author_id__in=author_ids).order_by(
+            '-pub_date', '-pk'
+        )
+        if after is not None:
+            posts = posts.filter(older_than(after))
+        cards.extend(PostCard.from_queryset(posts[:limit - len(cards)]))
+        if len(cards) == limit:
+            break
+    return cards
+
+
+def follow_feed(user, after=None):
+    """
+    Страница ленты подписок после курсора ``after``.
+
+    Возвращает список постов и курсор следующей страницы или None.
+    """
+    per_page = settings.POSTS_ON_PAGE
+    author_ids = set(Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ))
+    if not author_ids:
+        return [], None
+    posts = None
+    for _ in range(2):
+        timelines = author_timelines(author_ids)
+        entries, complete = _merge(timelines, after, per_page + 1)
+        if not complete:
+            break
+        posts = _fetch(entries, author_ids)
+        if posts is not None:
+            break
+        cache.delete_many([author_key(pk) for pk in author_ids])
+    if posts is None:
+        posts = _from_database(author_ids, after, per_page + 1)
+    next_cursor = None
+    if len(posts) > per_page:
+        posts = posts[:per_page]
+        next_cursor = post_cursor(posts[-1])
+    return posts, next_cursor
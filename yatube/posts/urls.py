@@ -1,18 +1,26 @@
 from django.urls import path
 from . import views
+from .feeds import AtomPostsFeed, PostsFeed
 
 app_name = 'post'
 
 urlpatterns = [
     path('', views.index, name='main'),
+    path('rss/', PostsFeed(), name='rss'),
+    path('atom/', AtomPostsFeed(), name='atom'),
     path('create/', views.post_create, name='post_create'),
     path('group/<slug:slug>/', views.group_posts, name='groups'),
+    path('group/<slug:slug>/rss/', PostsFeed(), name='group_rss'),
+    path('group/<slug:slug>/atom/', AtomPostsFeed(), name='group_atom'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('tags/<str:tag>/', views.tag_posts, name='tag'),
+    path('notifications/', views.notifications, name='notifications'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -24,4 +32,10 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/rss/', PostsFeed(), name='profile_rss'),
+    path(
+        'profile/<str:username>/atom/',
+        AtomPostsFeed(),
+        name='profile_atom'
+    ),
 ]
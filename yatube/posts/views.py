@@ -1,14 +1,22 @@
+from django.http import JsonResponse
+from django.db import transaction
 from django.shortcuts import get_object_or_404, render, redirect
-from django.core.paginator import Paginator
-from yatube.settings import POSTS_ON_PAGE
-from .models import Post, Group, Follow
-from django.contrib.auth import get_user_model
+from django.core.paginator import Page, Paginator
+from django.urls import reverse
+from yatube.settings import (
+    AUTOCOMPLETE_LIMIT, GROUP_PAGE_CACHE_TIMEOUT, POSTS_ON_PAGE,
+)
+from . import autocomplete as prefix_indexes
+from .models import Follow, Post
 from .forms import PostForm, CommentForm
+from .archive import get_post_or_404, post_list
+from .group_pages import group_page
+from .lookups import authors, groups, posts
+from .notifications import mark_read, notifications_page
+from .tags import split_tag, tag_feed
+from .timeline import decode_cursor, follow_feed
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-
-
-User = get_user_model()
+from core.compression import cache_page_compressed, compress_page
 
 
 def paginator(request, post_list):
@@ -17,10 +25,9 @@ def paginator(request, post_list):
     return paginator.get_page(page_number)
 
 
-@cache_page(20)
+@cache_page_compressed(20)
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = paginator(request, post_list)
+    page_obj = paginator(request, post_list())
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj
@@ -28,23 +35,25 @@ def index(request):
     return render(request, template, context)
 
 
+@compress_page
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = paginator(request, post_list)
+    group = groups.get_or_404(slug)
+    page_obj, feed_version = group_page(group, request.GET.get('page'))
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_version': feed_version,
+        'feed_timeout': GROUP_PAGE_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@compress_page
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = paginator(request, post_list)
+    author = authors.get_or_404(username)
+    page_obj = paginator(request, post_list(author=author))
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author
     ).exists()
@@ -57,18 +66,20 @@ def profile(request, username):
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_404(post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.save()
         return redirect('posts:post_edit', post_id=post_id)
-    comment_list = post.comments.all()
+    comment_list = post.comments.select_related('author')
     context = {
         'post': post,
         'form': form,
         'comment_list': comment_list,
+        # Горячие посты автора и архивные.
+        'author_post_count': post_list(author_id=post.author_id).count(),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -90,18 +101,26 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    form = PostForm(
-        request.POST or None,
-        files=request.FILES or None,
-        instance=post
-    )
-    if request.user == post.author:
+    post = posts.get_or_404(post_id)
+    if request.user != post.author:
+        return redirect('posts:post_detail', post.id)
+    if request.method != 'POST':
+        form = PostForm(instance=post)
+        return render(request, 'posts/create_post.html', {
+            'form': form,
+            'is_edit': True,
+        })
+    with transaction.atomic():
+        # Пост из кеша может быть устаревшим, правка пишется поверх
+        # свежей строки.
+        post = get_object_or_404(
+            Post.objects.select_for_update(), pk=post.pk
+        )
+        form = PostForm(request.POST, files=request.FILES or None,
+                        instance=post)
         if form.is_valid():
             form.save()
             return redirect('posts:post_detail', post.id)
-    if request.user != post.author:
-        return redirect('posts:post_detail', post.id)
     context = {
         'form': form,
         'is_edit': True,
@@ -111,34 +130,49 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = posts.get_or_404(post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
+        # Только ключ: закешированный пост в запись не попадает.
+        comment.post_id = post.pk
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    # информация о текущем пользователе доступна в переменной request.user
-    follower = Follow.objects.filter(user=request.user).values_list(
-        'author_id', flat=True
-    )
-    post_list = Post.objects.filter(author_id__in=follower)
-    page_obj = paginator(request, post_list)
+    after = decode_cursor(request.GET.get('after'))
+    post_list, next_cursor = follow_feed(request.user, after)
+    page_obj = Page(post_list, 1, Paginator(post_list, POSTS_ON_PAGE))
     template = 'posts/follow.html'
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'next_cursor': next_cursor,
+        'is_continued': after is not None,
+    }
+    return render(request, template, context)
+
+
+def tag_posts(request, tag):
+    kind, name = split_tag(tag)
+    after = decode_cursor(request.GET.get('after'))
+    post_list, next_cursor = tag_feed(kind, name, after)
+    page_obj = Page(post_list, 1, Paginator(post_list, POSTS_ON_PAGE))
+    template = 'posts/tag.html'
+    context = {
+        'tag': f'{kind}{name}',
+        'page_obj': page_obj,
+        'next_cursor': next_cursor,
+        'is_continued': after is not None,
     }
     return render(request, template, context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = authors.get_or_404(username)
     user = request.user
     if author != user:
         Follow.objects.get_or_create(user=user, author=author)
@@ -150,7 +184,44 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = authors.get_or_404(username)
     user = request.user
     Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def notifications(request):
+    before = request.GET.get('before')
+    notification_list, next_before = notifications_page(
+        request.user,
+        before=int(before) if before and before.isdigit() else None,
+    )
+    mark_read(request.user, notification_list)
+    context = {
+        'notification_list': notification_list,
+        'next_before': next_before,
+    }
+    return render(request, 'posts/notifications.html', context)
+
+
+def autocomplete(request):
+    query = request.GET.get('q', '')
+    return JsonResponse({
+        'authors': [
+            dict(author, url=reverse(
+                'posts:profile', kwargs={'username': author['username']}
+            ))
+            for author in prefix_indexes.authors.search(
+                query, AUTOCOMPLETE_LIMIT
+            )
+        ],
+        'groups': [
+            dict(group, url=reverse(
+                'posts:groups', kwargs={'slug': group['slug']}
+            ))
+            for group in prefix_indexes.groups.search(
+                query, AUTOCOMPLETE_LIMIT
+            )
+        ],
+    })
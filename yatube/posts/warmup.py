@@ -0,0 +1,22 @@
+from django.conf import settings
+
+from . import lookups
+from .cards import get_cards
+from .models import Post
+
+
+def prefill_caches():
+    """
+    Заполняет кеш карточками постов первой страницы, их авторами и
+    группами: это самые частые запросы после перезапуска.
+
+    Карточке картинки без нарезанных вариантов нужна миниатюра sorl, а
+    с ней Pillow; такие карточки строит первый запрос, а не прогрев.
+    """
+    rows = Post.objects.values_list(
+        'pk', 'image', 'image_variants'
+    )[:settings.POSTS_ON_PAGE]
+    post_ids = [pk for pk, image, variants in rows if variants or not image]
+    cards = get_cards(post_ids).values()
+    lookups.authors.get_many(card.author.username for card in cards)
+    lookups.groups.get_many(card.group.slug for card in cards if card.group)
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from core.admin_utils import PrefixSearchMixin
+from posts import autocomplete
+from posts.admin import BackgroundDeleteMixin
+from posts.deletion import delete_user
+
+User = get_user_model()
+
+
+class YatubeUserAdmin(PrefixSearchMixin, BackgroundDeleteMixin, UserAdmin):
+    list_display = UserAdmin.list_display + ('is_active', 'deletion_status')
+    deletion_kind = 'user'
+    prefix_index = autocomplete.authors
+    schedule_deletion = staticmethod(delete_user)
+
+
+admin.site.unregister(User)
+admin.site.register(User, YatubeUserAdmin)
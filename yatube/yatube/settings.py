@@ -46,11 +46,12 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'posts',
     'users.apps.UsersConfig',
-    'core',
+    'core.apps.CoreConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,7 +75,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year'
+                'core.context_processors.year.year',
+                'posts.context_processors.notifications',
             ],
         },
     },
@@ -82,6 +84,27 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Шаги прогрева при загрузке yatube.wsgi, см. core.warmup; пустой список
+# отключает прогрев. Шаги по умолчанию не загружают sorl и Pillow: они
+# загружаются при первой миниатюре, заранее — шагом 'core.warmup.load_thumbnail_engine'.
+WARMUP_STEPS = [
+    'core.warmup.populate_resolvers',
+    'core.warmup.compile_templates',
+    'posts.warmup.prefill_caches',
+    'posts.autocomplete.build_indexes',
+]
+
+WARMUP_TEMPLATE_DIRS = [TEMPLATES_DIR]
+
+SESSION_ENGINE = 'core.sessions'
+
+# Как часто изменённая сессия сбрасывается из кеша в базу, секунды.
+SESSION_WRITE_BEHIND_INTERVAL = 60
+
+AUTHENTICATION_BACKENDS = ['core.backends.CachedModelBackend']
+
+AUTH_USER_CACHE_TIMEOUT = 60 * 15
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -136,20 +159,174 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:main'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+# Бэкенд, через который воркер send_queued_mail доставляет письма.
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+QUEUED_EMAIL_BATCH_SIZE = 50
+
+QUEUED_EMAIL_MAX_ATTEMPTS = 5
+
+# Задержка перед повтором удваивается с каждой неудачной попыткой.
+QUEUED_EMAIL_RETRY_DELAY = 60
+
+# Через сколько секунд письмо, застрявшее в отправке, снова берётся в работу.
+QUEUED_EMAIL_LOCK_TIMEOUT = 60 * 10
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_ON_PAGE = 10
 
+# Сколько последних постов каждого автора хранится в кеше для ленты
+# подписок; страницы глубже собираются запросом к базе.
+TIMELINE_AUTHOR_DEPTH = 200
+
+TIMELINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Карточки постов сбрасываются при сохранении поста, а смена имени автора
+# или названия группы видна в лентах не позже, чем через этот срок.
+POST_CARD_CACHE_TIMEOUT = 60 * 5
+
+# Сколько держать в кеше группы, авторов и посты, найденные вьюхами по
+# slug, username и id, и сколько помнить, что такого объекта нет.
+LOOKUP_CACHE_TIMEOUT = 60 * 5
+LOOKUP_MISSING_CACHE_TIMEOUT = 30
+
+# Сколько держать в кеше ленты групп. Правки постов и групп сбрасывают
+# их сразу, а смена имени автора видна не позже, чем через этот срок.
+GROUP_PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Посты старше стольких дней фоновая задача archive_old_posts переносит
+# из горячей таблицы в архив порциями по POST_ARCHIVE_CHUNK_SIZE;
+# None — архив не ведётся.
+POST_ARCHIVE_AFTER_DAYS = 365
+
+POST_ARCHIVE_CHUNK_SIZE = 500
+
+# Сколько последних постов попадает в ленты RSS и Atom. Списки лент
+# хранятся в кеше и обновляются при сохранении и удалении постов.
+FEED_LENGTH = 20
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько авторов и групп отдаёт автодополнение и сколько объектов
+# отбирает по префиксу поиск в автокомплитах админки.
+AUTOCOMPLETE_LIMIT = 10
+
+AUTOCOMPLETE_ADMIN_LIMIT = 100
+
+# Как часто процесс проверяет, не изменил ли индексы автодополнения
+# кто-то другой, секунды.
+AUTOCOMPLETE_CHECK_INTERVAL = 1
+
+# На сколько изменений может отстать процесс, чтобы догнать журнал
+# индекса, а не строить индекс заново, и сколько секунд журнал хранит
+# изменение.
+AUTOCOMPLETE_MAX_CHANGES = 1000
+
+AUTOCOMPLETE_CHANGE_TIMEOUT = 60 * 60
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Файлы с хешем содержимого в имени отдаются с Cache-Control: immutable.
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Кто отдаёт файлы из MEDIA_ROOT: None — сам Django, 'nginx' — по
+# X-Accel-Redirect, 'apache' — по X-Sendfile.
+MEDIA_SENDFILE_BACKEND = None
+
+# internal-локация nginx, которая смотрит в MEDIA_ROOT.
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+MEDIA_ACCESS_CHECK = 'posts.media.can_access_media'
+
+# Запросы к базе дольше порога, мс, попадают в журнал медленных запросов
+# (см. core.slow_queries); None отключает журнал.
+SLOW_QUERY_THRESHOLD_MS = 100
+
+SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'slow_queries.log')
+
+# При превышении размера файл журнала сменяется, старый остаётся в .1.
+SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+# Сколько последних медленных запросов процесс держит в памяти.
+SLOW_QUERY_BUFFER_SIZE = 500
+
+# Фоновые задачи core.jobs выполняет manage.py run_workers; в тестах их
+# удобно выполнять сразу после коммита.
+BACKGROUND_TASKS_EAGER = False
+
+# Сколько задач воркер выполняет одновременно.
+JOB_WORKERS = 2
+
+JOB_BATCH_SIZE = 20
+
+JOB_MAX_ATTEMPTS = 5
+
+# Задержка перед повтором удваивается с каждой неудачной попыткой.
+JOB_RETRY_DELAY = 30
+
+# Как часто воркер отмечает задачи, которые выполняет, секунды.
+JOB_HEARTBEAT_INTERVAL = 30
+
+# Через сколько секунд без отметки воркера (воркер умер) задача снова
+# берётся в работу.
+JOB_LOCK_TIMEOUT = 60 * 5
+
+# Сколько хранить выполненные задачи, секунды.
+JOB_KEEP_FINISHED = 60 * 60 * 24 * 7
+
+# Периодические задачи: путь к функции -> интервал между запусками, секунды.
+JOB_PERIODIC = {
+    'core.mail.drain_queued_mail': 30,
+    'core.jobs.purge_finished_jobs': 60 * 60,
+    'posts.archive.archive_old_posts': 60 * 60,
+}
+
+NOTIFICATIONS_ON_PAGE = 20
+
+NOTIFICATIONS_BATCH_SIZE = 500
+
+# Сколько объектов удаляется в одной транзакции при удалении
+# пользователя или группы.
+DELETION_CHUNK_SIZE = 200
+
+# LocMemCache у каждого процесса свой. С ним кеш пользователя и
+# отложенная запись сессий выключены (core.caching), а сбросы кеша,
+# эпохи и ход фоновых задач видны только в своём процессе. В бою с
+# несколькими воркерами нужен общий кеш: Redis или Memcached.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.KVStore'
+
+THUMBNAIL_BACKEND = 'core.thumbnail_backend.ThumbnailBackend'
+
+# Ширины и форматы вариантов картинки поста, от предпочтительного формата
+# к запасному; форматы, которые Pillow не умеет сохранять, пропускаются.
+POST_IMAGE_WIDTHS = (320, 640, 960)
+
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+
+# Атрибут sizes у srcset: картинка во всю колонку, но не шире 960px.
+POST_IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+
+# Заглушка картинки поста: ширина в пикселях (высота — по пропорциям
+# миниатюры) и формат, в котором она встраивается в страницу.
+POST_IMAGE_PLACEHOLDER_WIDTH = 16
+
+POST_IMAGE_PLACEHOLDER_FORMAT = 'WEBP'
+
+# Сколько записей KV-хранилища sorl держать в памяти процесса.
+THUMBNAIL_LRU_SIZE = 2000
+
+# Как часто процесс проверяет, не сбросил ли LRU кто-то другой, секунды.
+THUMBNAIL_LRU_CHECK_INTERVAL = 1